@@ -0,0 +1,348 @@
+from typing import Dict, Any, List, Tuple, Optional
+
+from program import (
+    DEFAULT_RULES, ProgressionRules, program_structure, compile_program, parse_log_key, parse_any_log_key,
+    history_key, current_cycle, logged_sets,
+)
+from profiling import profiler
+
+# --- Training History ---
+# Per-exercise aggregates over every logged cycle, kept up to date one log at a
+# time. Each exercise's logs sit in dense slots ordered by (cycle, week, day):
+# tonnage and volume are Fenwick trees (prefix sums) and e1RM a range-max tree,
+# so recording a log, range totals, best sets and PR checks are O(log n) and
+# never rescan history. Logged actual_reps are totals across sets; e1RM uses
+# Epley on reps per set like New1RMScreen.
+Cell = Tuple[int, int, int]
+NO_E1RM = (float('-inf'), -1)
+
+def epley_1rm(weight: float, reps_per_set: float) -> Optional[float]:
+    if weight <= 0 or reps_per_set < 1: return None
+    return weight * (1 + reps_per_set / 30)
+
+class PrefixSums:
+    # Fenwick tree over a growable array of floats.
+    __slots__ = ('values', 'tree')
+
+    def __init__(self, values: Optional[List[float]] = None):
+        self.values = list(values or [])
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        n = len(self.values)
+        tree = [0.0] + self.values
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n: tree[j] += tree[i]
+        self.tree = tree
+
+    def set(self, index: int, value: float) -> None:
+        if index >= len(self.values):
+            self.values.extend([0.0] * (max(index + 1, 2 * len(self.values), 16) - len(self.values)))
+            self._rebuild()
+        delta = value - self.values[index]
+        self.values[index] = value
+        tree, n, i = self.tree, len(self.values), index + 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, end: int) -> float:
+        # Sum of values[0:end].
+        tree, total, i = self.tree, 0.0, min(end, len(self.values))
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def range(self, start: int, end: int) -> float:
+        return self.prefix(end) - self.prefix(start)
+
+class RangeMax:
+    # Segment tree of (value, slot) pairs; query() returns the max pair of a slot range.
+    __slots__ = ('size', 'tree')
+
+    def __init__(self, values: Optional[List[Tuple[float, int]]] = None):
+        values = values or []
+        self.size = 1
+        while self.size < len(values): self.size *= 2
+        self._build(values)
+
+    def _build(self, leaves: List[Tuple[float, int]]) -> None:
+        size = self.size
+        tree = [NO_E1RM] * size + leaves + [NO_E1RM] * (size - len(leaves))
+        for i in range(size - 1, 0, -1):
+            tree[i] = max(tree[2*i], tree[2*i + 1])
+        self.tree = tree
+
+    def set(self, index: int, value: Optional[float]) -> None:
+        if index >= self.size:
+            leaves = self.tree[self.size:]
+            while self.size <= index: self.size *= 2
+            self._build(leaves)
+        tree = self.tree
+        i = index + self.size
+        tree[i] = NO_E1RM if value is None else (value, index)
+        i //= 2
+        while i:
+            tree[i] = max(tree[2*i], tree[2*i + 1])
+            i //= 2
+
+    def query(self, start: int, end: int) -> Tuple[float, int]:
+        tree, best = self.tree, NO_E1RM
+        lo, hi = max(start, 0) + self.size, min(end, self.size) + self.size
+        while lo < hi:
+            if lo & 1:
+                best = max(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = max(best, tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+class LiftHistory:
+    __slots__ = ('name', 'cells', 'tonnage', 'volume', 'e1rm', 'entries', 'trend')
+
+    def __init__(self, name: str, cells: List[Cell]):
+        self.name = name
+        self.cells = cells                  # this exercise's cells in one cycle, in order
+        self.tonnage = PrefixSums()
+        self.volume = PrefixSums()
+        self.e1rm = RangeMax()
+        self.entries: Dict[int, Tuple[float, int, Optional[float]]] = {}
+        self.trend = [0, 0.0, 0.0, 0.0, 0.0]  # n, sum x, sum y, sum xy, sum xx over e1RM points
+
+    def slot(self, cycle: int, index: int) -> int:
+        return (cycle - 1) * len(self.cells) + index
+
+    def _trend_add(self, slot: int, e1rm: Optional[float], sign: int) -> None:
+        if e1rm is None: return
+        trend = self.trend
+        trend[0] += sign
+        trend[1] += sign * slot
+        trend[2] += sign * e1rm
+        trend[3] += sign * slot * e1rm
+        trend[4] += sign * slot * slot
+
+    def put(self, slot: int, weight: float, reps: int, e1rm: Optional[float]) -> None:
+        old = self.entries.get(slot)
+        if old is not None: self._trend_add(slot, old[2], -1)
+        self.entries[slot] = (weight, reps, e1rm)
+        self._trend_add(slot, e1rm, 1)
+        self.tonnage.set(slot, weight * reps)
+        self.volume.set(slot, reps)
+        self.e1rm.set(slot, e1rm)
+
+    def drop(self, slot: int) -> None:
+        old = self.entries.pop(slot, None)
+        if old is None: return
+        self._trend_add(slot, old[2], -1)
+        self.tonnage.set(slot, 0.0)
+        self.volume.set(slot, 0.0)
+        self.e1rm.set(slot, None)
+
+    def rebuild(self, entries: Dict[int, Tuple[float, int, Optional[float]]]) -> None:
+        # Bulk load in O(n) instead of n single-slot updates.
+        self.entries = dict(entries)
+        size = max(entries, default=-1) + 1
+        tonnage, volume, e1rm = [0.0] * size, [0.0] * size, [NO_E1RM] * size
+        self.trend = [0, 0.0, 0.0, 0.0, 0.0]
+        for slot, (weight, reps, value) in entries.items():
+            tonnage[slot] = weight * reps
+            volume[slot] = reps
+            if value is not None: e1rm[slot] = (value, slot)
+            self._trend_add(slot, value, 1)
+        self.tonnage, self.volume, self.e1rm = PrefixSums(tonnage), PrefixSums(volume), RangeMax(e1rm)
+
+    def rebuild_arrays(self, slots, weights, reps, e1rms) -> None:
+        # rebuild() from NumPy columns (e1RM NaN where there is none); the trees
+        # and trend are filled with array operations.
+        import numpy as np
+        size = int(slots.max()) + 1 if len(slots) else 0
+        tonnage, volume = np.zeros(size), np.zeros(size)
+        tonnage[slots] = weights * reps
+        volume[slots] = reps
+        valid = ~np.isnan(e1rms)
+        x, y = slots[valid].astype(np.float64), e1rms[valid]
+        self.trend = [int(valid.sum()), float(x.sum()), float(y.sum()), float((x * y).sum()), float((x * x).sum())]
+        e1rm = [NO_E1RM] * size
+        for slot, value in zip(slots[valid].tolist(), y.tolist()):
+            e1rm[slot] = (value, slot)
+        e1rm_values = [None if value != value else value for value in e1rms.tolist()]
+        self.entries = dict(zip(slots.tolist(), zip(weights.tolist(), reps.tolist(), e1rm_values)))
+        self.tonnage, self.volume, self.e1rm = PrefixSums(tonnage.tolist()), PrefixSums(volume.tolist()), RangeMax(e1rm)
+
+    def is_pr(self, slot: int) -> bool:
+        # A PR beats the best e1RM of every earlier log; the first log is not one.
+        entry = self.entries.get(slot)
+        if entry is None or entry[2] is None: return False
+        previous = self.e1rm.query(0, slot)[0]
+        return previous != NO_E1RM[0] and entry[2] > previous
+
+    def slope(self) -> Optional[float]:
+        # Least-squares e1RM change per cycle.
+        n, sx, sy, sxy, sxx = self.trend
+        denominator = n * sxx - sx * sx
+        if n < 2 or denominator == 0: return None
+        return (n * sxy - sx * sy) / denominator * len(self.cells)
+
+class TrainingHistory:
+    def __init__(self, data: Optional[Dict[str, Any]] = None, program: List[List[Dict[str, Any]]] = program_structure,
+                 rules: ProgressionRules = DEFAULT_RULES):
+        self.compiled = compile_program(program)
+        self.cycle = 1
+        self.lifts: Dict[str, LiftHistory] = {}
+        self.slots: Dict[Cell, Tuple[LiftHistory, int]] = {}
+        self.sets: Dict[Cell, int] = {}
+        compiled = self.compiled
+        cells_by_name: Dict[str, List[Cell]] = {}
+        for week_idx, exercise_counts in enumerate(compiled.exercise_counts):
+            for day_idx, exercise_count in enumerate(exercise_counts):
+                for ex_idx in range(exercise_count):
+                    cell = (week_idx + 1, day_idx, ex_idx)
+                    ex = compiled.exercise(*cell)
+                    cells_by_name.setdefault(ex.name, []).append(cell)
+                    self.sets[cell] = logged_sets(ex, week_idx + 1, rules)
+        for name, cells in cells_by_name.items():
+            lift = self.lifts[name] = LiftHistory(name, cells)
+            for index, cell in enumerate(cells):
+                self.slots[cell] = (lift, index)
+        if data is not None:
+            self.load(data)
+
+    def _parse(self, key: str) -> Optional[Tuple[int, Cell]]:
+        parsed = parse_any_log_key(key)
+        return (parsed[0] or self.cycle, parsed[1:]) if parsed else None
+
+    def _entry(self, cell: Cell, value: Dict[str, Any]) -> Tuple[float, int, Optional[float]]:
+        weight, reps = value.get("actual_weight", 0) or 0, value.get("actual_reps", 0) or 0
+        return weight, reps, epley_1rm(weight, reps / self.sets[cell])
+
+    def load(self, data: Dict[str, Any]) -> None:
+        # Keys are parsed once; current-cycle logs (cycle 0) get their cycle number afterwards.
+        parsed = []
+        for key, value in data.get("logs", {}).items():
+            if not isinstance(value, dict): continue
+            cell = parse_any_log_key(key)
+            if cell is not None: parsed.append((cell[0], cell[1:], value))
+        self.cycle = max((cycle for cycle, _, _ in parsed), default=0) + 1
+        entries: Dict[str, Dict[int, Tuple[float, int, Optional[float]]]] = {name: {} for name in self.lifts}
+        for cycle, cell, value in parsed:
+            located = self.slots.get(cell)
+            if located is None: continue
+            lift, index = located
+            entries[lift.name][lift.slot(cycle or self.cycle, index)] = self._entry(cell, value)
+        for name, lift in self.lifts.items():
+            lift.rebuild(entries[name])
+
+    def load_columns(self, columns: Any) -> None:
+        # load() from a columnar.ColumnarLogs file: cells map to lifts and slots
+        # through lookup tables and e1RMs are computed on the columns, so no
+        # keys are parsed and no per-log dicts are built. Logs the file keeps
+        # as JSON (non-standard keys or fields) are skipped.
+        import numpy as np
+        compiled = self.compiled
+        cycle = columns.cycle.astype(np.int64)
+        self.cycle = int(cycle.max(initial=0)) + 1
+        cycle[cycle == 0] = self.cycle
+        weeks = compiled.week_count
+        days = max((len(names) for names in compiled.day_names), default=0)
+        exercises = max((max(counts, default=0) for counts in compiled.exercise_counts), default=0)
+        names = list(self.lifts)
+        lift_of = np.full((weeks + 1, max(days, 1), max(exercises, 1)), -1, dtype=np.int64)
+        index_of, sets_of = np.zeros_like(lift_of), np.ones_like(lift_of)
+        lift_ids = {name: i for i, name in enumerate(names)}
+        for cell, (lift, index) in self.slots.items():
+            lift_of[cell], index_of[cell], sets_of[cell] = lift_ids[lift.name], index, self.sets[cell]
+        week, day, exercise = columns.week, columns.day, columns.exercise
+        inside = (week <= weeks) & (day < days) & (exercise < exercises)
+        cells = (np.where(inside, week, 0), np.where(inside, day, 0), np.where(inside, exercise, 0))
+        lift = np.where(inside, lift_of[cells], -1)
+        weight = columns.weight
+        reps = columns.reps.astype(np.int64)
+        per_set = reps / sets_of[cells]
+        with np.errstate(invalid='ignore'):
+            e1rm = np.where((weight > 0) & (per_set >= 1), weight * (1 + per_set / 30), np.nan)
+        cell_counts = np.array([len(self.lifts[name].cells) for name in names] or [0], dtype=np.int64)
+        slot = (cycle - 1) * cell_counts[np.maximum(lift, 0)] + index_of[cells]
+        order = np.argsort(lift, kind='stable')
+        bounds = np.searchsorted(lift[order], np.arange(-1, len(names) + 1))
+        for i, name in enumerate(names):
+            rows = order[bounds[i + 1]:bounds[i + 2]]
+            self.lifts[name].rebuild_arrays(slot[rows], weight[rows], reps[rows], e1rm[rows])
+
+    def record(self, key: str, value: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Called on every save. Returns the log's e1RM and PR flag, plus the
+        # later cells of the same exercise this cycle whose PR flag may change.
+        parsed = self._parse(key)
+        if parsed is None or parsed[1] not in self.slots: return None
+        with profiler.span("history.record"):
+            cycle, cell = parsed
+            lift, index = self.slots[cell]
+            slot = lift.slot(cycle, index)
+            weight, reps, e1rm = self._entry(cell, value)
+            lift.put(slot, weight, reps, e1rm)
+            later = [c for i, c in enumerate(lift.cells) if i > index and lift.slot(cycle, i) in lift.entries]
+            return {"name": lift.name, "e1rm": e1rm, "pr": lift.is_pr(slot), "changed": later}
+
+    def remove(self, key: str) -> Optional[Dict[str, Any]]:
+        # A log taken back (undo); returns like record().
+        parsed = self._parse(key)
+        if parsed is None or parsed[1] not in self.slots: return None
+        cycle, cell = parsed
+        lift, index = self.slots[cell]
+        lift.drop(lift.slot(cycle, index))
+        later = [c for i, c in enumerate(lift.cells) if i > index and lift.slot(cycle, i) in lift.entries]
+        return {"name": lift.name, "e1rm": None, "pr": False, "changed": later}
+
+    def start_new_cycle(self) -> int:
+        self.cycle += 1
+        return self.cycle
+
+    # --- Queries ---
+    def is_pr(self, week_num: int, day_idx: int, ex_idx: int, cycle: Optional[int] = None) -> bool:
+        located = self.slots.get((week_num, day_idx, ex_idx))
+        if located is None: return False
+        lift, index = located
+        return lift.is_pr(lift.slot(cycle or self.cycle, index))
+
+    def summary(self, name: str, first_cycle: int = 1, last_cycle: Optional[int] = None) -> Dict[str, Any]:
+        # Totals and best set over cycles first_cycle..last_cycle (inclusive).
+        lift = self.lifts[name]
+        start, end = lift.slot(first_cycle, 0), lift.slot((last_cycle or self.cycle) + 1, 0)
+        best_e1rm, best_slot = lift.e1rm.query(start, end)
+        best_set = None
+        if best_slot >= 0:
+            cycle, index = divmod(best_slot, len(lift.cells))
+            week_num, day_idx, ex_idx = lift.cells[index]
+            weight, reps, _ = lift.entries[best_slot]
+            best_set = {"cycle": cycle + 1, "week": week_num, "day": day_idx, "exercise": ex_idx,
+                        "weight": weight, "reps": reps, "e1rm": best_e1rm}
+        return {
+            "tonnage": lift.tonnage.range(start, end),
+            "volume": lift.volume.range(start, end),
+            "best_set": best_set,
+            "e1rm_slope": lift.slope(),
+        }
+
+    def e1rm_trend(self, name: str) -> List[Tuple[int, Optional[float]]]:
+        # Best e1RM of each cycle, for progress charts.
+        lift = self.lifts[name]
+        trend = []
+        for cycle in range(1, self.cycle + 1):
+            best = lift.e1rm.query(lift.slot(cycle, 0), lift.slot(cycle + 1, 0))[0]
+            trend.append((cycle, None if best == NO_E1RM[0] else best))
+        return trend
+
+def archive_cycle(data: Dict[str, Any]) -> Dict[str, Any]:
+    # New document with the current cycle's logs moved under history keys,
+    # leaving an empty current cycle.
+    logs = data.get("logs", {})
+    cycle = current_cycle(logs)
+    archived = {}
+    for key, value in logs.items():
+        cell = parse_log_key(key)
+        archived[history_key(cycle, *cell) if cell else key] = value
+    return {**data, "logs": archived}
@@ -0,0 +1,363 @@
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Set, Tuple
+
+from program import BACKUP_DIR, DATA_FILE, DB_FILE, STORAGE_BACKEND
+from storage import DataStore, write_json_atomic, _fsync_dir
+from profiling import profiler
+
+# --- Incremental Backups ---
+# Snapshots of the whole document, taken by a DataStore hook before every
+# replace() and before set() overwrites an entry once the last snapshot is
+# SNAPSHOT_INTERVAL old. Each dict section is cut into chunks of related
+# entries (chunk_group: one day of logs, so archived cycles never change)
+# stored zlib-compressed under the SHA-256 of their JSON in
+# BACKUP_DIR/chunks, so a chunk shared by many snapshots is stored once.
+# Chunks are listed by tree chunks (tree_group: one cycle or week), stored
+# the same way, and a snapshot is a manifest of tree digests in
+# BACKUP_DIR/snapshots, named by its time in ms so restoring by time is a
+# bisect. A snapshot thus writes only what changed. Backups follows the
+# store's changes and re-encodes only the chunks they touched; the first
+# snapshot of a session encodes everything but writes only new chunks.
+# The hook runs on the thread that writes, so it only captures the data (a
+# shallow copy of each section the first time, then the entries changed
+# since) and a worker thread encodes, compresses and writes the snapshot.
+# Retention keeps the newest KEEP_RECENT snapshots and the newest of each
+# day and week for a while, then drops chunks no kept snapshot uses.
+SNAPSHOT_INTERVAL = 600.0   # seconds; replace() snapshots regardless
+KEEP_RECENT = 50            # newest snapshots always kept
+KEEP_DAYS = 30              # newest snapshot of each of the last KEEP_DAYS days
+KEEP_WEEKS = 26             # newest snapshot of each of the last KEEP_WEEKS weeks
+PRUNE_EVERY = 16            # snapshots between retention passes
+CHUNKS_DIR = "chunks"
+SNAPSHOTS_DIR = "snapshots"
+DAY = 86400
+ABSENT = object()           # a captured entry that was removed
+
+def chunk_group(key: str) -> str:
+    # "Cycle2_Week3_Day1_Ex4" -> "Cycle2_Week3_Day1"; keys without "_" (1RMs) share "".
+    return key.rpartition("_")[0]
+
+def tree_group(group: str) -> str:
+    # "Cycle2_Week3_Day1" -> "Cycle2"
+    return group.partition("_")[0]
+
+def encode_chunk(entries: Dict[str, Any]) -> Tuple[str, bytes]:
+    raw = json.dumps(entries, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(raw).hexdigest(), raw
+
+def retained(stamps: List[int], now: float) -> Set[int]:
+    # Snapshot times (ms, oldest first) kept at `now` (seconds).
+    kept = set(stamps[-KEEP_RECENT:])
+    days: Set[int] = set()
+    weeks: Set[int] = set()
+    for stamp in reversed(stamps):
+        age, day = now - stamp / 1000, stamp // 1000 // DAY
+        if age <= KEEP_DAYS * DAY and day not in days:
+            days.add(day)
+            kept.add(stamp)
+        if age <= KEEP_WEEKS * 7 * DAY and day // 7 not in weeks:
+            weeks.add(day // 7)
+            kept.add(stamp)
+    return kept
+
+# (full copy or None, changed entries or None, dict section names, other values)
+Capture = Tuple[Optional[Dict[str, Dict[str, Any]]], Optional[Dict[Tuple[str, str], Any]], List[str], Dict[str, Any]]
+
+def format_stamp(stamp: int) -> str:
+    return datetime.fromtimestamp(stamp / 1000).strftime("%Y-%m-%d %H:%M:%S")
+
+class Backups:
+    def __init__(self, path: str = BACKUP_DIR, interval: float = SNAPSHOT_INTERVAL, clock: Callable[[], float] = time.time,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.path = path
+        self.chunks_path = os.path.join(path, CHUNKS_DIR)
+        self.snapshots_path = os.path.join(path, SNAPSHOTS_DIR)
+        self.interval = interval
+        self.clock = clock
+        self.on_error = on_error
+        self._stamps: Optional[List[int]] = None                    # listed on first use
+        self._last: Optional[float] = None                          # time of the last capture, in seconds
+        self._changes: Optional[Set[Tuple[str, str]]] = None        # entries changed since the last capture
+        self._jobs: List[Tuple[Capture, str, float]] = []           # captures the worker has yet to write
+        self._thread: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()                               # held while a snapshot is written
+        # The rest belongs to whichever thread holds _lock.
+        self._mirror: Dict[str, Dict[str, Any]] = {}                # section -> entries, as of the last capture
+        self._groups: Optional[Dict[str, Dict[str, Set[str]]]] = None  # section -> group -> keys, from the first snapshot
+        self._digests: Dict[Tuple[str, str], Dict[str, str]] = {}   # (section, tree group) -> group -> digest at the last snapshot
+        self._trees: Dict[Tuple[str, str], str] = {}                # (section, tree group) -> digest of that listing
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._since_prune = 0
+
+    def watch(self, store: DataStore) -> None:
+        store.bind_changed(self.mark)
+        store.bind_overwriting(self.before_overwrite)
+
+    def mark(self, changed: List[Tuple[str, str]], removed: List[Tuple[str, str]]) -> None:
+        if self._changes is None: return  # the first capture copies everything anyway
+        self._changes.update(changed)
+        self._changes.update(removed)
+
+    def before_overwrite(self, data: Dict[str, Any], entry: Optional[Tuple[str, str]]) -> None:
+        # entry is None before replace(). Only the capture happens here; the
+        # worker writes the snapshot and a failure there never blocks the write.
+        now = self.clock()
+        if self._last is None:
+            stamps = self.stamps()
+            self._last = stamps[-1] / 1000 if stamps else float("-inf")
+        if entry is not None and now - self._last < self.interval: return
+        self._last = now
+        job = (self._capture(data), "replace" if entry is None else f"overwrite {entry[0]}/{entry[1]}", now)
+        with self._cond:
+            self._jobs.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="BackupSnapshot", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def wait(self) -> None:
+        # Until the worker has written every snapshot queued so far.
+        with self._cond:
+            while self._jobs:
+                self._cond.wait()
+
+    def snapshot(self, data: Dict[str, Any], reason: str = "") -> int:
+        # Snapshots data on this thread, after any queued ones; returns its time in ms.
+        self.wait()
+        now = self._last = self.clock()
+        return self._write(self._capture(data), reason, now)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                capture, reason, now = self._jobs[0]
+            try: self._write(capture, reason, now)
+            except (OSError, ValueError) as e:
+                if self.on_error is not None: self.on_error(e)
+            with self._cond:
+                del self._jobs[0]
+                self._cond.notify_all()
+
+    def _capture(self, data: Dict[str, Any]) -> 'Capture':
+        # What a snapshot of data needs, copied now since data changes once
+        # the hook returns: a shallow copy of every section the first time
+        # (entries are replaced, never changed in place), then only the
+        # entries marked since.
+        sections = [section for section, values in data.items() if isinstance(values, dict)]
+        values = {section: values for section, values in data.items() if not isinstance(values, dict)}
+        if self._changes is None:
+            self._changes = set()
+            return {section: dict(data[section]) for section in sections}, None, sections, values
+        changes, self._changes = self._changes, set()
+        entries = {}
+        for section, key in changes:
+            section_values = data.get(section)
+            entries[section, key] = section_values.get(key, ABSENT) if isinstance(section_values, dict) else ABSENT
+        return None, entries, sections, values
+
+    def _write(self, capture: 'Capture', reason: str, now: float) -> int:
+        with self._lock:
+            return self._write_locked(capture, reason, now)
+
+    def _write_locked(self, capture: 'Capture', reason: str, now: float) -> int:
+        start = time.perf_counter()
+        full, changes, section_names, other_values = capture
+        if full is not None:
+            self._mirror = full
+            self._groups = {}
+            for section, entries in full.items():
+                groups = self._groups[section] = {}
+                for key in entries: groups.setdefault(chunk_group(key), set()).add(key)
+            self._dirty = {(section, group) for section, groups in self._groups.items() for group in groups}
+        else:
+            for (section, key), value in changes.items():
+                group = chunk_group(key)
+                if value is ABSENT:
+                    self._mirror.get(section, {}).pop(key, None)
+                    self._groups.get(section, {}).get(group, set()).discard(key)
+                else:
+                    self._mirror.setdefault(section, {})[key] = value
+                    self._groups.setdefault(section, {}).setdefault(group, set()).add(key)
+                self._dirty.add((section, group))
+        data = self._mirror
+        written, trees = 0, set()
+        for section, group in self._dirty:
+            values, keys = data.get(section), self._groups.get(section, {}).get(group)
+            entries = {key: values[key] for key in keys if key in values} if isinstance(values, dict) and keys else {}
+            tree = (section, tree_group(group))
+            trees.add(tree)
+            if not entries:
+                self._digests.get(tree, {}).pop(group, None)
+                self._groups.get(section, {}).pop(group, None)
+                continue
+            digest, raw = encode_chunk(entries)
+            written += self._write_chunk(digest, raw)
+            self._digests.setdefault(tree, {})[group] = digest
+        for tree in trees:
+            listing = self._digests.get(tree)
+            if not listing:
+                self._digests.pop(tree, None)
+                self._trees.pop(tree, None)
+                continue
+            digest, raw = encode_chunk(listing)
+            written += self._write_chunk(digest, raw)
+            self._trees[tree] = digest
+        self._dirty = set()
+
+        sections: Dict[str, Dict[str, str]] = {section: {} for section in section_names}
+        for (section, top), digest in self._trees.items():
+            sections.setdefault(section, {})[top] = digest
+        stamps = self.stamps()
+        stamp = max(int(now * 1000), stamps[-1] + 1 if stamps else 0)
+        manifest = {"time": now, "reason": reason, "sections": sections, "values": other_values}
+        os.makedirs(self.snapshots_path, exist_ok=True)
+        write_json_atomic(os.path.join(self.snapshots_path, f"{stamp:013d}.json"), manifest)
+        stamps.append(stamp)
+        profiler.record("backups.snapshot", start, time.perf_counter())
+        profiler.count("backups.chunks_written", written)
+        self._since_prune += 1
+        if self._since_prune >= PRUNE_EVERY: self.prune(now)
+        return stamp
+
+    def stamps(self) -> List[int]:
+        # Snapshot times in ms, oldest first.
+        if self._stamps is None:
+            names = os.listdir(self.snapshots_path) if os.path.isdir(self.snapshots_path) else []
+            self._stamps = sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].isdigit())
+        return self._stamps
+
+    def find(self, when: float) -> Optional[int]:
+        # The newest snapshot taken at or before `when` (seconds since the epoch).
+        stamps = self.stamps()
+        i = bisect.bisect_right(stamps, int(when * 1000))
+        return stamps[i - 1] if i else None
+
+    def manifest(self, stamp: int) -> Dict[str, Any]:
+        with open(os.path.join(self.snapshots_path, f"{stamp:013d}.json")) as f:
+            try: return json.load(f)
+            except ValueError as e: raise ValueError(f"snapshot {format_stamp(stamp)}: not valid JSON: {e}") from None
+
+    def load(self, stamp: int) -> Dict[str, Any]:
+        manifest = self.manifest(stamp)
+        data = dict(manifest.get("values", {}))
+        for section, trees in manifest["sections"].items():
+            values = data[section] = {}
+            for tree in trees.values():
+                for digest in self._read_chunk(tree).values():
+                    values.update(self._read_chunk(digest))
+        return data
+
+    def restore(self, when: float) -> Dict[str, Any]:
+        # The document as of `when`; raises ValueError if no snapshot is that old.
+        stamp = self.find(when)
+        if stamp is None: raise ValueError(f"no snapshot at or before {format_stamp(int(when * 1000))}")
+        return self.load(stamp)
+
+    def prune(self, now: Optional[float] = None) -> Tuple[int, int]:
+        # Drops snapshots outside the retention policy, then chunks no kept
+        # snapshot (or the next one) uses; returns how many of each went.
+        self._since_prune = 0
+        stamps = self.stamps()
+        kept = retained(stamps, self.clock() if now is None else now)
+        dropped = [stamp for stamp in stamps if stamp not in kept]
+        if not dropped: return 0, 0
+        for stamp in dropped:
+            os.remove(os.path.join(self.snapshots_path, f"{stamp:013d}.json"))
+        stamps[:] = [stamp for stamp in stamps if stamp in kept]
+        trees = set(self._trees.values())
+        for stamp in stamps:
+            for listed in self.manifest(stamp)["sections"].values():
+                trees.update(listed.values())
+        used = set(trees)
+        for tree in trees:
+            used.update(self._read_chunk(tree).values())
+        removed = 0
+        for name in os.listdir(self.chunks_path):
+            if name not in used:
+                os.remove(os.path.join(self.chunks_path, name))
+                removed += 1
+        return len(dropped), removed
+
+    def _write_chunk(self, digest: str, raw: bytes) -> int:
+        path = os.path.join(self.chunks_path, digest)
+        if os.path.exists(path): return 0
+        os.makedirs(self.chunks_path, exist_ok=True)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(zlib.compress(raw))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_dir(path)
+        return 1
+
+    def _read_chunk(self, digest: str) -> Dict[str, Any]:
+        with open(os.path.join(self.chunks_path, digest), 'rb') as f:
+            try: raw = zlib.decompress(f.read())
+            except zlib.error as e: raise ValueError(f"chunk {digest[:12]}: {e}") from None
+        if hashlib.sha256(raw).hexdigest() != digest: raise ValueError(f"chunk {digest[:12]}: content does not match its digest")
+        return json.loads(raw)
+
+def parse_when(text: str) -> float:
+    # "2026-10-18", "2026-10-18 14:30" (local time) or seconds since the epoch.
+    try: return float(text)
+    except ValueError: pass
+    try: return datetime.fromisoformat(text).timestamp()
+    except ValueError: raise ValueError(f"can't read time '{text}', expected YYYY-MM-DD[ HH:MM[:SS]]") from None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backups", description="List, restore and prune data file snapshots.")
+    parser.add_argument("command", choices=["list", "restore", "prune"],
+                        help="restore: replace the data with the newest snapshot at or before WHEN (itself snapshotted first)")
+    parser.add_argument("when", nargs="?", help="YYYY-MM-DD[ HH:MM[:SS]] local time, or seconds since the epoch")
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=STORAGE_BACKEND)
+    parser.add_argument("--data", help=f"data file (default: {DATA_FILE} or {DB_FILE})")
+    parser.add_argument("--dir", default=None, help=f"backup directory (default: {BACKUP_DIR} next to the data file)")
+    args = parser.parse_args(argv)
+    if args.command == "restore" and args.when is None: parser.error("restore needs WHEN")
+
+    data_dir = os.path.dirname(os.path.abspath(args.data)) if args.data else "."
+    backups = Backups(args.dir or os.path.join(data_dir, BACKUP_DIR),
+                      on_error=lambda e: print(f"backups: could not snapshot the current data: {e}", file=sys.stderr))
+    try:
+        if args.command == "list":
+            for stamp in backups.stamps():
+                manifest = backups.manifest(stamp)
+                sections = ", ".join(sorted(manifest["sections"]))
+                print(f"{format_stamp(stamp)}  {manifest.get('reason', '')}  ({sections})")
+        elif args.command == "prune":
+            dropped, removed = backups.prune()
+            print(f"backups: dropped {dropped} snapshots and {removed} chunks", file=sys.stderr)
+        else:
+            stamp = backups.find(parse_when(args.when))
+            if stamp is None: raise ValueError(f"no snapshot at or before {args.when}")
+            data = backups.load(stamp)
+            from importer import open_backend, BATCH_SIZE
+            store = DataStore(open_backend(args.backend, args.data, BATCH_SIZE), schedule=lambda callback: callback())
+            store.load()
+            backups.watch(store)
+            try: store.replace(data)
+            finally:
+                store.close()
+                backups.wait()
+            logs = len(data.get("logs", {}))
+            print(f"backups: restored {format_stamp(stamp)} ({logs} logs); "
+                  f"the data it replaced is snapshot {format_stamp(backups.stamps()[-1])}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"backups: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
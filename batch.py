@@ -0,0 +1,186 @@
+from typing import Dict, Any, List, Tuple, Optional
+
+import numpy as np
+
+from program import (
+    DEFAULT_RULES, DEFAULT_1RM_VALUES, ProgressionRules, program_structure, compile_program, lift_names,
+    log_key, parse_log_key,
+)
+from engine import (
+    PLAN_OTHER, PLAN_MAIN, PLAN_PULLUP, PLAN_ACCESSORY, PHASE_NONE, PHASE_FIRST, PHASE_PROGRESS, PHASE_DELOAD,
+    compile_plans,
+)
+
+# --- Batch Plan Computation ---
+# Computes targets for many athletes at once with the same rules as
+# PlanEngine/get_pullup_suggestion_new: the tables come from the engine's plan
+# table for the program and ProgressionRules (for a program_loader
+# ProgramDefinition, pass its structure, rules and default_1rm). Logged
+# weights and reps are arrays shaped (athletes, weeks, days, exercises) with 0
+# for missing logs; 1RMs are shaped (athletes, len(lift_names(program, rules))).
+LIFT_NAMES = lift_names()   # the built-in program's 1RM columns
+
+TYPE_OTHER, TYPE_MAIN, TYPE_PULLUP, TYPE_ACCESSORY = PLAN_OTHER, PLAN_MAIN, PLAN_PULLUP, PLAN_ACCESSORY
+
+# pullup_decision codes, one per branch of get_pullup_suggestion_new
+PULLUP_NONE = -1            # not a pull-up cell
+PULLUP_NEGATIVES = 0        # max reps 0
+PULLUP_LOW_REP = 1          # max reps 1-pullup_low_rep_max
+PULLUP_BODYWEIGHT = 2       # week 1
+PULLUP_ADD_WEIGHT = 3       # avg reps/set above threshold
+PULLUP_REPEAT = 4           # avg reps/set at or below threshold
+PULLUP_DELOAD_WEIGHTED = 5
+PULLUP_DELOAD_BODYWEIGHT = 6
+PULLUP_DELOAD_REPS = 7
+PULLUP_DELOAD_LIGHT = 8
+
+def round_to_nearest_array(values: np.ndarray, base: float) -> np.ndarray:
+    # np.round rounds half to even like the built-in round() used by round_to_nearest.
+    if base <= 0: return values
+    return np.round(values / base) * base
+
+# Keyed by (id(program), rules); the program itself is kept alongside so the id stays valid.
+_table_cache: Dict[Tuple[int, ProgressionRules], Tuple[Any, Dict[str, Any]]] = {}
+
+def program_tables(program: List[List[Dict[str, Any]]] = program_structure,
+                   rules: ProgressionRules = DEFAULT_RULES) -> Dict[str, Any]:
+    key = (id(program), rules)
+    cached = _table_cache.get(key)
+    if cached is None:
+        cached = _table_cache[key] = (program, _build_tables(program, rules))
+    return cached[1]
+
+def _build_tables(program: List[List[Dict[str, Any]]], rules: ProgressionRules) -> Dict[str, Any]:
+    compiled = compile_program(program)
+    plans = compile_plans(compiled, rules)
+    names = lift_names(program, rules)
+    weeks = compiled.week_count
+    days = max(len(counts) for counts in compiled.exercise_counts)
+    exercises = max(max(counts) for counts in compiled.exercise_counts)
+    kind = np.full((weeks, days, exercises), TYPE_OTHER, dtype=np.int8)
+    phase = np.full((weeks, days, exercises), PHASE_NONE, dtype=np.int8)
+    lift = np.zeros((weeks, days, exercises), dtype=np.intp)
+    prev_target_total = np.zeros((weeks, days, exercises), dtype=np.int64)
+    for w, counts in enumerate(compiled.exercise_counts):
+        for d, count in enumerate(counts):
+            for e in range(count):
+                plan = plans[compiled.offsets[w][d] + e]
+                kind[w, d, e], phase[w, d, e] = plan.kind, plan.phase
+                if plan.input_name is not None: lift[w, d, e] = names.index(plan.input_name)
+                prev_target_total[w, d, e] = plan.prev_target_total
+    # Both the main-lift and pull-up branches read week N-1; week 1 pull-ups read week 1.
+    prev_week = np.array([max(w - 1, 0) for w in range(weeks)], dtype=np.intp)
+    return {"kind": kind, "phase": phase, "lift": lift, "prev_target_total": prev_target_total,
+            "prev_week": prev_week, "lift_names": names}
+
+def compute_targets(
+    one_rms: np.ndarray,
+    actual_weights: np.ndarray,
+    actual_reps: np.ndarray,
+    program: List[List[Dict[str, Any]]] = program_structure,
+    rules: ProgressionRules = DEFAULT_RULES,
+) -> Dict[str, np.ndarray]:
+    # Returns target_weight (NaN for "User Choice" accessory cells),
+    # main_lift_success and pullup_decision, all shaped like actual_weights.
+    tables = program_tables(program, rules)
+    kind, phase, prev_week = tables["kind"], tables["phase"], tables["prev_week"]
+    one_rms = np.asarray(one_rms, dtype=np.float64)
+    actual_weights = np.asarray(actual_weights, dtype=np.float64)
+    actual_reps = np.asarray(actual_reps, dtype=np.float64)
+    weeks = kind.shape[0]
+
+    week = np.arange(1, weeks + 1).reshape(1, weeks, 1, 1)
+    one_rm = one_rms[:, tables["lift"]]
+    prev_wt = actual_weights[:, prev_week]
+    prev_reps = actual_reps[:, prev_week]
+    is_main = kind == TYPE_MAIN
+    is_pullup = kind == TYPE_PULLUP
+
+    # Main lifts: week 1 at a fixed %1RM, then off the previous week's actuals
+    # until the deload week's %1RM; each cell's phase comes from its plan.
+    base_wt = np.where(prev_wt != 0, prev_wt, one_rm * rules.week1_percent)
+    prev_total = tables["prev_target_total"]
+    success = (phase == PHASE_PROGRESS) & (prev_reps >= prev_total) & (prev_total > 0)
+    main_wt = np.where(success, base_wt * (1 + rules.increment_on_success), base_wt)
+    main_wt = np.where(phase == PHASE_FIRST, one_rm * rules.week1_percent, main_wt)
+    main_wt = np.where(phase == PHASE_DELOAD, one_rm * rules.deload_percent, main_wt)
+    main_wt = round_to_nearest_array(main_wt, rules.weight_rounding)
+    main_wt = np.where(phase != PHASE_NONE, main_wt, 0.0)
+
+    # Pull-ups, following get_pullup_suggestion_new branch by branch.
+    max_reps = one_rm
+    avg_reps = prev_reps / rules.pullup_sets if rules.pullup_sets > 0 else np.zeros_like(prev_reps)
+    add = avg_reps > rules.pullup_threshold
+    pull_wt = np.where(week > 1, np.where(add, prev_wt + rules.pullup_increment, prev_wt), 0.0)
+    decision = np.where(week > 1, np.where(add, PULLUP_ADD_WEIGHT, PULLUP_REPEAT), PULLUP_BODYWEIGHT)
+    negatives = max_reps == 0
+    low_rep = (max_reps >= 1) & (max_reps <= rules.pullup_low_rep_max)
+    pull_wt = np.where(negatives | low_rep, 0.0, pull_wt)
+    decision = np.where(negatives, PULLUP_NEGATIVES, np.where(low_rep, PULLUP_LOW_REP, decision))
+    deload = week == rules.deload_week
+    weighted = prev_wt > 0
+    heavy = weighted & (prev_wt > rules.pullup_increment * 2)
+    deload_wt = np.where(heavy, round_to_nearest_array(prev_wt * rules.deload_percent, rules.weight_rounding), 0.0)
+    deload_decision = np.where(heavy, PULLUP_DELOAD_WEIGHTED,
+                      np.where(weighted, PULLUP_DELOAD_BODYWEIGHT,
+                      np.where(prev_reps > 0, PULLUP_DELOAD_REPS, PULLUP_DELOAD_LIGHT)))
+    pull_wt = np.where(deload, deload_wt, pull_wt)
+    decision = np.where(deload, deload_decision, decision)
+
+    target = np.where(is_main, main_wt, np.where(is_pullup, pull_wt, np.where(kind == TYPE_ACCESSORY, np.nan, 0.0)))
+    return {
+        "target_weight": target,
+        "main_lift_success": success & is_main,
+        "pullup_decision": np.where(is_pullup, decision, PULLUP_NONE).astype(np.int8),
+    }
+
+def arrays_from_data(datasets: List[Dict[str, Any]], program: List[List[Dict[str, Any]]] = program_structure,
+                     defaults: Optional[Dict[str, float]] = None,
+                     rules: ProgressionRules = DEFAULT_RULES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Packs workout_data.json documents into the (athletes, weeks, days, exercises) arrays.
+    defaults = DEFAULT_1RM_VALUES if defaults is None else defaults
+    tables = program_tables(program, rules)
+    names = tables["lift_names"]
+    weeks, days, exercises = tables["kind"].shape
+    one_rms = np.zeros((len(datasets), len(names)))
+    weights = np.zeros((len(datasets), weeks, days, exercises))
+    reps = np.zeros((len(datasets), weeks, days, exercises))
+    for a, data in enumerate(datasets):
+        for i, name in enumerate(names):
+            one_rms[a, i] = data.get("1RM", {}).get(name, defaults.get(name, 0))
+        logs = data.get("logs", {})
+        for w in range(weeks):
+            for d in range(days):
+                for e in range(exercises):
+                    entry = logs.get(log_key(w + 1, d, e))
+                    if entry:
+                        weights[a, w, d, e] = entry.get("actual_weight", 0)
+                        reps[a, w, d, e] = entry.get("actual_reps", 0)
+    return one_rms, weights, reps
+
+def arrays_from_columns(files: List[Any], program: List[List[Dict[str, Any]]] = program_structure,
+                        defaults: Optional[Dict[str, float]] = None,
+                        rules: ProgressionRules = DEFAULT_RULES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # arrays_from_data() for columnar.ColumnarLogs files: the current cycle's
+    # rows are scattered straight from the column views.
+    defaults = DEFAULT_1RM_VALUES if defaults is None else defaults
+    tables = program_tables(program, rules)
+    names = tables["lift_names"]
+    weeks, days, exercises = tables["kind"].shape
+    one_rms = np.zeros((len(files), len(names)))
+    weights = np.zeros((len(files), weeks, days, exercises))
+    reps = np.zeros((len(files), weeks, days, exercises))
+    for a, columns in enumerate(files):
+        for i, name in enumerate(names):
+            one_rms[a, i] = columns.extra.get("1RM", {}).get(name, defaults.get(name, 0))
+        rows = columns.current()
+        w, d, e = columns.week[rows].astype(np.intp) - 1, columns.day[rows].astype(np.intp), columns.exercise[rows].astype(np.intp)
+        inside = (w >= 0) & (w < weeks) & (d < days) & (e < exercises)
+        weights[a, w[inside], d[inside], e[inside]] = columns.weight[rows][inside]
+        reps[a, w[inside], d[inside], e[inside]] = columns.reps[rows][inside]
+        for key, entry in columns.extra.get("logs", {}).items():
+            cell = parse_log_key(key)
+            if cell and entry and cell[0] - 1 < weeks and cell[1] < days and cell[2] < exercises and cell[0] >= 1:
+                weights[a, cell[0] - 1, cell[1], cell[2]] = entry.get("actual_weight", 0)
+                reps[a, cell[0] - 1, cell[1], cell[2]] = entry.get("actual_reps", 0)
+    return one_rms, weights, reps
@@ -0,0 +1,50 @@
+# Lookup cost of the compiled program against nested-dict access.
+# Run from the repo root: python -m benchmarks.bench_program
+import sys
+import timeit
+import tracemalloc
+
+from program import (
+    program_structure, compiled_program, build_program_structure, CompiledProgram,
+    get_numeric_sets, get_target_reps,
+)
+
+CELLS = [(w, d, e) for w in range(1, 7) for d in range(4) for e in range(5)]
+
+def nested_dict_lookup():
+    total = 0
+    for w, d, e in CELLS:
+        ex_data = program_structure[w-1][d]['exercises'][e]
+        total += get_numeric_sets(ex_data['sets']) * get_target_reps(ex_data['reps'])
+    return total
+
+def compiled_lookup():
+    total = 0
+    exercise = compiled_program.exercise
+    for w, d, e in CELLS:
+        ex = exercise(w, d, e)
+        total += ex.sets_range[0] * ex.reps_range[0]
+    return total
+
+def allocated(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+def main(number: int = 2000):
+    results = {}
+    for label, fn in (("nested_dict", nested_dict_lookup), ("compiled", compiled_lookup)):
+        seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        results[label] = seconds / len(CELLS) * 1e9
+        print(f"{label:12s} {results[label]:8.1f} ns/lookup")
+    print(f"{'speedup':12s} {results['nested_dict'] / results['compiled']:8.2f}x")
+    print(f"{'memory':12s} nested {allocated(build_program_structure)} B, "
+          f"compiled {allocated(lambda: CompiledProgram(program_structure))} B")
+    return results
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
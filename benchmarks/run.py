@@ -0,0 +1,419 @@
+# Benchmark suite for the hot paths: progression helpers, program file
+# loading, week target computation, save_log round trips, training history
+# analytics, backup snapshots, undo steps and week-screen widget construction.
+# Results are written as JSON; compare against benchmarks/baseline.json to
+# catch regressions.
+#
+#   python -m benchmarks.run --quick --compare
+#   python -m benchmarks.run --save-baseline
+#   python -m benchmarks.run --only save_log --output results.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+import backups
+import columnar
+import plates
+import program_loader
+import undo
+from benchmarks import bench_program
+from analytics import TrainingHistory
+from benchmarks.synthetic import synthetic_data, CELLS
+from engine import PlanEngine
+from program import (
+    PULLUP_EXERCISE_NAME, WEIGHT_ROUNDING, program_structure, round_to_nearest,
+    get_target_reps, get_numeric_sets, get_pullup_suggestion_new, log_key, safe_float, safe_int,
+)
+from storage import JournalStore, DataStore, write_json_atomic
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PROGRAM_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), program_loader.PROGRAM_FILE)
+SIZES = (10, 1000, 100000, 1000000)
+QUICK_SIZES = (10, 1000, 100000)
+THRESHOLD = 1.5             # slower than baseline by more than 50% is a regression
+MIN_TIME = 0.05             # seconds per timing run
+
+Result = Dict[str, Any]
+
+def measure(fn: Callable[[], Any], ops: int = 1, repeat: int = 7, min_time: float = MIN_TIME) -> Result:
+    # Per-operation time in microseconds; fn performs `ops` operations per call.
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1 << 20: break
+        number *= 2 if elapsed > min_time / 10 else 10
+    runs = [elapsed] + timer.repeat(repeat=repeat - 1, number=number) if repeat > 1 else [elapsed]
+    per_op = [run / number / ops * 1e6 for run in runs]
+    return {"us": min(per_op), "median_us": statistics.median(per_op), "number": number * ops, "repeat": len(runs)}
+
+# --- Progression helpers ---
+REPS_VALUES = [ex['reps'] for week in program_structure for day in week for ex in day['exercises']]
+SETS_VALUES = [ex['sets'] for week in program_structure for day in week for ex in day['exercises']]
+ROUNDING_VALUES = [i * 1.37 for i in range(1000)]
+PULLUP_CASES = [(week, max_reps, prev_wt, prev_reps)
+                for week in range(1, 7) for max_reps in (0, 5, 12)
+                for prev_wt, prev_reps in ((0.0, 0), (0.0, 40), (5.0, 30), (25.0, 45))]
+
+def bench_helpers() -> Dict[str, Result]:
+    def rounding():
+        for value in ROUNDING_VALUES: round_to_nearest(value, WEIGHT_ROUNDING)
+    def target_reps():
+        for value in REPS_VALUES: get_target_reps(value)
+    def numeric_sets():
+        for value in SETS_VALUES: get_numeric_sets(value)
+    def pullups():
+        for case in PULLUP_CASES: get_pullup_suggestion_new(*case)
+    def plate_loadouts():
+        for value in ROUNDING_VALUES: plates.loadout("Back Squat", value)
+    return {
+        "helpers.round_to_nearest": measure(rounding, len(ROUNDING_VALUES)),
+        "helpers.get_target_reps": measure(target_reps, len(REPS_VALUES)),
+        "helpers.get_numeric_sets": measure(numeric_sets, len(SETS_VALUES)),
+        "helpers.get_pullup_suggestion_new": measure(pullups, len(PULLUP_CASES)),
+        "helpers.plate_loadout": measure(plate_loadouts, len(ROUNDING_VALUES)),
+        "program.lookup_nested": measure(bench_program.nested_dict_lookup, len(bench_program.CELLS)),
+        "program.lookup_compiled": measure(bench_program.compiled_lookup, len(bench_program.CELLS)),
+    }
+
+# --- Program files ---
+def bench_programs(directory: str) -> Dict[str, Result]:
+    # Parsing, validating and compiling the program file against loading the
+    # compiled tables from the disk cache (the in-process cache is cleared).
+    cache_dir = os.path.join(directory, program_loader.CACHE_DIR)
+    def parse():
+        program_loader._loaded.clear()
+        program_loader.load_program(PROGRAM_PATH, cache_dir=None)
+    def cached():
+        program_loader._loaded.clear()
+        program_loader.load_program(PROGRAM_PATH, cache_dir)
+    cached()
+    return {
+        "program.load_parse": measure(parse),
+        "program.load_cached": measure(cached),
+    }
+
+# --- Week computation ---
+def bench_week(sizes: Tuple[int, ...]) -> Dict[str, Result]:
+    results = {}
+    for size in sizes:
+        data = synthetic_data(size)
+        def cold():
+            # First entry into a week: load the document and compute every cell.
+            engine = PlanEngine()
+            engine.load(data)
+            for week_num in range(1, 7): engine.week(week_num)
+        warm_engine = PlanEngine(data)
+        for week_num in range(1, 7): warm_engine.week(week_num)
+        def warm():
+            # Re-entering with unchanged data only diffs and reads the cache.
+            warm_engine.load(data)
+            warm_engine.week(3)
+        results[f"week.all_weeks_cold[{size}]"] = measure(cold, repeat=3 if size >= 100000 else 5)
+        results[f"week.reenter_warm[{size}]"] = measure(warm, repeat=3 if size >= 100000 else 5)
+    return results
+
+# --- save_log round trip ---
+def legacy_save_log(path: str, week_num: int, day_idx: int, ex_idx: int, actual_weight: str, actual_reps: str) -> None:
+    # What save_log did before the journal: read, patch and rewrite the whole file.
+    with open(path, 'r') as f:
+        data = json.load(f)
+    data["logs"][log_key(week_num, day_idx, ex_idx)] = {
+        "actual_weight": safe_float(actual_weight, 0.0),
+        "actual_reps": safe_int(actual_reps, 0)
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+def bench_save_log(sizes: Tuple[int, ...], directory: str) -> Dict[str, Result]:
+    results = {}
+    for size in sizes:
+        data = synthetic_data(size)
+        path = os.path.join(directory, f"save_{size}.json")
+        write_json_atomic(path, data)
+        cells = iter(CELLS * 100000)
+
+        def legacy():
+            week_num, day_idx, ex_idx = next(cells)
+            legacy_save_log(path, week_num, day_idx, ex_idx, "135", "25")
+        repeat = 3 if size >= 100000 else 5
+        results[f"save_log.legacy_rewrite[{size}]"] = measure(legacy, repeat=repeat, min_time=0 if size >= 1000000 else MIN_TIME)
+
+        write_json_atomic(path, data)
+        store = DataStore(JournalStore(path), schedule=lambda callback: None)
+        engine = PlanEngine(store.load())
+        history = TrainingHistory(store.data)
+        weights = iter(range(1 << 30))
+        for week_num in range(1, 7): engine.week(week_num)
+        def ui_thread():
+            # WeekScreen.save_log minus the RecycleView: store, history, invalidate, recompute.
+            week_num, day_idx, ex_idx = next(cells)
+            key = log_key(week_num, day_idx, ex_idx)
+            # A new weight each time: saving an unchanged value writes nothing.
+            value = {"actual_weight": safe_float(str(next(weights)), 0.0), "actual_reps": safe_int("25", 0)}
+            store.set("logs", key, value)
+            history.record(key, value)
+            for cell in engine.invalidate("logs", key): engine.cell(*cell)
+        def durable():
+            ui_thread()
+            store.flush()
+        results[f"save_log.ui_thread[{size}]"] = measure(ui_thread, repeat=repeat)
+        results[f"save_log.durable[{size}]"] = measure(durable, repeat=repeat)
+        store.close()
+    return results
+
+# --- Training history ---
+def bench_history(sizes: Tuple[int, ...], directory: str) -> Dict[str, Result]:
+    # history.load starts from a parsed document; history.load_columns from an
+    # unopened columnar file, so it includes the mmap and header reads.
+    results = {}
+    for size in sizes:
+        data = synthetic_data(size)
+        repeat = 3 if size >= 100000 else 5
+        results[f"history.load[{size}]"] = measure(lambda: TrainingHistory(data), repeat=repeat)
+        path = os.path.join(directory, f"history_{size}{columnar.SUFFIX}")
+        columnar.write_columns(data, path)
+        def load_columns():
+            with columnar.ColumnarLogs(path) as columns:
+                TrainingHistory().load_columns(columns)
+        results[f"history.load_columns[{size}]"] = measure(load_columns, repeat=repeat)
+        history = TrainingHistory(data)
+        names = list(history.lifts)
+        cells = iter(CELLS * 100000)
+        def record():
+            history.record(log_key(*next(cells)), {"actual_weight": 135.0, "actual_reps": 25})
+        def summaries():
+            for name in names: history.summary(name)
+        results[f"history.record[{size}]"] = measure(record)
+        results[f"history.summary[{size}]"] = measure(summaries, len(names))
+    return results
+
+# --- Backups ---
+def bench_backups(sizes: Tuple[int, ...], directory: str) -> Dict[str, Result]:
+    # full: a session's first snapshot, which encodes every chunk (all already
+    # stored); incremental: one changed log, then a snapshot; capture: what
+    # the overwrite hook does on the writing thread before a session's first
+    # snapshot (the worker does the rest).
+    results = {}
+    for size in sizes:
+        data = synthetic_data(size)
+        path = os.path.join(directory, f"backups_{size}")
+        backups.Backups(path).snapshot(data)
+        cells = iter(CELLS * 100000)
+        def full():
+            backups.Backups(path).snapshot(data)
+        watched = backups.Backups(path)
+        watched.snapshot(data)
+        def incremental():
+            key = log_key(*next(cells))
+            data["logs"][key] = {"actual_weight": 135.0, "actual_reps": 25}
+            watched.mark([("logs", key)], [])
+            watched.snapshot(data)
+        repeat = 3 if size >= 100000 else 5
+        results[f"backups.snapshot_full[{size}]"] = measure(full, repeat=repeat, min_time=0 if size >= 1000000 else MIN_TIME)
+        results[f"backups.snapshot_incremental[{size}]"] = measure(incremental, repeat=repeat)
+        results[f"backups.capture[{size}]"] = measure(lambda: backups.Backups(path)._capture(data), repeat=repeat)
+        stamp = watched.stamps()[-1]
+        results[f"backups.restore[{size}]"] = measure(lambda: watched.load(stamp), repeat=repeat, min_time=0 if size >= 1000000 else MIN_TIME)
+    return results
+
+# --- Undo ---
+def bench_undo(sizes: Tuple[int, ...]) -> Dict[str, Result]:
+    # step: a DataStore.set() with an UndoLog attached, minus the same set()
+    # without one is the cost of keeping the step; undo_redo: one undo and
+    # one redo of a log overwrite, MAX_STEPS steps deep; undo_redo_new: the
+    # same for a 1RM that did not exist before, which undo removes.
+    results = {}
+    for size in sizes:
+        store = DataStore(JournalStore(os.devnull), schedule=lambda callback: None)
+        store.data = synthetic_data(size)
+        cells = iter(CELLS * 100000)
+        weights = iter(range(1 << 30))
+        def save():
+            store.set("logs", log_key(*next(cells)), {"actual_weight": float(next(weights)), "actual_reps": 25})
+        results[f"undo.set_plain[{size}]"] = measure(save)
+        undo_log = undo.UndoLog(store)
+        results[f"undo.set_with_step[{size}]"] = measure(save)
+        def undo_redo():
+            undo_log.undo()
+            undo_log.redo()
+        results[f"undo.undo_redo[{size}]"] = measure(undo_redo, 2)
+        store.set("1RM", "Front Squat", 100.0)  # not in the synthetic data
+        results[f"undo.undo_redo_new[{size}]"] = measure(undo_redo, 2)
+    return results
+
+# --- Week screen widgets ---
+def legacy_week_widgets(layout: Any, engine: PlanEngine, week_num: int) -> None:
+    # What WeekScreen.on_enter built before the RecycleView, and save_log ran
+    # again after every save: every label, input and button of the week.
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.button import Button
+    from kivy.uix.gridlayout import GridLayout
+    from kivy.uix.label import Label
+    from kivy.uix.scrollview import ScrollView
+    from kivy.uix.textinput import TextInput
+    layout.clear_widgets()
+    layout.add_widget(Label(text=f"Week {week_num}", font_size=20))
+    layout.add_widget(Button(text="Back", size_hint=(1, 0.1)))
+    scroll = ScrollView()
+    content = GridLayout(cols=1, spacing=10, size_hint_y=None)
+    content.bind(minimum_height=content.setter('height'))
+    for day_name, cells in engine.week(week_num):
+        content.add_widget(Label(text=day_name, size_hint_y=None, height=40, font_size=18))
+        for cell in cells:
+            ex_layout = BoxLayout(orientation='vertical', size_hint_y=None, height=150, spacing=5)
+            ex_layout.add_widget(Label(text=f"{cell['name']}: {cell['sets']} sets, {cell['reps']} reps, Rest: {cell['rest']}, RPE: {cell['rpe']}",
+                                       size_hint_y=None, height=30))
+            ex_layout.add_widget(Label(text=f"Target Weight: {cell['target_weight']}", size_hint_y=None, height=30))
+            actual_row = BoxLayout(orientation='horizontal', spacing=5)
+            actual_row.add_widget(Label(text="Actual Wt:", size_hint_x=0.3))
+            wt_input = TextInput(text=str(cell['actual_weight']), multiline=False, size_hint_x=0.3)
+            actual_row.add_widget(wt_input)
+            actual_row.add_widget(Label(text="Actual Reps:", size_hint_x=0.2))
+            reps_input = TextInput(text=str(cell['actual_reps']), multiline=False, size_hint_x=0.2)
+            actual_row.add_widget(reps_input)
+            save_btn = Button(text="Save", size_hint_x=0.2)
+            save_btn.bind(on_press=lambda instance, wt=wt_input, r=reps_input: (wt.text, r.text))
+            actual_row.add_widget(save_btn)
+            ex_layout.add_widget(actual_row)
+            ex_layout.add_widget(Label(text=f"Notes: {cell['notes']}", size_hint_y=None, height=30))
+            content.add_widget(ex_layout)
+    scroll.add_widget(content)
+    layout.add_widget(scroll)
+
+def bench_widgets() -> Dict[str, Result]:
+    # Builds the widget tree without a window (no layout or drawing pass);
+    # skipped where Kivy can't import. save_rebuild_legacy / save_update_rows:
+    # the widget work of one save before and after the RecycleView, the
+    # engine's recompute included in both.
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    try: from week_screen import WeekScreen, ExerciseRow
+    except Exception as e: return {"widgets": {"skipped": f"{type(e).__name__}: {e}"}}
+    screen = WeekScreen(name='week')
+    screen.engine.load(synthetic_data(120))
+    screen.show_week()
+    rows = [(i, row) for i, row in enumerate(screen.rv.data) if row['viewclass'] == 'ExerciseRow']
+    def build_screen():
+        built = WeekScreen(name='week')
+        built.engine = screen.engine
+        built.show_week()
+    def build_rows():
+        # Every exercise row of a week, as the pre-RecycleView screen built them.
+        for index, row in rows:
+            ExerciseRow().refresh_view_attrs(screen.rv, index, row)
+    def refresh_rows():
+        view = ExerciseRow()
+        for index, row in rows: view.refresh_view_attrs(screen.rv, index, row)
+    def switch_weeks(clear):
+        # Weeks 2 and 3 back and forth, from the view cache or rebuilt each time.
+        def switch():
+            for week_num in (2, 3):
+                if clear: screen.views.clear()
+                screen.week_num = week_num
+                screen.show_week()
+        return switch
+    from kivy.uix.boxlayout import BoxLayout
+    legacy_layout = BoxLayout(orientation='vertical')
+    saved = iter([cell for cell in screen.row_index if cell[0] == screen.shown_week] * 100000)
+    weights = iter(range(1 << 30))
+    def save(rebuild):
+        def one():
+            cell = next(saved)
+            key = log_key(*cell)
+            screen.engine.data["logs"][key] = {"actual_weight": float(next(weights) % 300), "actual_reps": 25}
+            invalidated = set(screen.engine.invalidate("logs", key)) | {cell}
+            if rebuild: legacy_week_widgets(legacy_layout, screen.engine, cell[0])
+            else: screen.update_rows(invalidated)
+        return one
+    return {
+        "widgets.week_screen": measure(build_screen),
+        "widgets.exercise_rows_build": measure(build_rows, len(rows)),
+        "widgets.exercise_rows_recycle": measure(refresh_rows, len(rows)),
+        "widgets.week_switch_rebuilt": measure(switch_weeks(True), 2),
+        "widgets.week_switch_cached": measure(switch_weeks(False), 2),
+        "widgets.save_rebuild_legacy": measure(save(True)),
+        "widgets.save_update_rows": measure(save(False)),
+    }
+
+# --- Runner ---
+def run(quick: bool = False, only: Optional[str] = None) -> Dict[str, Any]:
+    sizes = QUICK_SIZES if quick else SIZES
+    groups: List[Tuple[str, Callable[[], Dict[str, Result]]]] = [
+        ("helpers", bench_helpers),
+        ("program", lambda: bench_programs(directory)),
+        ("week", lambda: bench_week(sizes)),
+        ("save_log", lambda: bench_save_log(sizes, directory)),
+        ("history", lambda: bench_history(sizes, directory)),
+        ("backups", lambda: bench_backups(sizes, directory)),
+        ("undo", lambda: bench_undo(sizes)),
+        ("widgets", bench_widgets),
+    ]
+    results: Dict[str, Result] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, bench in groups:
+            if only and not name.startswith(only): continue
+            start = time.perf_counter()
+            results.update(bench())
+            print(f"benchmarks: {name} done in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick, "pullup_exercise": PULLUP_EXERCISE_NAME,
+        },
+        "results": results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Tuple[str, float, float, float]]:
+    # (name, baseline us, current us, ratio) for every benchmark in both runs.
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "us" not in base or "us" not in result: continue
+        rows.append((name, base["us"], result["us"], result["us"] / base["us"] if base["us"] else 1.0))
+    return rows
+
+def print_results(results: Dict[str, Result], comparison: Optional[List[Tuple[str, float, float, float]]] = None,
+                  threshold: float = THRESHOLD) -> None:
+    ratios = {name: ratio for name, _, _, ratio in comparison or []}
+    for name, result in results.items():
+        if "us" not in result:
+            print(f"{name:45s} skipped ({result.get('skipped')})")
+            continue
+        line = f"{name:45s} {result['us']:14.3f} us"
+        if name in ratios:
+            line += f"  {ratios[name]:6.2f}x" + ("  REGRESSION" if ratios[name] > threshold else "")
+        print(line)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Run the strength tracker benchmarks.")
+    parser.add_argument("--quick", action="store_true", help=f"skip the {SIZES[-1]}-entry documents")
+    parser.add_argument("--only", help="run only groups starting with this prefix (helpers, program, week, save_log, history, backups, undo, widgets)")
+    parser.add_argument("-o", "--output", help="write the results JSON here")
+    parser.add_argument("--save-baseline", action="store_true", help=f"overwrite {os.path.basename(BASELINE_FILE)}")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_FILE, help="compare with a baseline (default: benchmarks/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    current = run(args.quick, args.only)
+    comparison = None
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(current, json.load(f))
+    print_results(current["results"], comparison, args.threshold)
+    for path in filter(None, (args.output, BASELINE_FILE if args.save_baseline else None)):
+        with open(path, "w") as f:
+            json.dump(current, f, indent=1, sort_keys=True)
+            f.write("\n")
+    return 1 if comparison and any(ratio > args.threshold for _, _, _, ratio in comparison) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# Synthetic workout_data.json documents for benchmarks.
+import json
+import os
+import random
+from typing import Dict, Any, List
+
+from program import DEFAULT_1RM_VALUES, PULLUP_EXERCISE_NAME, compiled_program, log_key
+
+CELLS = [(w, d, e)
+         for w in range(1, compiled_program.week_count + 1)
+         for d in range(len(compiled_program.day_names[w-1]))
+         for e in range(compiled_program.exercise_counts[w-1][d])]
+
+def synthetic_log(rng: random.Random, week_num: int, day_idx: int, ex_idx: int) -> Dict[str, Any]:
+    ex = compiled_program.exercise(week_num, day_idx, ex_idx)
+    if ex.type == 'pullup':
+        return {"actual_weight": rng.choice([0, 0, 5, 10, 15]), "actual_reps": rng.randint(15, 40)}
+    return {"actual_weight": float(rng.randrange(20, 300, 5)), "actual_reps": rng.randint(3, 40)}
+
+def synthetic_data(entries: int, seed: int = 0) -> Dict[str, Any]:
+    # The newest cycle uses the plain log keys; older cycles are archived as
+    # "Cycle{c}_" + log_key(...), so documents grow past one cycle's 120 cells.
+    rng = random.Random(seed)
+    cycles = max(1, -(-entries // len(CELLS)))
+    logs: Dict[str, Any] = {}
+    for cycle in range(1, cycles + 1):
+        for week_num, day_idx, ex_idx in CELLS:
+            if len(logs) >= entries: break
+            key = log_key(week_num, day_idx, ex_idx)
+            logs[key if cycle == cycles else f"Cycle{cycle}_{key}"] = synthetic_log(rng, week_num, day_idx, ex_idx)
+    one_rm = {name: value * rng.uniform(0.8, 1.2) for name, value in DEFAULT_1RM_VALUES.items()}
+    one_rm[PULLUP_EXERCISE_NAME] = rng.randint(0, 15)
+    return {"1RM": one_rm, "logs": logs, "new_1RM": {}}
+
+def write_athletes(directory: str, count: int, entries: int, seed: int = 0) -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"athlete{i:05d}.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_data(entries, seed + i), f)
+        paths.append(path)
+    return paths
@@ -0,0 +1,192 @@
+import json
+import re
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+
+from program import CATALOG_FILE
+
+# --- Exercise Catalog ---
+# Exercises to swap into a program slot, tagged by movement pattern,
+# equipment and the program's exercise types. CATALOG_FILE lists the
+# program's own exercises plus movements, each expanded into every
+# equipment x variant name ("Dumbbell Paused Bench Press"), a few thousand
+# entries in all. Entry ids follow rank order (listed exercises first,
+# then shorter names), so sorted ids are ranked results.
+#
+# search() matches every query word against the start of some word of the
+# name or its aliases through a trie whose nodes hold the ids below them,
+# so a keystroke costs a walk per word plus set intersections.
+# substitutions() reads an inverted index of (tag, value) -> ids for "same
+# pattern, different equipment". catalog() loads the file on first use only.
+TAGS = ('pattern', 'equipment', 'type')
+SEARCH_LIMIT = 20
+WORD = re.compile(r"[a-z0-9]+")
+
+def words(text: str) -> List[str]:
+    # "Romanian Deadlift (RDL)" -> ["romanian", "deadlift", "rdl"]; "Pull-Up" -> ["pull", "up", "pullup"]
+    found = WORD.findall(text.lower())
+    joined = [a + b for a, b in zip(found, found[1:]) if f"{a}-{b}" in text.lower()]
+    return found + joined
+
+class CatalogEntry:
+    __slots__ = ('id', 'name', 'pattern', 'equipment', 'types', 'aliases')
+
+    def __init__(self, name: str, pattern: str, equipment: str, types: Tuple[str, ...], aliases: Tuple[str, ...] = ()):
+        self.id = -1
+        self.name = name
+        self.pattern = pattern
+        self.equipment = equipment
+        self.types = types
+        self.aliases = aliases
+
+    def __repr__(self):
+        return f"CatalogEntry({self.name!r}, {self.pattern}, {self.equipment})"
+
+class PrefixTrie:
+    # Node: [children by character, ids of every word passing through, in insertion order].
+    def __init__(self):
+        self.root: List[Any] = [{}, []]
+
+    def insert(self, word: str, entry_id: int) -> None:
+        node = self.root
+        for char in word:
+            child = node[0].get(char)
+            if child is None: child = node[0][char] = [{}, []]
+            ids = child[1]
+            if not ids or ids[-1] != entry_id: ids.append(entry_id)
+            node = child
+
+    def ids(self, prefix: str) -> List[int]:
+        node = self.root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None: return []
+        return node[1]
+
+class ExerciseCatalog:
+    def __init__(self, entries: Iterable[CatalogEntry], equipment_aliases: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.entries: List[CatalogEntry] = []
+        self.by_name: Dict[str, CatalogEntry] = {}
+        for entry in entries:
+            key = entry.name.lower()
+            if key in self.by_name: continue  # the first (listed) entry of a name wins
+            entry.id = len(self.entries)
+            self.entries.append(entry)
+            self.by_name[key] = entry
+        for entry in self.entries:
+            for alias in entry.aliases:
+                self.by_name.setdefault(alias.lower(), entry)
+        equipment_aliases = equipment_aliases or {}
+
+        self.words = PrefixTrie()
+        self.first_words = PrefixTrie()
+        self.index: Dict[Tuple[str, str], Set[int]] = {}
+        for entry in self.entries:
+            for text in (entry.name,) + entry.aliases:
+                for i, word in enumerate(words(text)):
+                    self.words.insert(word, entry.id)
+                    if i == 0: self.first_words.insert(word, entry.id)
+            for alias in equipment_aliases.get(entry.equipment, ()):
+                self.words.insert(alias, entry.id)
+            for tag, value in (('pattern', entry.pattern), ('equipment', entry.equipment)) + tuple(('type', t) for t in entry.types):
+                self.index.setdefault((tag, value), set()).add(entry.id)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def find(self, name: str) -> Optional[CatalogEntry]:
+        return self.by_name.get(name.lower())
+
+    def tagged(self, tag: str, values: Iterable[str]) -> Set[int]:
+        found: Set[int] = set()
+        for value in values:
+            found |= self.index.get((tag, value), set())
+        return found
+
+    def _filter(self, ids: Set[int], types: Optional[Iterable[str]], equipment: Optional[Iterable[str]]) -> Set[int]:
+        if types is not None: ids &= self.tagged('type', types)
+        if equipment is not None: ids &= self.tagged('equipment', equipment)
+        return ids
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT, types: Optional[Iterable[str]] = None,
+               equipment: Optional[Iterable[str]] = None) -> List[CatalogEntry]:
+        # Names whose first word starts like the query's first word come first.
+        tokens = WORD.findall(query.lower())
+        if not tokens: return []
+        lists = sorted((self.words.ids(token) for token in tokens), key=len)
+        if not lists[0]: return []
+        matches = set(lists[0])
+        for ids in lists[1:]:
+            matches.intersection_update(ids)
+            if not matches: return []
+        matches = self._filter(matches, types, equipment)
+        first = matches.intersection(self.first_words.ids(tokens[0]))
+        ranked = sorted(first)[:limit]
+        if len(ranked) < limit: ranked += sorted(matches - first)[:limit - len(ranked)]
+        return [self.entries[i] for i in ranked]
+
+    def substitutions(self, name: str, limit: int = SEARCH_LIMIT, types: Optional[Iterable[str]] = None,
+                      equipment: Optional[Iterable[str]] = None) -> List[CatalogEntry]:
+        # Same movement pattern on other equipment (only `equipment` if given),
+        # entries sharing a type and more name words with the original first.
+        entry = self.find(name)
+        if entry is None: return []
+        same_pattern = self.index.get(('pattern', entry.pattern), set())
+        ids = same_pattern - self.index.get(('equipment', entry.equipment), set())
+        ids = self._filter(ids, types, equipment)
+        own_types, own_words = set(entry.types), set(words(entry.name))
+        def rank(i: int) -> Tuple[int, int, int]:
+            other = self.entries[i]
+            return (own_types.isdisjoint(other.types), -len(own_words.intersection(words(other.name))), i)
+        return [self.entries[i] for i in sorted(ids, key=rank)[:limit]]
+
+# --- Loading ---
+def _check(condition: bool, message: str) -> None:
+    if not condition: raise ValueError(message)
+
+def expand(spec: Dict[str, Any]) -> Tuple[List[CatalogEntry], Dict[str, Tuple[str, ...]]]:
+    # Listed exercises, then every movement x equipment x variant (and no variant).
+    _check(isinstance(spec, dict), "catalog: expected an object")
+    equipment = spec.get('equipment', {})
+    _check(isinstance(equipment, dict), "equipment: expected an object")
+    labels = {key: value.get('label', key) for key, value in equipment.items()}
+    aliases = {key: tuple(value.get('aliases', ())) for key, value in equipment.items()}
+    entries = []
+    for i, ex in enumerate(spec.get('exercises', [])):
+        _check(isinstance(ex, dict) and all(isinstance(ex.get(k), str) for k in ('name', 'pattern', 'equipment')),
+               f"exercises[{i}]: expected name, pattern and equipment")
+        _check(ex['equipment'] in labels, f"exercises[{i}]: unknown equipment '{ex['equipment']}'")
+        entries.append(CatalogEntry(ex['name'], ex['pattern'], ex['equipment'], tuple(ex.get('types', ())), tuple(ex.get('aliases', ()))))
+    generated = []
+    for i, movement in enumerate(spec.get('movements', [])):
+        _check(isinstance(movement, dict) and all(isinstance(movement.get(k), str) for k in ('name', 'pattern')),
+               f"movements[{i}]: expected name and pattern")
+        types = tuple(movement.get('types', ()))
+        variants = [{'name': ""}] + [v if isinstance(v, dict) else {'name': v} for v in movement.get('variants', [])]
+        for kit in movement.get('equipment', []):
+            _check(kit in labels, f"movements[{i}]: unknown equipment '{kit}'")
+            for variant in variants:
+                if kit not in variant.get('equipment', (kit,)): continue
+                name = " ".join(part for part in (labels[kit], variant['name'], movement['name']) if part)
+                generated.append(CatalogEntry(name, movement['pattern'], kit, types))
+    generated.sort(key=lambda entry: (len(entry.name), entry.name))
+    return entries + generated, aliases
+
+def load_catalog(path: str = CATALOG_FILE) -> ExerciseCatalog:
+    # Raises OSError if the file can't be read and ValueError if it is invalid.
+    with open(path) as f:
+        try: spec = json.load(f)
+        except ValueError as e: raise ValueError(f"{path}: not valid JSON: {e}") from None
+    entries, aliases = expand(spec)
+    return ExerciseCatalog(entries, aliases)
+
+_catalog: Optional[ExerciseCatalog] = None
+_catalog_lock = threading.Lock()
+
+def catalog() -> ExerciseCatalog:
+    # Loaded on first use; safe to call from a warm-up thread.
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None: _catalog = load_catalog()
+    return _catalog
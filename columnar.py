@@ -0,0 +1,246 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from program import (
+    program_structure, compile_program, log_key, parse_log_key, history_key, parse_history_key,
+)
+from storage import JournalStore, read_data, _fsync_dir
+
+# --- Columnar Logs ---
+# Binary layout for long log histories. Each log is one row of fixed-width
+# columns (cycle, week, day, exercise, exercise name id, weight, reps); names
+# sit in a string table and everything that isn't a plain log row (1RM,
+# new_1RM, logs with other keys or fields) in a trailing JSON blob, so
+# to_data() gives back the JSON document exactly. ColumnarLogs mmaps the file
+# and exposes each column as a read-only NumPy view into the mapping: opening
+# a file parses nothing but the header, the string table and the blob.
+#
+#   header  magic, version, rows, names offset, extra offset
+#   columns in COLUMNS order, each starting on an 8-byte boundary
+#   names   u4 count, u4 offsets[count + 1], UTF-8 bytes
+#   extra   JSON: {"1RM": ..., "new_1RM": ..., "logs": {unpacked logs}, ...}
+#
+# cycle 0 marks the current cycle (plain Week/Day/Ex keys); archived cycles
+# keep their number. Rows are ordered by (cycle, week, day, exercise).
+SUFFIX = ".stlc"
+MAGIC = b"STLC"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQQ")
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("weight", "<f8"), ("reps", "<i4"), ("cycle", "<u2"), ("name", "<u2"),
+    ("week", "u1"), ("day", "u1"), ("exercise", "u1"), ("flags", "u1"),
+)
+FLAG_INT_WEIGHT = 1  # weight was an int in JSON
+LOG_FIELDS = {"actual_weight", "actual_reps"}
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def column_offsets(rows: int) -> Dict[str, int]:
+    offsets, offset = {}, HEADER.size
+    for name, dtype in COLUMNS:
+        offset = _align(offset)
+        offsets[name] = offset
+        offset += rows * np.dtype(dtype).itemsize
+    offsets["_end"] = _align(offset)
+    return offsets
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _row(key: str, value: Any) -> Optional[Tuple[int, int, int, int, Any, int]]:
+    # (cycle, week, day, exercise, weight, reps) if the log fits the columns.
+    if not isinstance(value, dict) or value.keys() != LOG_FIELDS: return None
+    weight, reps = value["actual_weight"], value["actual_reps"]
+    if not _is_number(weight) or (isinstance(weight, int) and abs(weight) > 2**53): return None
+    if not isinstance(reps, int) or isinstance(reps, bool) or not -2**31 <= reps < 2**31: return None
+    cell = parse_log_key(key)
+    if cell is not None:
+        cycle = 0
+    else:
+        archived = parse_history_key(key)
+        if archived is None: return None
+        cycle, cell = archived[0], archived[1:]
+        if not 0 < cycle < 2**16 or history_key(cycle, *cell) != key: return None
+    if max(cell) > 255 or (cycle == 0 and log_key(*cell) != key): return None
+    return (cycle, *cell, weight, reps)
+
+def write_columns(data: Dict[str, Any], path: str, program: List[List[Dict[str, Any]]] = program_structure) -> int:
+    # Returns the number of logs stored as rows.
+    compiled = compile_program(program)
+    rows, unpacked = [], {}
+    for key, value in data.get("logs", {}).items():
+        row = _row(key, value)
+        if row is None: unpacked[key] = value
+        else: rows.append(row)
+    rows.sort(key=lambda row: row[:4])
+    count = len(rows)
+    names: Dict[str, int] = {}
+    name_ids: Dict[Tuple[int, int, int], int] = {}
+    for cell in {row[1:4] for row in rows}:
+        try: name = compiled.exercise(*cell).name if cell[0] >= 1 else ""
+        except IndexError: name = ""
+        name_ids[cell] = names.setdefault(name, len(names))
+    cycles, weeks, days, exercises, weights, reps = zip(*rows) if rows else ((),) * 6
+    columns = {
+        "weight": np.array(weights, dtype=np.float64), "reps": np.array(reps, dtype=np.int32),
+        "cycle": np.array(cycles, dtype=np.uint16), "name": np.array([name_ids[row[1:4]] for row in rows], dtype=np.uint16),
+        "week": np.array(weeks, dtype=np.uint8), "day": np.array(days, dtype=np.uint8),
+        "exercise": np.array(exercises, dtype=np.uint8),
+        "flags": np.array([FLAG_INT_WEIGHT if isinstance(weight, int) else 0 for weight in weights], dtype=np.uint8),
+    }
+
+    offsets = column_offsets(count)
+    encoded = [name.encode() for name in names]
+    name_offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    name_offsets[1:] = np.cumsum([len(name) for name in encoded], dtype=np.int64)
+    names_blob = struct.pack("<I", len(encoded)) + name_offsets.tobytes() + b"".join(encoded)
+    extra = {section: values for section, values in data.items() if section != "logs"}
+    extra["logs"] = unpacked
+    extra_offset = _align(offsets["_end"] + len(names_blob))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, offsets["_end"], extra_offset))
+        for name, _ in COLUMNS:
+            f.write(b"\0" * (offsets[name] - f.tell()))
+            f.write(columns[name].tobytes())
+        f.write(b"\0" * (offsets["_end"] - f.tell()))
+        f.write(names_blob)
+        f.write(b"\0" * (extra_offset - f.tell()))
+        f.write(json.dumps(extra, separators=(',', ':')).encode())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+    return count
+
+class ColumnarLogs:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = None
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: empty file") from None
+        mm = self._mmap
+        try:
+            if len(mm) < HEADER.size: raise ValueError(f"{path}: truncated header")
+            magic, version, rows, names_offset, extra_offset = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC: raise ValueError(f"{path}: not a columnar log file")
+            if version != VERSION: raise ValueError(f"{path}: unsupported version {version}")
+            offsets = column_offsets(rows)
+            if offsets["_end"] != names_offset or extra_offset > len(mm): raise ValueError(f"{path}: truncated file")
+            self.rows = rows
+            for name, dtype in COLUMNS:
+                setattr(self, name, np.frombuffer(mm, dtype=dtype, count=rows, offset=offsets[name]))
+            (name_count,) = struct.unpack_from("<I", mm, names_offset)
+            name_offsets = np.frombuffer(mm, dtype="<u4", count=name_count + 1, offset=names_offset + 4)
+            start = names_offset + 4 + 4 * (name_count + 1)
+            self.names = [mm[start + int(a):start + int(b)].decode() for a, b in zip(name_offsets[:-1], name_offsets[1:])]
+            self.extra: Dict[str, Any] = json.loads(mm[extra_offset:])
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def keys(self) -> List[str]:
+        return [history_key(c, w, d, e) if c else log_key(w, d, e)
+                for c, w, d, e in zip(self.cycle.tolist(), self.week.tolist(), self.day.tolist(), self.exercise.tolist())]
+
+    def current(self) -> slice:
+        # Rows of the current cycle (cycle 0 sorts first).
+        return slice(0, int(np.searchsorted(self.cycle, 1)))
+
+    def current_logs(self) -> Dict[str, Dict[str, Any]]:
+        # The current cycle's logs only, in the JSON layout; enough for PlanEngine.
+        rows = self.current()
+        logs = self._logs(rows)
+        logs.update({key: value for key, value in self.extra.get("logs", {}).items() if parse_log_key(key)})
+        return logs
+
+    def _logs(self, rows: slice) -> Dict[str, Dict[str, Any]]:
+        weights, flags = self.weight[rows].tolist(), self.flags[rows].tolist()
+        weights = [int(w) if f & FLAG_INT_WEIGHT else w for w, f in zip(weights, flags)]
+        keys = self.keys() if rows == slice(None) else [
+            history_key(c, w, d, e) if c else log_key(w, d, e)
+            for c, w, d, e in zip(self.cycle[rows].tolist(), self.week[rows].tolist(), self.day[rows].tolist(), self.exercise[rows].tolist())]
+        return {key: {"actual_weight": weight, "actual_reps": reps}
+                for key, weight, reps in zip(keys, weights, self.reps[rows].tolist())}
+
+    def current_data(self) -> Dict[str, Any]:
+        # The document PlanEngine needs: every section but only the current cycle's logs.
+        data = {section: values for section, values in self.extra.items() if section != "logs"}
+        data["logs"] = self.current_logs()
+        return data
+
+    def to_data(self) -> Dict[str, Any]:
+        # Back to the JSON document; logs keep the original key order only within rows and unpacked logs.
+        data = {section: values for section, values in self.extra.items() if section != "logs"}
+        logs = self._logs(slice(None))
+        logs.update(self.extra.get("logs", {}))
+        data["logs"] = logs
+        return data
+
+    def close(self) -> None:
+        # Views into the mapping must go before it can be closed; views
+        # handed out and still alive keep it open until they are collected.
+        for name, _ in COLUMNS:
+            if hasattr(self, name): setattr(self, name, None)
+        if self._mmap is not None:
+            try: self._mmap.close()
+            except BufferError: pass
+            self._mmap = None
+        self._file.close()
+
+# --- Conversion ---
+def pack(json_path: str, columns_path: str, program: List[List[Dict[str, Any]]] = program_structure) -> Tuple[int, int]:
+    # (logs stored as rows, logs left in the JSON blob); the journal's records count too.
+    data = read_data(json_path)
+    rows = write_columns(data, columns_path, program)
+    return rows, len(data.get("logs", {})) - rows
+
+def unpack(columns_path: str, json_path: str) -> int:
+    with ColumnarLogs(columns_path) as columns:
+        data = columns.to_data()
+    # As a snapshot, so no journal left next to json_path is replayed over it.
+    store = JournalStore(json_path)
+    try: store.write_snapshot(data)
+    finally: store.close()
+    return len(data["logs"])
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m columnar", description="Convert between JSON and columnar log files.")
+    parser.add_argument("command", choices=["pack", "unpack"], help="pack: JSON to columnar; unpack: columnar to JSON")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "pack":
+            rows, unpacked = pack(args.source, args.target)
+            print(f"columnar: {rows} logs as rows, {unpacked} kept as JSON; "
+                  f"{os.path.getsize(args.source)} -> {os.path.getsize(args.target)} bytes", file=sys.stderr)
+        else:
+            logs = unpack(args.source, args.target)
+            print(f"columnar: wrote {logs} logs to {args.target}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"columnar: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
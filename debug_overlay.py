@@ -0,0 +1,46 @@
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.graphics import Color, Rectangle
+from kivy.uix.label import Label
+from profiling import profiler
+
+REFRESH_INTERVAL = 1.0  # seconds
+
+# Profiler summary drawn on top of every screen; refreshed while shown.
+class DebugOverlay(Label):
+    def __init__(self, **kwargs):
+        super().__init__(font_size=12, halign='left', valign='top', color=(1, 1, 0, 1), **kwargs)
+        with self.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self.background = Rectangle()
+        self.bind(size=self.on_geometry, pos=self.on_geometry)
+        self._event = None
+
+    def on_geometry(self, *args):
+        self.text_size = self.size
+        self.background.pos = self.pos
+        self.background.size = self.size
+
+    def show(self):
+        if self.parent is None:
+            Window.add_widget(self)
+            Window.bind(size=self.follow_window)
+            self.follow_window(Window, Window.size)
+        self.refresh()
+        if self._event is None:
+            self._event = Clock.schedule_interval(self.refresh, REFRESH_INTERVAL)
+
+    def hide(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        if self.parent is not None:
+            Window.unbind(size=self.follow_window)
+            Window.remove_widget(self)
+
+    def follow_window(self, window, size):
+        self.size = (size[0], size[1] / 2)
+        self.pos = (0, size[1] / 2)
+
+    def refresh(self, *args):
+        self.text = "\n".join(profiler.report()) or "Profiling: no samples yet"
@@ -0,0 +1,263 @@
+from typing import Dict, Any, List, Tuple, Set, Optional
+
+from program import (
+    DEFAULT_1RM_VALUES, MAIN_LIFT_TYPES, DEFAULT_RULES, ProgressionRules, CompiledProgram,
+    program_structure, compile_program, round_to_nearest, get_pullup_suggestion_new, log_key,
+)
+from profiling import profiler
+
+# A cell is one (week, day_idx, ex_idx) slot of the program; an input is a
+# ("1RM", exercise name), ("logs", log key) or ("swaps", log key) entry of the
+# data document. A swap replaces the exercise shown in a slot (see catalog.py);
+# the slot's rules, logs and 1RM stay those of the program's exercise.
+Cell = Tuple[int, int, int]
+Input = Tuple[str, str]
+
+# --- Cell Plans ---
+# Everything about a cell that does not depend on the data document, resolved
+# once per (program, rules): which rule applies, the 1RM and log keys it reads,
+# the previous week's target reps and every note variant. _compute then only
+# does the arithmetic on the logged numbers.
+PLAN_OTHER, PLAN_MAIN, PLAN_PULLUP, PLAN_ACCESSORY = range(4)
+PHASE_NONE, PHASE_FIRST, PHASE_PROGRESS, PHASE_DELOAD = range(4)
+PREFILL_NOTE = " (Actual Wt pre-filled w/ Target)"
+
+class CellPlan:
+    __slots__ = ('kind', 'phase', 'input_name', 'log_key', 'prev_log_key', 'prev_week', 'prev_target_total',
+                 'prefill', 'notes', 'success_notes', 'repeat_notes')
+
+    def __init__(self, compiled: CompiledProgram, rules: ProgressionRules, week_num: int, day_idx: int, ex_idx: int):
+        ex = compiled.exercise(week_num, day_idx, ex_idx)
+        self.kind, self.phase = PLAN_OTHER, PHASE_NONE
+        self.input_name = None
+        self.log_key = log_key(week_num, day_idx, ex_idx)
+        self.prev_log_key = None
+        self.prev_week = week_num - 1 if week_num > 1 else 1
+        self.prev_target_total = 0
+        self.prefill = False
+        self.notes = self.success_notes = self.repeat_notes = ex.notes
+        if ex.type in rules.main_lift_types:
+            self.kind, self.input_name = PLAN_MAIN, ex.name
+            self.prefill = week_num == 1
+            if week_num == 1:
+                self.phase = PHASE_FIRST
+                self.notes += f" (Wk1 Target: {rules.week1_percent*100:.1f}% 1RM)" + PREFILL_NOTE
+            elif 1 < week_num < rules.deload_week:
+                self.phase = PHASE_PROGRESS
+                self.prev_log_key = log_key(self.prev_week, day_idx, ex_idx)
+                prev_ex = compiled.exercise(self.prev_week, day_idx, ex_idx)
+                self.prev_target_total = total = prev_ex.sets_range[0] * prev_ex.reps_range[0]
+                self.success_notes += (f" (Target based on Wk{self.prev_week} Actuals. "
+                                       f"Increase by {rules.increment_on_success*100:.0f}% if reps >= {total})")
+                self.repeat_notes += f" (Target based on Wk{self.prev_week} Actuals)"
+            elif week_num == rules.deload_week:
+                self.phase = PHASE_DELOAD
+                self.notes += f" (Deload Target: {rules.deload_percent*100:.0f}% 1RM)"
+        elif ex.type == 'pullup':
+            self.kind, self.input_name = PLAN_PULLUP, rules.pullup_name
+            self.prev_log_key = log_key(self.prev_week, day_idx, ex_idx)
+            self.prefill = week_num == 1
+        elif ex.type in rules.accessory_types:
+            self.kind = PLAN_ACCESSORY
+            self.notes += (f" (Increase wt ~2-3% when hitting {rules.accessory_reps.split('-')[-1]} reps)"
+                           if week_num < rules.deload_week else " (Deload)")
+
+def build_plans(compiled: CompiledProgram, rules: ProgressionRules) -> Tuple[CellPlan, ...]:
+    # Flat table indexed like compiled.cells.
+    plans = []
+    for week_idx, exercise_counts in enumerate(compiled.exercise_counts):
+        for day_idx, exercise_count in enumerate(exercise_counts):
+            plans.extend(CellPlan(compiled, rules, week_idx + 1, day_idx, ex_idx) for ex_idx in range(exercise_count))
+    return tuple(plans)
+
+# Keyed by (id(compiled), rules); the compiled program is kept alongside so the id stays valid.
+_plan_tables: Dict[Tuple[int, ProgressionRules], Tuple[CompiledProgram, Tuple[CellPlan, ...]]] = {}
+
+def compile_plans(compiled: CompiledProgram, rules: ProgressionRules = DEFAULT_RULES) -> Tuple[CellPlan, ...]:
+    key = (id(compiled), rules)
+    cached = _plan_tables.get(key)
+    if cached is None:
+        cached = _plan_tables[key] = (compiled, build_plans(compiled, rules))
+    return cached[1]
+
+
+# Computes WeekScreen targets from the data document without any UI. Every
+# cell records which 1RM and log entries it reads and a reverse index maps each
+# entry back to its readers, so changing one entry through set_log, set_one_rm
+# or load only drops the cached cells downstream of it.
+class PlanEngine:
+    def __init__(self, data: Optional[Dict[str, Any]] = None, program: List[List[Dict[str, Any]]] = program_structure,
+                 main_lift_types: Tuple[str, ...] = MAIN_LIFT_TYPES, rules: Optional[ProgressionRules] = None,
+                 default_1rm: Optional[Dict[str, float]] = None, plans: Optional[Tuple[CellPlan, ...]] = None):
+        self.program = program
+        self.compiled = compile_program(program)
+        if rules is None:
+            rules = DEFAULT_RULES if tuple(main_lift_types) == DEFAULT_RULES.main_lift_types else DEFAULT_RULES.replace(main_lift_types=main_lift_types)
+        self.rules = rules
+        self.main_lift_types = rules.main_lift_types
+        self.default_1rm = DEFAULT_1RM_VALUES if default_1rm is None else default_1rm
+        self.plans = plans if plans is not None else compile_plans(self.compiled, rules)
+        self.data: Dict[str, Any] = {"1RM": {}, "logs": {}, "new_1RM": {}}
+        self._cache: Dict[Cell, Dict[str, Any]] = {}
+        self._dependents: Dict[Input, Set[Cell]] = {}
+        self._week_inputs: Dict[int, Tuple[Input, ...]] = {}
+        self.recompute_count = 0
+        for week_idx, exercise_counts in enumerate(self.compiled.exercise_counts):
+            for day_idx, exercise_count in enumerate(exercise_counts):
+                for ex_idx in range(exercise_count):
+                    cell = (week_idx + 1, day_idx, ex_idx)
+                    for dep in self.dependencies(*cell):
+                        self._dependents.setdefault(dep, set()).add(cell)
+        if data is not None:
+            self.load(data)
+
+    @classmethod
+    def from_definition(cls, definition: Any, data: Optional[Dict[str, Any]] = None) -> 'PlanEngine':
+        # definition is a program_loader.ProgramDefinition; its plan table is reused as is.
+        return cls(data, definition.structure, rules=definition.rules,
+                   default_1rm=definition.default_1rm, plans=definition.plans)
+
+    def plan(self, week_num: int, day_idx: int, ex_idx: int) -> CellPlan:
+        return self.plans[self.compiled.offsets[week_num-1][day_idx] + ex_idx]
+
+    # --- Graph ---
+    def dependencies(self, week_num: int, day_idx: int, ex_idx: int) -> List[Input]:
+        plan = self.plan(week_num, day_idx, ex_idx)
+        deps = [("logs", plan.log_key), ("swaps", plan.log_key)]
+        if plan.input_name is not None:
+            deps.append(("1RM", plan.input_name))
+        if plan.prev_log_key is not None:
+            deps.append(("logs", plan.prev_log_key))
+        return deps
+
+    def week_inputs(self, week_num: int) -> Tuple[Input, ...]:
+        # Every input read by a week's cells, in a fixed order.
+        inputs = self._week_inputs.get(week_num)
+        if inputs is None:
+            counts = self.compiled.exercise_counts[week_num-1]
+            inputs = self._week_inputs[week_num] = tuple(dict.fromkeys(
+                dep for day_idx, count in enumerate(counts) for ex_idx in range(count)
+                for dep in self.dependencies(week_num, day_idx, ex_idx)))
+        return inputs
+
+    def dependents(self, section: str, key: str) -> Set[Cell]:
+        return self._dependents.get((section, key), set())
+
+    def invalidate(self, section: str, key: str) -> List[Cell]:
+        dropped = []
+        for cell in self.dependents(section, key):
+            if self._cache.pop(cell, None) is not None:
+                dropped.append(cell)
+        return dropped
+
+    # --- Inputs ---
+    def load(self, data: Dict[str, Any]) -> List[Cell]:
+        # Diff against the previous document so only changed entries invalidate.
+        old, self.data = self.data, data
+        dropped: List[Cell] = []
+        if not self._cache:
+            return dropped
+        with profiler.span("engine.load"):
+            for section in ("1RM", "logs", "swaps"):
+                before, after = old.get(section, {}), data.get(section, {})
+                if before is after:
+                    continue
+                for key in before.keys() | after.keys():
+                    if before.get(key) != after.get(key):
+                        dropped.extend(self.invalidate(section, key))
+        return dropped
+
+    def set_log(self, week_num: int, day_idx: int, ex_idx: int, actual_weight: float, actual_reps: int) -> List[Cell]:
+        key = log_key(week_num, day_idx, ex_idx)
+        self.data["logs"][key] = {"actual_weight": actual_weight, "actual_reps": actual_reps}
+        return self.invalidate("logs", key)
+
+    def set_one_rm(self, exercise: str, value: float) -> List[Cell]:
+        self.data["1RM"][exercise] = value
+        return self.invalidate("1RM", exercise)
+
+    # --- Outputs ---
+    def cell(self, week_num: int, day_idx: int, ex_idx: int) -> Dict[str, Any]:
+        key = (week_num, day_idx, ex_idx)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._cache[key] = self._compute(week_num, day_idx, ex_idx)
+            self.recompute_count += 1
+            profiler.count("engine.recompute")
+        return cached
+
+    def week(self, week_num: int) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        compiled = self.compiled
+        with profiler.span("engine.week"):
+            return [
+                (day_name, [self.cell(week_num, day_idx, ex_idx) for ex_idx in range(compiled.exercise_counts[week_num-1][day_idx])])
+                for day_idx, day_name in enumerate(compiled.day_names[week_num-1])
+            ]
+
+    def compute_week(self, week_num: int, data: Optional[Dict[str, Any]] = None) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        # week() without reading or filling the cache, from data (default
+        # self.data). Given a document nothing else changes, another thread
+        # may call it while the engine is in use.
+        compiled = self.compiled
+        return [
+            (day_name, [self._compute(week_num, day_idx, ex_idx, data) for ex_idx in range(compiled.exercise_counts[week_num-1][day_idx])])
+            for day_idx, day_name in enumerate(compiled.day_names[week_num-1])
+        ]
+
+    def prime(self, cells: List[Dict[str, Any]]) -> None:
+        # Cache cells computed elsewhere (compute_week) from the current data.
+        for cell in cells:
+            self._cache.setdefault((cell["week"], cell["day_idx"], cell["ex_idx"]), cell)
+
+    def _compute(self, week_num: int, day_idx: int, ex_idx: int, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Mirrors the per-exercise branches WeekScreen.on_enter used to run inline,
+        # with everything data-independent read from the cell's plan.
+        # With the default MAIN_LIFT_TYPES the main-lift branch is never taken
+        # and 'main_upper'/'main_lower' lifts show a target weight of 0.
+        data, rules = self.data if data is None else data, self.rules
+        offset = self.compiled.offsets[week_num-1][day_idx] + ex_idx
+        ex, plan = self.compiled.cells[offset], self.plans[offset]
+        sets, reps = ex.sets, ex.reps
+        notes = plan.notes
+
+        target_weight: Any = 0
+        kind = plan.kind
+        if kind == PLAN_MAIN:
+            one_rm = data["1RM"].get(plan.input_name, self.default_1rm.get(plan.input_name, 0))
+            phase = plan.phase
+            if phase == PHASE_FIRST:
+                target_weight = round_to_nearest(one_rm * rules.week1_percent, rules.weight_rounding)
+            elif phase == PHASE_PROGRESS:
+                prev_log = data["logs"].get(plan.prev_log_key, {})
+                prev_actual_wt = prev_log.get("actual_weight", 0)
+                prev_actual_reps = prev_log.get("actual_reps", 0)
+                if not prev_actual_wt:
+                    prev_actual_wt = one_rm * rules.week1_percent
+                if prev_actual_reps >= plan.prev_target_total and plan.prev_target_total > 0:
+                    target_weight = round_to_nearest(prev_actual_wt * (1 + rules.increment_on_success), rules.weight_rounding)
+                    notes = plan.success_notes
+                else:
+                    target_weight = round_to_nearest(prev_actual_wt, rules.weight_rounding)
+                    notes = plan.repeat_notes
+            elif phase == PHASE_DELOAD:
+                target_weight = round_to_nearest(one_rm * rules.deload_percent, rules.weight_rounding)
+        elif kind == PLAN_PULLUP:
+            max_reps = data["1RM"].get(plan.input_name, self.default_1rm.get(plan.input_name, 0))
+            prev_log = data["logs"].get(plan.prev_log_key, {})
+            suggestion = get_pullup_suggestion_new(week_num, max_reps, prev_log.get("actual_weight", 0),
+                                                   prev_log.get("actual_reps", 0), rules)
+            sets, reps, target_weight, notes = suggestion['sets'], suggestion['reps'], suggestion['weight'], suggestion['notes']
+            if plan.prefill: notes += PREFILL_NOTE
+        elif kind == PLAN_ACCESSORY:
+            target_weight = "User Choice"
+
+        log_data = data["logs"].get(plan.log_key, {"actual_weight": 0, "actual_reps": 0})
+        actual_weight = target_weight if plan.prefill else log_data["actual_weight"]
+
+        return {
+            "week": week_num, "day_idx": day_idx, "ex_idx": ex_idx,
+            "name": data.get("swaps", {}).get(plan.log_key) or ex.name, "program_name": ex.name, "type": ex.type,
+            "sets": sets, "reps": reps, "rest": ex.rest, "rpe": ex.rpe,
+            "target_weight": target_weight, "notes": notes,
+            "actual_weight": actual_weight, "actual_reps": log_data["actual_reps"],
+        }
@@ -0,0 +1,128 @@
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from program import (
+    DEFAULT_RULES, ProgressionRules, program_structure,
+    compile_program, parse_any_log_key, current_cycle, reps_per_set, lift_names, is_main_lift,
+)
+
+# --- 1RM Estimation ---
+# Estimates 1RMs from every logged set in data["logs"], archived cycles
+# included, in one pass: the logs are packed into arrays once, then each
+# formula is a single array expression and the per-lift reductions are
+# ufunc.at / bincount calls. Lifts are the program's 1RM inputs
+# (program.lift_names): its main lifts (program.is_main_lift), then the
+# pull-up.
+FORMULAS = ("epley", "brzycki", "lombardi")
+MAX_ESTIMATE_REPS = 36       # Brzycki diverges at 37
+RECENCY_HALF_LIFE = 2.0      # weeks
+
+LIFT_NAMES = lift_names()   # the built-in program's lifts
+
+def epley(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    return weight * (1 + reps / 30)
+
+def brzycki(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    return weight * 36 / (37 - reps)
+
+def lombardi(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    return weight * reps ** 0.10
+
+def collect_sets(logs: Dict[str, Any], program: List[List[Dict[str, Any]]] = program_structure,
+                 rules: ProgressionRules = DEFAULT_RULES) -> Dict[str, np.ndarray]:
+    # Logged actual_reps are totals across sets, so reps are per set
+    # (program.reps_per_set). "week" counts on across cycles, so the current
+    # cycle's logs are the most recent. "lift" indexes lift_names(program, rules).
+    compiled = compile_program(program)
+    names = lift_names(program, rules)
+    current = current_cycle(logs)
+    lifts, weeks, weights, reps = [], [], [], []
+    for key, entry in logs.items():
+        parsed = parse_any_log_key(key)
+        if parsed is None or not isinstance(entry, dict): continue
+        cycle, week_num, day_idx, ex_idx = parsed
+        try: ex = compiled.exercise(week_num, day_idx, ex_idx)
+        except IndexError: continue
+        if ex.type != 'pullup' and not is_main_lift(ex.type, rules): continue
+        lifts.append(names.index(rules.pullup_name if ex.type == 'pullup' else ex.name))
+        weeks.append(((cycle or current) - 1) * compiled.week_count + week_num)
+        weights.append(entry.get("actual_weight", 0) or 0)
+        reps.append(reps_per_set(ex, week_num, entry.get("actual_reps", 0) or 0, rules))
+    return {
+        "lift": np.array(lifts, dtype=np.intp),
+        "week": np.array(weeks, dtype=np.float64),
+        "weight": np.array(weights, dtype=np.float64),
+        "reps": np.array(reps, dtype=np.float64),
+    }
+
+def _reduce(lift: np.ndarray, values: np.ndarray, weights: Optional[np.ndarray], lifts: int) -> np.ndarray:
+    valid = ~np.isnan(values)
+    lift, values = lift[valid], values[valid]
+    if weights is None:
+        out = np.full(lifts, np.nan)
+        np.fmax.at(out, lift, values)
+        return out
+    weights = weights[valid]
+    totals = np.bincount(lift, weights=weights * values, minlength=lifts)
+    norms = np.bincount(lift, weights=weights, minlength=lifts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(norms > 0, totals / norms, np.nan)
+
+def estimate_one_rms(
+    data: Dict[str, Any],
+    method: str = "best",
+    half_life: float = RECENCY_HALF_LIFE,
+    bodyweight: Optional[float] = None,
+    program: List[List[Dict[str, Any]]] = program_structure,
+    rules: ProgressionRules = DEFAULT_RULES,
+) -> Dict[str, Dict[str, Any]]:
+    # method "best" keeps each lift's highest estimate; "recent" weights every
+    # set by 0.5 ** (weeks since the latest log / half_life). Pull-ups report
+    # the added-weight 1RM when a bodyweight is known (argument or data["bodyweight"]).
+    names = lift_names(program, rules)
+    sets = collect_sets(data.get("logs", {}), program, rules)
+    lift, week, weight, reps = sets["lift"], sets["week"], sets["weight"], sets["reps"]
+    bodyweight = data.get("bodyweight") if bodyweight is None else bodyweight
+
+    is_pullup = lift == names.index(rules.pullup_name)
+    load = weight + (bodyweight or 0) * is_pullup
+    usable = (reps >= 1) & (reps <= MAX_ESTIMATE_REPS) & (load > 0)
+    if bodyweight is None:
+        usable &= ~is_pullup
+    recency = 0.5 ** ((week.max() - week) / half_life) if method == "recent" and len(week) else None
+
+    per_formula = {}
+    for name, formula in zip(FORMULAS, (epley, brzycki, lombardi)):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            e1rm = np.where(usable, formula(load, reps), np.nan)
+        if bodyweight is not None:
+            e1rm = e1rm - bodyweight * is_pullup
+        per_formula[name] = e1rm
+    combined = np.mean(np.stack([per_formula[name] for name in FORMULAS]), axis=0) if len(lift) else np.zeros(0)
+
+    reduced = {name: _reduce(lift, values, recency, len(names)) for name, values in per_formula.items()}
+    reduced["estimate"] = _reduce(lift, combined, recency, len(names))
+    counts = np.bincount(lift[usable], minlength=len(names))
+    max_reps = np.full(len(names), np.nan)
+    np.fmax.at(max_reps, lift, reps)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for i, name in enumerate(names):
+        entry = {key: (None if np.isnan(values[i]) else float(values[i])) for key, values in reduced.items()}
+        entry["sets"] = int(counts[i])
+        if name == rules.pullup_name:
+            entry["max_reps"] = None if np.isnan(max_reps[i]) else float(max_reps[i])
+        results[name] = entry
+    return results
+
+def latest_sets(data: Dict[str, Any], program: List[List[Dict[str, Any]]] = program_structure,
+                rules: ProgressionRules = DEFAULT_RULES) -> Dict[str, Tuple[float, float]]:
+    # (weight, reps per set) of the most recent logged set of each lift.
+    names = lift_names(program, rules)
+    sets = collect_sets(data.get("logs", {}), program, rules)
+    if not len(sets["lift"]): return {}
+    newest_first = np.lexsort((sets["reps"], sets["week"]))[::-1]
+    lifts, first = np.unique(sets["lift"][newest_first], return_index=True)
+    picked = newest_first[first]
+    return {names[lift]: (float(sets["weight"][i]), float(sets["reps"][i])) for lift, i in zip(lifts, picked)}
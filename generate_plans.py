@@ -0,0 +1,167 @@
+# Headless plan generator: computes the full 6-week target sheet for every
+# athlete data file with the same rules as WeekScreen (PlanEngine) and streams
+# the rows to CSV or JSON. The program is the app's unless --program names one
+# (program_loader.resolve_program). Columnar log files (.stlc, see columnar.py)
+# are read through their current-cycle rows only.
+#
+#   python -m generate_plans athletes/ -o plans.csv
+#   python -m generate_plans a.json b.json --format json --jobs 4
+#   python -m generate_plans athletes/ --program programs/my_program.json
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Iterator, Iterable, Optional, Tuple
+
+from engine import PlanEngine
+from program_loader import ProgramDefinition, resolve_program
+from storage import read_data, JOURNAL_SUFFIX, ROTATED_SUFFIX
+
+COLUMNAR_SUFFIX = ".stlc"  # columnar.SUFFIX; columnar (and NumPy) is only imported for such files
+
+COLUMNS = ["athlete", "week", "day", "day_name", "exercise", "name", "type", "sets", "reps",
+           "rest", "rpe", "target_weight", "notes", "actual_weight", "actual_reps"]
+CHUNK_SIZE = 32
+
+def find_data_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith((".json", COLUMNAR_SUFFIX)):
+                        yield os.path.join(root, name)
+        elif not path.endswith((JOURNAL_SUFFIX, ROTATED_SUFFIX)):
+            yield path
+
+def athlete_id(path: str) -> str:
+    # athletes/jane/workout_data.json -> "jane"; athletes/jane.json -> "jane"
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.basename(os.path.dirname(os.path.abspath(path))) if stem == "workout_data" else stem
+
+def read_athlete(path: str) -> Dict[str, Any]:
+    if path.endswith(COLUMNAR_SUFFIX):
+        from columnar import ColumnarLogs
+        with ColumnarLogs(path) as columns:
+            return columns.current_data()
+    return read_data(path)
+
+def plan_rows(path: str, program: ProgramDefinition) -> List[Dict[str, Any]]:
+    engine = PlanEngine.from_definition(program, read_athlete(path))
+    athlete = athlete_id(path)
+    rows = []
+    for week_num in range(1, engine.compiled.week_count + 1):
+        for day_name, cells in engine.week(week_num):
+            for cell in cells:
+                rows.append({
+                    "athlete": athlete, "week": week_num, "day": cell["day_idx"], "day_name": day_name,
+                    "exercise": cell["ex_idx"], "name": cell["name"], "type": cell["type"],
+                    "sets": cell["sets"], "reps": cell["reps"], "rest": cell["rest"], "rpe": cell["rpe"],
+                    "target_weight": cell["target_weight"], "notes": cell["notes"],
+                    "actual_weight": cell["actual_weight"], "actual_reps": cell["actual_reps"],
+                })
+    return rows
+
+def plan_chunk(paths: List[str], program_file: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+    # Workers load the program by path; program_loader keeps it per process.
+    program = resolve_program(program_file)
+    rows, errors = [], []
+    for path in paths:
+        try: rows.extend(plan_rows(path, program))
+        except (OSError, ValueError, KeyError, TypeError) as e: errors.append((path, f"{type(e).__name__}: {e}"))
+    return rows, errors
+
+def _chunks(paths: Iterator[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_plans(paths: Iterable[str], jobs: int = 0, chunk_size: int = CHUNK_SIZE,
+               program_file: Optional[str] = None) -> Iterator[Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]]:
+    # Yields (rows, errors) per chunk as chunks finish. At most two chunks per
+    # worker are in flight, so memory stays flat however many files there are.
+    chunks = _chunks(iter(paths), chunk_size)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for chunk in chunks:
+            yield plan_chunk(chunk, program_file)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(plan_chunk, chunk, program_file))
+            if len(pending) >= jobs * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+class CsvWriter:
+    def __init__(self, out):
+        self.writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        pass
+
+class JsonWriter:
+    # Streams one JSON array without holding it in memory.
+    def __init__(self, out):
+        self.out = out
+        self.first = True
+        out.write("[")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.out.write("\n" if self.first else ",\n")
+            self.out.write(json.dumps(row))
+            self.first = False
+
+    def close(self) -> None:
+        self.out.write("\n]\n")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m generate_plans", description="Generate 6-week target sheets for athlete data files.")
+    parser.add_argument("paths", nargs="+", help="workout_data.json files or directories containing them")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=["csv", "json"], help="output format (default: from the output extension, else csv)")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: CPU count; 1 runs in-process)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="files per scheduled task")
+    parser.add_argument("--program", help="program file (default: the app's, see program_loader)")
+    args = parser.parse_args(argv)
+    try: resolve_program(args.program)   # fail before any output on a bad file
+    except (OSError, ValueError) as e:
+        print(f"generate_plans: {e}", file=sys.stderr)
+        return 1
+
+    fmt = args.format or ("json" if args.output.endswith(".json") else "csv")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    writer = JsonWriter(out) if fmt == "json" else CsvWriter(out)
+    written = failures = 0
+    try:
+        for rows, errors in iter_plans(find_data_files(args.paths), args.jobs, args.chunk_size, args.program):
+            writer.write(rows)
+            written += len(rows)
+            for path, message in errors:
+                failures += 1
+                print(f"generate_plans: skipped {path}: {message}", file=sys.stderr)
+        writer.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"generate_plans: {written} rows written, {failures} files skipped", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
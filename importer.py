@@ -0,0 +1,290 @@
+# Streaming import of training logs exported by other trackers (Strong, Hevy
+# and plain "date,exercise,weight,reps" CSVs). Rows flow through generators:
+#
+#   read -> parse (weights to lb) -> normalize names (weights to each lift's unit) -> group sessions
+#        -> place on program days -> batch write
+#
+# so memory stays bounded by one session and one batch however long the file.
+# Sessions are laid onto the program day by day, filling archived cycles that
+# start at the current cycle; the current cycle's own logs move after them.
+#
+#   python -m importer strong_export.csv --unit kg
+#   python -m importer a.csv b.csv --backend sqlite --batch-size 5000
+#   python -m importer hevy.csv --program programs/my_program.json
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from typing import Dict, Any, List, Iterator, Iterable, Optional, Tuple, Callable
+
+from program import (
+    BACKUP_DIR, DATA_FILE, DB_FILE, STORAGE_BACKEND, PULLUP_EXERCISE_NAME, PLATE_LIFTS, program_structure, compile_program,
+    history_key, current_cycle,
+)
+
+BATCH_SIZE = 1000
+UNIT_FACTORS = {"lb": 1.0, "kg": 2.2046226218}   # to lb
+UNIT_ALIASES = {"lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb", "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg"}
+
+# Header names seen in exports; the first match (case-insensitive) wins.
+COLUMN_ALIASES = {
+    "date": ("date", "start_time", "workout date", "day", "timestamp"),
+    "exercise": ("exercise", "exercise name", "exercise_title", "exercise_name", "name"),
+    "weight": ("weight", "weight_kg", "weight_lbs", "weight_lb", "load"),
+    "reps": ("reps", "repetitions", "rep count"),
+    "unit": ("unit", "units", "weight unit"),
+}
+
+# Extra spellings for program exercise names, after normalize_name().
+NAME_ALIASES = {
+    "squat": "Back Squat", "barbell squat": "Back Squat", "back squat barbell": "Back Squat",
+    "deadlift barbell": "Deadlift", "conventional deadlift": "Deadlift",
+    "ohp": "Overhead Press (OHP)", "overhead press barbell": "Overhead Press (OHP)",
+    "military press": "Overhead Press (OHP)", "shoulder press": "Overhead Press (OHP)",
+    "incline dumbbell press": "Incline DB Press", "incline bench press dumbbell": "Incline DB Press",
+    "pull up": PULLUP_EXERCISE_NAME, "pullup": PULLUP_EXERCISE_NAME, "chin up": PULLUP_EXERCISE_NAME,
+    "weighted pull up": PULLUP_EXERCISE_NAME, "rdl": "Romanian Deadlift (RDL)",
+    "romanian deadlift barbell": "Romanian Deadlift (RDL)", "bent over row": "Barbell Row",
+    "bent over row barbell": "Barbell Row", "hip thrust": "Glute Bridge/Hip Thrust",
+    "glute bridge": "Glute Bridge/Hip Thrust", "calf raise": "Standing Calf Raise",
+    "lying leg curl": "Hamstring Curl", "leg curl": "Hamstring Curl",
+    "dumbbell bench press": "Dumbbell Bench Press", "bench press dumbbell": "Dumbbell Bench Press",
+    "triceps pushdown cable": "Triceps Pushdown", "tricep pushdown": "Triceps Pushdown",
+}
+
+def normalize_name(name: str) -> str:
+    # "Incline DB Press" -> "incline dumbbell press"; "Pull-Up (Weighted)" -> "pull up weighted"
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    return " ".join("dumbbell" if word == "db" else word for word in words)
+
+def name_index(program: List[List[Dict[str, Any]]] = program_structure) -> Dict[str, str]:
+    # normalized spelling -> program exercise name, including "(OHP)"-style abbreviations.
+    index: Dict[str, str] = {}
+    for week_data in program:
+        for day_data in week_data:
+            for ex_data in day_data['exercises']:
+                name = ex_data['name']
+                index[normalize_name(name)] = name
+                index[normalize_name(re.sub(r"\(.*?\)", "", name))] = name
+                for abbreviation in re.findall(r"\((.*?)\)", name):
+                    index.setdefault(normalize_name(abbreviation), name)
+    for alias, name in NAME_ALIASES.items():
+        index.setdefault(alias, name)
+    return index
+
+def match_name(name: str, index: Dict[str, str]) -> Optional[str]:
+    # Exact spelling first, then without a trailing "(Barbell)"-style equipment note.
+    return index.get(normalize_name(name)) or index.get(normalize_name(re.sub(r"\(.*?\)", "", name)))
+
+class ImportStats:
+    __slots__ = ('rows', 'bytes_read', 'total_bytes', 'bad_rows', 'unknown', 'sessions',
+                 'skipped_sessions', 'unplaced_sets', 'logs', 'cycles')
+
+    def __init__(self, total_bytes: int = 0):
+        self.rows = self.bytes_read = self.bad_rows = self.sessions = 0
+        self.skipped_sessions = self.unplaced_sets = self.logs = self.cycles = 0
+        self.total_bytes = total_bytes
+        self.unknown: Dict[str, int] = {}   # unmatched exercise names (first 100 kept)
+
+    @property
+    def progress(self) -> float:
+        return min(1.0, self.bytes_read / self.total_bytes) if self.total_bytes else 0.0
+
+# --- Pipeline stages ---
+def read_rows(paths: Iterable[str], stats: ImportStats) -> Iterator[Dict[str, str]]:
+    for path in paths:
+        with open(path, 'rb') as f:
+            def lines():
+                for line in f:
+                    stats.bytes_read += len(line)   # bytes, like total_bytes
+                    yield line.decode('utf-8-sig')
+            for row in csv.DictReader(lines()):
+                stats.rows += 1
+                yield row
+
+def _column(row: Dict[str, str], field: str) -> Optional[str]:
+    for header in row:
+        if header is not None and header.strip().lower() in COLUMN_ALIASES[field]:
+            return header
+    return None
+
+def parse_sets(rows: Iterator[Dict[str, str]], stats: ImportStats, unit: str = "lb") -> Iterator[Tuple[str, str, float, int]]:
+    # -> (session date, exercise, weight in lb, reps) per logged set.
+    columns: Optional[Dict[str, Optional[str]]] = None
+    for row in rows:
+        if columns is None:
+            columns = {field: _column(row, field) for field in COLUMN_ALIASES}
+            missing = [field for field in ("date", "exercise", "reps") if columns[field] is None]
+            if missing: raise ValueError(f"CSV has no {', '.join(missing)} column (headers: {', '.join(row)})")
+        try:
+            date = re.split(r"[T ]", row[columns["date"]].strip(), maxsplit=1)[0]
+            reps = int(float(row[columns["reps"]] or 0))
+            weight = float(row[columns["weight"]] or 0) if columns["weight"] else 0.0
+        except (ValueError, TypeError, AttributeError):
+            stats.bad_rows += 1
+            continue
+        row_unit = unit
+        header = columns["weight"] or ""
+        if header.lower().endswith(("_kg", "_lbs", "_lb")): row_unit = UNIT_ALIASES[header.lower().rsplit("_", 1)[1]]
+        if columns["unit"] and row[columns["unit"]]: row_unit = UNIT_ALIASES.get(row[columns["unit"]].strip().lower(), row_unit)
+        if not date or reps <= 0:
+            stats.bad_rows += 1
+            continue
+        yield date, row[columns["exercise"]] or "", weight * UNIT_FACTORS[row_unit], reps
+
+def normalize_sets(sets: Iterator[Tuple[str, str, float, int]], stats: ImportStats, index: Dict[str, str],
+                   to_unit: str = "lb", units: Dict[str, str] = PLATE_LIFTS) -> Iterator[Tuple[str, str, float, int]]:
+    # Weights leave in the lift's own unit where units has one (the Deadlift is
+    # tracked in kg), else in to_unit.
+    for date, name, weight, reps in sets:
+        program_name = match_name(name, index)
+        if program_name is None:
+            if name in stats.unknown or len(stats.unknown) < 100:
+                stats.unknown[name] = stats.unknown.get(name, 0) + 1
+            continue
+        yield date, program_name, weight / UNIT_FACTORS[units.get(program_name, to_unit)], reps
+
+def group_sessions(sets: Iterator[Tuple[str, str, float, int]], stats: ImportStats) -> Iterator[Dict[str, Tuple[float, int]]]:
+    # Consecutive sets sharing a date form one session: exercise -> (top weight,
+    # reps summed over the sets at that weight), matching how WeekScreen logs
+    # the working sets; lighter warm-up and back-off sets are dropped.
+    session: Dict[str, Tuple[float, int]] = {}
+    current = None
+    for date, name, weight, reps in sets:
+        if date != current and session:
+            stats.sessions += 1
+            yield session
+            session = {}
+        current = date
+        top, total = session.get(name, (0.0, 0))
+        if weight > top: session[name] = (weight, reps)
+        elif weight == top: session[name] = (top, total + reps)
+    if session:
+        stats.sessions += 1
+        yield session
+
+def place_sessions(sessions: Iterator[Dict[str, Tuple[float, int]]], stats: ImportStats, first_cycle: int,
+                   program: List[List[Dict[str, Any]]] = program_structure) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # Each session goes to the program day, within the next week of days, that
+    # shares the most exercises with it; sessions sharing none are skipped.
+    compiled = compile_program(program)
+    days = [(week_num, day_idx) for week_num in range(1, compiled.week_count + 1)
+            for day_idx in range(len(compiled.day_names[week_num-1]))]
+    day_exercises = [{} for _ in days]
+    for position, (week_num, day_idx) in enumerate(days):
+        for ex_idx in range(compiled.exercise_counts[week_num-1][day_idx]):
+            day_exercises[position].setdefault(compiled.exercise(week_num, day_idx, ex_idx).name, ex_idx)
+    lookahead = max(len(names) for names in compiled.day_names)
+    cursor = 0   # days since the start of first_cycle
+    for session in sessions:
+        best, best_overlap = None, 0
+        for position in range(cursor, cursor + lookahead):
+            overlap = len(session.keys() & day_exercises[position % len(days)].keys())
+            if overlap > best_overlap: best, best_overlap = position, overlap
+        if best is None:
+            stats.skipped_sessions += 1
+            continue
+        cycle, position = divmod(best, len(days))
+        week_num, day_idx = days[position]
+        exercises = day_exercises[position]
+        for name, (weight, reps) in session.items():
+            if name not in exercises:
+                stats.unplaced_sets += 1
+                continue
+            stats.logs += 1
+            yield history_key(first_cycle + cycle, week_num, day_idx, exercises[name]), {
+                "actual_weight": round(weight, 1), "actual_reps": reps,
+            }
+        cursor = best + 1
+        stats.cycles = cycle + 1
+
+def batches(entries: Iterator[Tuple[str, Dict[str, Any]]], size: int = BATCH_SIZE) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# --- Driver ---
+def import_csv(paths: List[str], backend, unit: str = "lb", to_unit: str = "lb", batch_size: int = BATCH_SIZE,
+               progress: Optional[Callable[[ImportStats], None]] = None, backups=None,
+               program: List[List[Dict[str, Any]]] = program_structure) -> ImportStats:
+    # backend is a JournalStore or SQLiteStore; each batch is appended and flushed.
+    # backups, if given, snapshots the data before the first write.
+    stats = ImportStats(sum(os.path.getsize(path) for path in paths))
+    data = backend.load()
+    if backups is not None: backups.snapshot(data, "import")
+    first_cycle = current_cycle(data.get("logs", {}))
+    park = getattr(backend, "set_current_cycle", None)
+    if park: park(0)   # SQLite keys rows by cycle number; keep the current cycle out of the way
+    try:
+        sets = normalize_sets(parse_sets(read_rows(paths, stats), stats, unit), stats, name_index(program), to_unit)
+        for batch in batches(place_sessions(group_sessions(sets, stats), stats, first_cycle, program), batch_size):
+            for key, value in batch:
+                backend.append("logs", key, value)
+            backend.flush()
+            if progress: progress(stats)
+    finally:
+        if park: park(first_cycle + stats.cycles)
+    compact = getattr(backend, "compact", None)
+    if compact: compact()   # fold the journal so the next start doesn't replay the import
+    return stats
+
+def open_backend(backend: str, path: Optional[str], batch_size: int, program: Optional[List[List[Dict[str, Any]]]] = None):
+    # program names SQLite's exercise_name column; by default the app's (program_loader.resolve_program).
+    if backend == "sqlite":
+        from sqlite_store import SQLiteStore
+        if program is None:
+            from program_loader import resolve_program
+            program = resolve_program().structure
+        return SQLiteStore(path or DB_FILE, migrate_from=DATA_FILE, program=program)
+    from storage import JournalStore
+    return JournalStore(path or DATA_FILE, sync_every=batch_size)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m importer", description="Import CSV training logs as archived cycles.")
+    parser.add_argument("paths", nargs="+", help="CSV exports, imported in order")
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=STORAGE_BACKEND)
+    parser.add_argument("--data", help=f"data file (default: {DATA_FILE} or {DB_FILE})")
+    parser.add_argument("--unit", choices=sorted(UNIT_FACTORS), default="lb", help="unit of weights without a unit column")
+    parser.add_argument("--to", dest="to_unit", choices=sorted(UNIT_FACTORS), default="lb", help="unit stored for lifts without their own (see PLATE_LIFTS)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--backup-dir", default=None, help=f"where the data is snapshotted first (default: {BACKUP_DIR} next to the data file)")
+    parser.add_argument("--program", help="program file to place sessions on (default: the app's, see program_loader)")
+    args = parser.parse_args(argv)
+
+    from backups import Backups
+    from program_loader import resolve_program
+    try: program = resolve_program(args.program).structure
+    except (OSError, ValueError) as e:
+        print(f"importer: {e}", file=sys.stderr)
+        return 1
+    data_dir = os.path.dirname(os.path.abspath(args.data)) if args.data else "."
+    backups = Backups(args.backup_dir or os.path.join(data_dir, BACKUP_DIR))
+    backend = open_backend(args.backend, args.data, args.batch_size, program)
+    start = time.perf_counter()
+    def report(stats: ImportStats) -> None:
+        print(f"\rimporter: {stats.progress:6.1%}  {stats.rows} rows, {stats.logs} logs, {stats.cycles} cycles",
+              end="", file=sys.stderr)
+    try:
+        stats = import_csv(args.paths, backend, args.unit, args.to_unit, args.batch_size, report, backups, program)
+    except (OSError, ValueError) as e:
+        print(f"\nimporter: {e}", file=sys.stderr)
+        return 1
+    finally:
+        backend.close()
+    report(stats)
+    print(f"\nimporter: {stats.logs} logs from {stats.sessions} sessions into {stats.cycles} cycles in "
+          f"{time.perf_counter() - start:.1f} s; {stats.bad_rows} bad rows, {stats.skipped_sessions} unmatched sessions, "
+          f"{stats.unplaced_sets} unplaced sets", file=sys.stderr)
+    for name, count in sorted(stats.unknown.items(), key=lambda item: -item[1])[:10]:
+        print(f"importer: unknown exercise {name!r} ({count} sets)", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
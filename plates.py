@@ -0,0 +1,205 @@
+from functools import lru_cache
+from math import gcd
+from typing import Dict, Any, List, Optional, Tuple
+
+from program import PLATE_INVENTORIES, PLATE_LIFTS
+
+# --- Plate Loading ---
+# How to load a barbell for a target weight. A PlateTable solves, once per
+# inventory, a bounded knapsack over every per-side load the plates can make
+# (fewest plates first) and keeps the answer for each load, so a lookup is
+# an index. plan_sequence() then picks loadouts for consecutive sets on one
+# bar that need the fewest plate swaps, trading at most EXTRA_PLATES extra
+# plates per side for fewer changes. Tables sit in an LRU cache across
+# inventories.
+TABLE_CACHE_SIZE = 8
+EXTRA_PLATES = 2      # plates per side above the minimum considered by plan_sequence
+MAX_SCALE = 1000      # plate weights are resolved to 1/1000 of a unit
+
+class Inventory:
+    __slots__ = ('unit', 'bar', 'plates')
+
+    def __init__(self, unit: str, bar: float, plates: Dict[float, int]):
+        if bar < 0: raise ValueError(f"{unit}: bar weight must not be negative")
+        if any(weight <= 0 or pairs < 0 for weight, pairs in plates.items()):
+            raise ValueError(f"{unit}: plate weights must be positive and counts not negative")
+        self.unit = unit
+        self.bar = bar
+        self.plates: Tuple[Tuple[float, int], ...] = tuple(sorted(((w, n) for w, n in plates.items() if n), reverse=True))
+
+    def key(self) -> Tuple:
+        return self.unit, self.bar, self.plates
+
+    def __eq__(self, other): return isinstance(other, Inventory) and self.key() == other.key()
+    def __hash__(self): return hash(self.key())
+
+class Loadout:
+    __slots__ = ('total', 'bar', 'plates', 'unit')
+
+    def __init__(self, inventory: Inventory, plates: Tuple[float, ...]):
+        self.bar = inventory.bar
+        self.unit = inventory.unit
+        self.plates = plates                      # one side, heaviest (innermost) first
+        self.total = inventory.bar + 2 * sum(plates)
+
+    def text(self) -> str:
+        if not self.plates: return f"{self.bar:g} {self.unit} bar"
+        return f"{self.bar:g} {self.unit} bar + {' '.join(f'{p:g}' for p in self.plates)} /side"
+
+def changes(a: Tuple[float, ...], b: Tuple[float, ...]) -> int:
+    # Plates taken off plus put on per side to go from a to b; plates stack
+    # heaviest first, so everything outside the common inner stack moves.
+    shared = 0
+    for x, y in zip(a, b):
+        if x != y: break
+        shared += 1
+    return len(a) - shared + len(b) - shared
+
+class PlateTable:
+    def __init__(self, inventory: Inventory):
+        self.inventory = inventory
+        weights = [inventory.bar] + [weight for weight, _ in inventory.plates]
+        scale = 1
+        while scale < MAX_SCALE and any(abs(w * scale - round(w * scale)) > 1e-9 for w in weights): scale *= 10
+        units = [round(weight * scale) for weight, _ in inventory.plates]
+        step = 0
+        for unit in units: step = gcd(step, unit)
+        step = step or 1
+        self.scale, self.step = scale, step
+        sizes = [unit // step for unit in units]
+        limit = sum(size * pairs for size, (_, pairs) in zip(sizes, inventory.plates))
+        self.limit = limit
+
+        # Bounded knapsack as 0/1 items by binary splitting of each plate's pair count.
+        items = []
+        for index, (size, (_, pairs)) in enumerate(zip(sizes, inventory.plates)):
+            chunk = 1
+            while pairs > 0:
+                take = min(chunk, pairs)
+                items.append((index, take, size * take))
+                pairs -= take
+                chunk *= 2
+        missing = limit + 1
+        best = [0] + [missing] * limit
+        taken = []
+        for index, count, weight in items:
+            row = bytearray(limit + 1)
+            for load in range(limit, weight - 1, -1):
+                candidate = best[load - weight] + count
+                if candidate < best[load]:
+                    best[load] = candidate
+                    row[load] = 1
+            taken.append(row)
+        self.best = best
+
+        # Fewest-plate loadout of every reachable per-side load, and the
+        # nearest reachable load at or below every load.
+        plate_weights = [weight for weight, _ in inventory.plates]
+        self.loadouts: List[Optional[Tuple[float, ...]]] = [None] * (limit + 1)
+        self.below = [0] * (limit + 1)
+        for load in range(limit + 1):
+            self.below[load] = load if best[load] < missing else self.below[load - 1]
+            if best[load] == missing: continue
+            counts, rest = [0] * len(plate_weights), load
+            for (index, count, weight), row in zip(reversed(items), reversed(taken)):
+                if row[rest]:
+                    counts[index] += count
+                    rest -= weight
+            self.loadouts[load] = tuple(w for w, n in zip(plate_weights, counts) for _ in range(n))
+        self._sizes = sizes
+        self._alternatives: Dict[int, List[Tuple[float, ...]]] = {}
+
+    def load_for(self, target: float) -> Optional[int]:
+        # Heaviest reachable per-side load not above target; None below the bar.
+        inventory = self.inventory
+        if target < inventory.bar: return None
+        load = int((target - inventory.bar) * self.scale / 2 / self.step + 1e-9)
+        return self.below[min(load, self.limit)]
+
+    def loadout(self, target: float) -> Optional[Loadout]:
+        load = self.load_for(target)
+        return None if load is None else Loadout(self.inventory, self.loadouts[load])
+
+    def alternatives(self, load: int) -> List[Tuple[float, ...]]:
+        # Every loadout of this per-side load using at most EXTRA_PLATES more
+        # plates than the minimum, heaviest plates first in each.
+        cached = self._alternatives.get(load)
+        if cached is not None: return cached
+        plates, sizes = self.inventory.plates, self._sizes
+        most = self.best[load] + EXTRA_PLATES
+        found: List[Tuple[float, ...]] = []
+        def search(index: int, rest: int, chosen: Tuple[float, ...]) -> None:
+            if rest == 0:
+                found.append(chosen)
+                return
+            if index == len(plates) or len(chosen) >= most: return
+            weight, pairs = plates[index]
+            for n in range(min(pairs, rest // sizes[index], most - len(chosen)), -1, -1):
+                search(index + 1, rest - n * sizes[index], chosen + (weight,) * n)
+        search(0, load, ())
+        found.sort(key=len)
+        self._alternatives[load] = found
+        return found
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def plate_table(inventory: Inventory) -> PlateTable:
+    return PlateTable(inventory)
+
+INVENTORIES: Dict[str, Inventory] = {unit: Inventory(unit, spec["bar"], spec["plates"]) for unit, spec in PLATE_INVENTORIES.items()}
+
+def inventory_for(name: str) -> Optional[Inventory]:
+    unit = PLATE_LIFTS.get(name)
+    return INVENTORIES.get(unit) if unit else None
+
+def loadout(name: str, target: Any) -> Optional[Loadout]:
+    # None for non-barbell lifts and non-numeric or below-bar targets.
+    inventory = inventory_for(name)
+    if inventory is None or isinstance(target, bool) or not isinstance(target, (int, float)): return None
+    return plate_table(inventory).loadout(target)
+
+def plan_sequence(inventory: Inventory, targets: List[float]) -> List[Optional[Loadout]]:
+    # Loadouts for consecutive sets on one bar with the fewest plate changes
+    # overall, then the fewest plates; a below-bar target gets None and
+    # counts as an empty bar.
+    table = plate_table(inventory)
+    loads = [table.load_for(target) for target in targets]
+    options = [table.alternatives(load) if load is not None else [()] for load in loads]
+    # Viterbi over the options of each set: cost = (changes so far, plates so far).
+    costs = [(changes((), option), len(option)) for option in options[0]] if options else []
+    back: List[List[int]] = []
+    for previous, current in zip(options, options[1:]):
+        step_costs, step_back = [], []
+        for option in current:
+            best_cost, best_index = None, 0
+            for i, before in enumerate(previous):
+                cost = (costs[i][0] + changes(before, option), costs[i][1] + len(option))
+                if best_cost is None or cost < best_cost:
+                    best_cost, best_index = cost, i
+            step_costs.append(best_cost)
+            step_back.append(best_index)
+        costs = step_costs
+        back.append(step_back)
+    if not options: return []
+    index = min(range(len(costs)), key=costs.__getitem__)
+    chosen = [index]
+    for step_back in reversed(back):
+        index = step_back[index]
+        chosen.append(index)
+    chosen.reverse()
+    return [Loadout(inventory, options[i][c]) if load is not None else None
+            for i, (c, load) in enumerate(zip(chosen, loads))]
+
+def day_loadouts(cells: List[Dict[str, Any]]) -> Dict[Tuple[int, int, int], Loadout]:
+    # Loadouts for a day's engine cells: the barbell lifts sharing an
+    # inventory are planned as one sequence in program order.
+    sequences: Dict[Inventory, List[Dict[str, Any]]] = {}
+    for cell in cells:
+        inventory = inventory_for(cell["name"])
+        target = cell["target_weight"]
+        if inventory is not None and isinstance(target, (int, float)) and not isinstance(target, bool) and target >= inventory.bar:
+            sequences.setdefault(inventory, []).append(cell)
+    result = {}
+    for inventory, planned in sequences.items():
+        for cell, chosen in zip(planned, plan_sequence(inventory, [cell["target_weight"] for cell in planned])):
+            result[(cell["week"], cell["day_idx"], cell["ex_idx"])] = chosen
+    return result
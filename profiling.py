@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict, Any, List
+
+# --- Profiling ---
+# Opt-in timers and counters for the hot paths. Disabled, span() hands back a
+# shared no-op context manager and count() returns after one flag check.
+# Enabled, each span feeds a ring-buffer latency histogram and a Chrome
+# trace-event buffer (open the export in chrome://tracing or Perfetto).
+PROFILE_ENV = "STRENGTH_PROFILE"     # set to 1 to profile from startup
+TRACE_FILE = "strength_trace.json"
+HISTOGRAM_SIZE = 512                 # latest samples kept per span name
+TRACE_CAPACITY = 50000               # latest trace events kept
+
+class RingHistogram:
+    __slots__ = ('samples', 'capacity', 'count', 'total', 'max')
+
+    def __init__(self, capacity: int = HISTOGRAM_SIZE):
+        self.samples = array('d')
+        self.capacity = capacity
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        if len(self.samples) < self.capacity: self.samples.append(ms)
+        else: self.samples[self.count % self.capacity] = ms
+        self.count += 1
+        self.total += ms
+        if ms > self.max: self.max = ms
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered: return 0.0
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        # mean/max cover every sample; percentiles cover the ring's window.
+        return {
+            "count": self.count, "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50), "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99), "max_ms": self.max,
+        }
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+class Profiler:
+    def __init__(self, enabled: bool = False, trace_capacity: int = TRACE_CAPACITY):
+        self.enabled = enabled
+        self.histograms: Dict[str, RingHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: deque = deque(maxlen=trace_capacity)
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else NULL_SPAN
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled: return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name: str, start: float, end: float) -> None:
+        # start/end are perf_counter() seconds; usable for spans timed by hand.
+        if not self.enabled: return
+        ms = (end - start) * 1000
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = RingHistogram()
+            histogram.add(ms)
+            self.events.append((name, start, end, threading.get_ident()))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.events.clear()
+            self.origin = time.perf_counter()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "spans": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def report(self) -> List[str]:
+        summary = self.summary()
+        lines = [f"{name}: n={s['count']} p50={s['p50_ms']:.2f} p95={s['p95_ms']:.2f} max={s['max_ms']:.2f} ms"
+                 for name, s in summary["spans"].items()]
+        lines += [f"{name}: {value}" for name, value in summary["counters"].items()]
+        return lines
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        with self._lock:
+            events, counters, origin = list(self.events), dict(self.counters), self.origin
+        trace = [{"name": name, "cat": name.split('.')[0], "ph": "X", "pid": pid, "tid": tid,
+                  "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6}
+                 for name, start, end, tid in events]
+        end_ts = (time.perf_counter() - origin) * 1e6
+        trace += [{"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": end_ts, "args": {"value": value}}
+                  for name, value in counters.items()]
+        return trace
+
+    def export_trace(self, path: str = TRACE_FILE) -> str:
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms",
+                       "otherData": {"summary": self.summary()}}, f)
+        return path
+
+profiler = Profiler(enabled=bool(os.environ.get(PROFILE_ENV)))
@@ -0,0 +1,378 @@
+from typing import Union, Dict, Any, List, Optional, Tuple
+import os
+import re
+
+# --- Configuration ---
+DATA_FILE = "workout_data.json"
+DB_FILE = "workout_data.db"
+SYNC_FILE = "workout_data.sync"    # per-entry sync versions, see sync.py
+BACKUP_DIR = "workout_data.backups"  # snapshots taken before overwrites, see backups.py
+SYNC_URL = "http://127.0.0.1:8765"  # sync_server; STRENGTH_SYNC_URL overrides
+PROGRAM_FILE = os.path.join("programs", "default.json")  # see program_loader; STRENGTH_PROGRAM overrides
+CATALOG_FILE = os.path.join("catalog", "exercises.json")  # exercises to swap in, see catalog.py
+STORAGE_BACKEND = "journal"  # "journal" (DATA_FILE + journal) or "sqlite" (DB_FILE)
+PULLUP_EXERCISE_NAME = "Pull-Up Variation"
+
+# Define 1RM input fields
+INPUT_SHEET_1RM_CELLS = {
+    "Back Squat": "B3",
+    "Deadlift": "B4",
+    "Incline DB Press": "B5",
+    "Overhead Press (OHP)": "B6",
+}
+
+# Default 1RM values (pre-filled)
+DEFAULT_1RM_VALUES = {
+    "Back Squat": 275,     # lbs
+    "Deadlift": 140,       # kg
+    "Incline DB Press": 80, # lbs
+    "Overhead Press (OHP)": 155, # lbs
+    PULLUP_EXERCISE_NAME: 8 # reps
+}
+
+# --- Program Parameters ---
+MAIN_LIFT_SETS = {1: "3-4", 2: "3-4", 3: "3-4", 4: "3-4", 5: "3-4", 6: "2-3"}
+MAIN_LIFT_REPS = {1: "8-10", 2: "8-10", 3: "5-6", 4: "5-6", 5: "3-5", 6: "6-8"}
+MAIN_LIFT_1RM_PERCENT_WK1 = 0.625
+PERCENTAGE_INCREMENT_ON_SUCCESS = 0.04
+DELOAD_1RM_PERCENTAGE = 0.55
+
+ACCESSORY_SETS = 3
+ACCESSORY_REPS = "10-15"
+ACCESSORY_DELOAD_SETS = 2
+ACCESSORY_DELOAD_REPS = 12
+
+PULLUP_SETS = 3
+PULLUP_REPS = "8-10"
+PULLUP_REPS_PER_SET_THRESHOLD = 10
+PULLUP_INCREMENT = 5
+PULLUP_DELOAD_SETS = 2
+
+WEIGHT_ROUNDING = 5
+
+MAIN_LIFT_NAMES = ["Back Squat", "Deadlift", "Incline DB Press", "Overhead Press (OHP)"]
+
+# Exercise types that get %1RM main-lift targets. program_structure tags its
+# main lifts 'main_upper'/'main_lower', so as shipped nothing matches this.
+MAIN_LIFT_TYPES = ('main_lift',)
+# Exercise types that are main lifts for 1RM inputs, estimates and set counts,
+# whether or not the rules' main_lift_types give them targets.
+ONE_RM_TYPES = ('main_lift', 'main_upper', 'main_lower')
+ACCESSORY_TYPES = ('accessory', 'core')
+PULLUP_LOW_REP_MAX = 7   # max reps up to this get low-rep accumulation; 0 gets negatives
+DELOAD_WEEK = 6
+
+# --- Plate Loading ---
+# Bar weight and plate pairs on hand per unit system (see plates.py), and the
+# barbell lifts with the unit their weights are in.
+PLATE_INVENTORIES: Dict[str, Dict[str, Any]] = {
+    "lb": {"bar": 45, "plates": {45: 4, 35: 1, 25: 1, 10: 2, 5: 1, 2.5: 1}},
+    "kg": {"bar": 20, "plates": {25: 4, 20: 1, 15: 1, 10: 1, 5: 1, 2.5: 1, 1.25: 1}},
+}
+PLATE_LIFTS: Dict[str, str] = {
+    "Back Squat": "lb", "Deadlift": "kg", "Overhead Press (OHP)": "lb", "Barbell Row": "lb",
+    "Romanian Deadlift (RDL)": "lb", "Front Squat": "lb",
+}
+
+# --- Progression Rules ---
+# Parameters of the main-lift, pull-up and accessory rules. DEFAULT_RULES
+# holds the constants above; program files (program_loader) bring their own.
+class ProgressionRules:
+    __slots__ = ('week1_percent', 'increment_on_success', 'deload_week', 'deload_percent', 'weight_rounding',
+                 'main_lift_types', 'accessory_types', 'accessory_reps', 'pullup_name', 'pullup_sets', 'pullup_reps',
+                 'pullup_threshold', 'pullup_increment', 'pullup_deload_sets', 'pullup_low_rep_max')
+
+    def __init__(self, **values: Any):
+        defaults = {
+            'week1_percent': MAIN_LIFT_1RM_PERCENT_WK1, 'increment_on_success': PERCENTAGE_INCREMENT_ON_SUCCESS,
+            'deload_week': DELOAD_WEEK, 'deload_percent': DELOAD_1RM_PERCENTAGE, 'weight_rounding': WEIGHT_ROUNDING,
+            'main_lift_types': MAIN_LIFT_TYPES, 'accessory_types': ACCESSORY_TYPES, 'accessory_reps': ACCESSORY_REPS,
+            'pullup_name': PULLUP_EXERCISE_NAME, 'pullup_sets': PULLUP_SETS, 'pullup_reps': PULLUP_REPS,
+            'pullup_threshold': PULLUP_REPS_PER_SET_THRESHOLD, 'pullup_increment': PULLUP_INCREMENT,
+            'pullup_deload_sets': PULLUP_DELOAD_SETS, 'pullup_low_rep_max': PULLUP_LOW_REP_MAX,
+        }
+        unknown = set(values) - set(defaults)
+        if unknown: raise ValueError(f"unknown progression rules: {', '.join(sorted(unknown))}")
+        defaults.update(values)
+        for name, value in defaults.items():
+            setattr(self, name, tuple(value) if isinstance(value, list) else value)
+
+    def key(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def replace(self, **changes: Any) -> 'ProgressionRules':
+        return ProgressionRules(**{**self.as_dict(), **changes})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other): return isinstance(other, ProgressionRules) and self.key() == other.key()
+    def __hash__(self): return hash(self.key())
+
+DEFAULT_RULES = ProgressionRules()
+
+# --- Program Structure ---
+# One week of days; weeks only differ by the exercise swaps in WEEK_OVERRIDES.
+DAY_TEMPLATE: List[Dict[str, Any]] = [
+    {'day_name': "Monday (UA)", 'exercises': [
+        {'name': "Incline DB Press", 'sets': 0, 'reps': 0, 'rest': "3-4", 'rpe': 0, 'type': 'main_upper', 'notes': "Main Lift"},
+        {'name': "Overhead Press (OHP)", 'sets': 0, 'reps': 0, 'rest': "2-3", 'rpe': 0, 'type': 'accessory', 'notes': "Lighter OHP day"},
+        {'name': PULLUP_EXERCISE_NAME, 'sets': 0, 'reps': 0, 'rest': "See T2", 'rpe': 0, 'type': 'pullup', 'notes': "Follow specific progression"},
+        {'name': "Barbell Row", 'sets': 0, 'reps': 0, 'rest': "1.5-2", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Triceps Pushdown", 'sets': 0, 'reps': 0, 'rest': "1-1.5", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"}
+    ]},
+    {'day_name': "Tuesday (LA)", 'exercises': [
+        {'name': "Back Squat", 'sets': 0, 'reps': 0, 'rest': "3-5", 'rpe': 0, 'type': 'main_lower', 'notes': "Main Lift"},
+        {'name': "Romanian Deadlift (RDL)", 'sets': 0, 'reps': 0, 'rest': "2-3", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Leg Press", 'sets': 0, 'reps': 0, 'rest': "1.5-2", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Hamstring Curl", 'sets': 0, 'reps': 0, 'rest': "1-1.5", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Plank", 'sets': 0, 'reps': 0, 'rest': "1", 'rpe': 0, 'type': 'core', 'notes': "Core"}
+    ]},
+    {'day_name': "Thursday (UB)", 'exercises': [
+        {'name': "Overhead Press (OHP)", 'sets': 0, 'reps': 0, 'rest': "3-4", 'rpe': 0, 'type': 'main_upper', 'notes': "Main Lift"},
+        {'name': "Incline DB Press", 'sets': 0, 'reps': 0, 'rest': "2-3", 'rpe': 0, 'type': 'accessory', 'notes': "Lighter Incline day"},
+        {'name': PULLUP_EXERCISE_NAME, 'sets': 0, 'reps': 0, 'rest': "See T2", 'rpe': 0, 'type': 'pullup', 'notes': "Follow specific progression"},
+        {'name': "Lat Pulldown", 'sets': 0, 'reps': 0, 'rest': "1.5-2", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Dumbbell Bench Press", 'sets': 0, 'reps': 0, 'rest': "1-1.5", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"}
+    ]},
+    {'day_name': "Friday (LB)", 'exercises': [
+        {'name': "Deadlift", 'sets': 0, 'reps': 0, 'rest': "4-5", 'rpe': 0, 'type': 'main_lower', 'notes': "Main Lift (1 top set)"},
+        {'name': "Front Squat", 'sets': 0, 'reps': 0, 'rest': "2-3", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Glute Bridge/Hip Thrust", 'sets': 0, 'reps': 0, 'rest': "1.5-2", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Standing Calf Raise", 'sets': 0, 'reps': 0, 'rest': "1-1.5", 'rpe': 0, 'type': 'accessory', 'notes': "Accessory"},
+        {'name': "Hanging Leg Raise", 'sets': 0, 'reps': 0, 'rest': "1", 'rpe': 0, 'type': 'core', 'notes': "Core"}
+    ]}
+]
+
+# week -> {(day_idx, ex_idx): fields replaced in that week}
+WEEK_OVERRIDES: Dict[int, Dict[Tuple[int, int], Dict[str, Any]]] = {
+    week: {(1, 4): {'name': "Weighted Plank"}, (3, 4): {'name': "Weighted Hanging Leg Raise"}}
+    for week in (3, 4, 5)
+}
+PROGRAM_WEEKS = 6
+
+def build_program_structure(day_template: List[Dict[str, Any]] = DAY_TEMPLATE,
+                            week_overrides: Dict[int, Dict[Tuple[int, int], Dict[str, Any]]] = WEEK_OVERRIDES,
+                            weeks: int = PROGRAM_WEEKS) -> List[List[Dict[str, Any]]]:
+    # Expands the template into the nested week/day/exercise dicts the rest of the app reads.
+    structure = []
+    for week in range(1, weeks + 1):
+        overrides = week_overrides.get(week, {})
+        structure.append([
+            {'day_name': day['day_name'], 'exercises': [
+                {**ex, **overrides.get((day_idx, ex_idx), {})} for ex_idx, ex in enumerate(day['exercises'])
+            ]}
+            for day_idx, day in enumerate(day_template)
+        ])
+    return structure
+
+program_structure: List[List[Dict[str, Any]]] = build_program_structure()
+
+# Helper Functions
+def round_to_nearest(value: float, base: float) -> float:
+    if base <= 0: return value
+    return round(value / base) * base
+
+def get_target_reps(reps_value: Union[int, str]) -> int:
+    if isinstance(reps_value, str) and '-' in reps_value:
+        try: return int(reps_value.split('-')[0])
+        except ValueError: return 0
+    elif isinstance(reps_value, int): return reps_value
+    elif isinstance(reps_value, str):
+        try: return int(reps_value)
+        except ValueError: return 0
+    else: return 0
+
+def get_numeric_sets(sets_value: Union[int, str]) -> int:
+    if isinstance(sets_value, int): return sets_value
+    elif isinstance(sets_value, str):
+        try:
+            if '-' in sets_value: return int(sets_value.split('-')[0])
+            return int(sets_value)
+        except ValueError: return 0
+    return 0
+
+def safe_float(value: Any, default: float = 0.0) -> float:
+    try: return float(value) if value is not None else default
+    except (ValueError, TypeError): return default
+
+def safe_int(value: Any, default: int = 0) -> int:
+    try: return int(float(value)) if value is not None else default
+    except (ValueError, TypeError): return default
+
+def log_key(week_num: int, day_idx: int, ex_idx: int) -> str:
+    return f"Week{week_num}_Day{day_idx}_Ex{ex_idx}"
+
+LOG_KEY_PATTERN = re.compile(r"Week(\d+)_Day(\d+)_Ex(\d+)$")
+
+def parse_log_key(key: str) -> Optional[Tuple[int, int, int]]:
+    match = LOG_KEY_PATTERN.match(key)
+    return (int(match.group(1)), int(match.group(2)), int(match.group(3))) if match else None
+
+# Logs of the current cycle use log_key(); finished cycles stay in data["logs"]
+# under history_key(), so the current cycle is one past the newest archived one.
+def history_key(cycle: int, week_num: int, day_idx: int, ex_idx: int) -> str:
+    return f"Cycle{cycle}_{log_key(week_num, day_idx, ex_idx)}"
+
+HISTORY_KEY_PATTERN = re.compile(r"Cycle(\d+)_Week(\d+)_Day(\d+)_Ex(\d+)$")
+
+def parse_history_key(key: str) -> Optional[Tuple[int, int, int, int]]:
+    match = HISTORY_KEY_PATTERN.match(key)
+    return tuple(map(int, match.groups())) if match else None
+
+def parse_any_log_key(key: str) -> Optional[Tuple[int, int, int, int]]:
+    # (cycle, week, day, exercise) of a log key of either kind; cycle 0 is the current one.
+    cell = parse_log_key(key)
+    return (0,) + cell if cell is not None else parse_history_key(key)
+
+def current_cycle(logs: Dict[str, Any]) -> int:
+    archived = [parse_history_key(key) for key in logs if key.startswith("Cycle")]
+    return max((entry[0] for entry in archived if entry), default=0) + 1
+
+def exercise_name(week_num: int, day_idx: int, ex_idx: int, program: List[List[Dict[str, Any]]] = program_structure) -> str:
+    if week_num < 1: return ""
+    try: return program[week_num-1][day_idx]['exercises'][ex_idx]['name']
+    except IndexError: return ""
+
+# --- Compiled Program ---
+# Read-only form of a program for hot paths: one __slots__ record per distinct
+# exercise (weeks share records for unchanged cells) with sets/reps parsed once
+# into (low, high) pairs, addressed through a flat tuple and per-day offsets.
+def parse_range(value: Union[int, str]) -> Tuple[int, int]:
+    low = get_target_reps(value)  # same parse as get_numeric_sets for sets
+    if isinstance(value, str) and '-' in value:
+        try: return (low, int(value.split('-')[-1]))
+        except ValueError: return (low, low)
+    return (low, low)
+
+class Exercise:
+    __slots__ = ('name', 'type', 'sets', 'reps', 'rest', 'rpe', 'notes', 'sets_range', 'reps_range')
+
+    def __init__(self, ex_data: Dict[str, Any]):
+        self.name = ex_data['name']
+        self.type = ex_data['type']
+        self.sets = ex_data['sets']
+        self.reps = ex_data['reps']
+        self.rest = ex_data['rest']
+        self.rpe = ex_data['rpe']
+        self.notes = ex_data['notes']
+        self.sets_range = parse_range(self.sets)
+        self.reps_range = parse_range(self.reps)
+
+class CompiledProgram:
+    __slots__ = ('week_count', 'day_names', 'cells', 'offsets', 'exercise_counts')
+
+    def __init__(self, program: List[List[Dict[str, Any]]]):
+        records: Dict[Tuple, Exercise] = {}
+        cells: List[Exercise] = []
+        day_names, offsets, exercise_counts = [], [], []
+        for week_data in program:
+            day_names.append(tuple(day_data['day_name'] for day_data in week_data))
+            offsets.append(tuple(len(cells) + sum(len(d['exercises']) for d in week_data[:i]) for i in range(len(week_data))))
+            exercise_counts.append(tuple(len(day_data['exercises']) for day_data in week_data))
+            for day_data in week_data:
+                for ex_data in day_data['exercises']:
+                    key = tuple(sorted(ex_data.items()))
+                    if key not in records:
+                        records[key] = Exercise(ex_data)
+                    cells.append(records[key])
+        self.week_count = len(program)
+        self.day_names = tuple(day_names)
+        self.offsets = tuple(offsets)
+        self.exercise_counts = tuple(exercise_counts)
+        self.cells = tuple(cells)
+
+    def exercise(self, week_num: int, day_idx: int, ex_idx: int) -> Exercise:
+        return self.cells[self.offsets[week_num-1][day_idx] + ex_idx]
+
+# Keyed by id(program); the program is kept alongside so the id stays valid.
+_compiled_programs: Dict[int, Tuple[Any, CompiledProgram]] = {}
+
+def compile_program(program: List[List[Dict[str, Any]]]) -> CompiledProgram:
+    cached = _compiled_programs.get(id(program))
+    if cached is None:
+        cached = _compiled_programs[id(program)] = (program, CompiledProgram(program))
+    return cached[1]
+
+def register_compiled(program: List[List[Dict[str, Any]]], compiled: CompiledProgram) -> None:
+    # For programs compiled elsewhere (program_loader's disk cache).
+    _compiled_programs[id(program)] = (program, compiled)
+
+compiled_program = compile_program(program_structure)
+
+# A log's actual_reps is the total over the cell's sets; analytics and the
+# estimator divide by this to get reps per set.
+def logged_sets(ex: Exercise, week_num: int, rules: ProgressionRules = DEFAULT_RULES) -> int:
+    # The program's (low) set count, else the rules' for pull-ups and
+    # MAIN_LIFT_SETS for main lifts, else 1.
+    if ex.sets_range[0]: return ex.sets_range[0]
+    if ex.type == 'pullup': return rules.pullup_sets or 1
+    if is_main_lift(ex.type, rules): return parse_range(MAIN_LIFT_SETS.get(week_num, 1))[0] or 1
+    return 1
+
+def is_main_lift(ex_type: str, rules: ProgressionRules = DEFAULT_RULES) -> bool:
+    return ex_type in ONE_RM_TYPES or ex_type in rules.main_lift_types
+
+def reps_per_set(ex: Exercise, week_num: int, total_reps: float, rules: ProgressionRules = DEFAULT_RULES) -> float:
+    return total_reps / logged_sets(ex, week_num, rules)
+
+def lift_names(program: List[List[Dict[str, Any]]] = program_structure, rules: ProgressionRules = DEFAULT_RULES) -> List[str]:
+    # The 1RM inputs a program reads: MAIN_LIFT_NAMES it has, in that order,
+    # then its other main lifts (is_main_lift) as they first appear, then the pull-up.
+    found: List[str] = []
+    for ex in compile_program(program).cells:
+        if is_main_lift(ex.type, rules) and ex.name not in found: found.append(ex.name)
+    return [name for name in MAIN_LIFT_NAMES if name in found] + [name for name in found if name not in MAIN_LIFT_NAMES] + [rules.pullup_name]
+
+# Pull-Up Suggestion Logic
+def get_pullup_suggestion_new(
+    current_week_num: int,
+    max_reps_input: int,
+    prev_week_actual_weight: float = 0.0,
+    prev_week_actual_reps: int = 0,
+    rules: ProgressionRules = DEFAULT_RULES
+) -> Dict[str, Any]:
+    if current_week_num == rules.deload_week:  # Deload Week
+        last = rules.deload_week - 1
+        deload_sets = rules.pullup_deload_sets
+        deload_reps, deload_weight, deload_notes = f"50% Wk {last}", 0, f"Deload: ~50% of Week {last} reps/intensity"
+        if prev_week_actual_weight > 0:
+            if prev_week_actual_weight <= rules.pullup_increment * 2:
+                deload_weight = 0
+                deload_notes = f"Deload: Bodyweight Focus (~50% Wk{last} reps: {prev_week_actual_reps})"
+            else:
+                deload_weight = round_to_nearest(prev_week_actual_weight * rules.deload_percent, rules.weight_rounding)
+                deload_notes = f"Deload: Use ~{rules.deload_percent*100:.0f}% of Week {last} weight ({prev_week_actual_weight} lbs)"
+            deload_reps = 5
+        elif prev_week_actual_reps > 0:
+            reps_calc = max(1, prev_week_actual_reps // 2)
+            reps_per_set = max(3, reps_calc // deload_sets) if deload_sets > 0 else 3
+            deload_reps = f"~{reps_per_set}"
+            deload_notes = f"Deload: ~50% of Week {last} total reps ({prev_week_actual_reps} reps)"
+        else:
+            deload_reps, deload_notes = "Light", "Deload: Light effort"
+        return {"sets": deload_sets, "reps": deload_reps, "weight": deload_weight, "notes": deload_notes}
+
+    target_sets, target_reps, base_notes = rules.pullup_sets, rules.pullup_reps, "Aim for reps."
+    next_target_weight, progression_note = 0.0, ""
+    threshold, increment = rules.pullup_threshold, rules.pullup_increment
+
+    if current_week_num > 1:
+        estimated_reps_per_set = (prev_week_actual_reps / rules.pullup_sets) if rules.pullup_sets > 0 else 0
+        if estimated_reps_per_set > threshold:
+            next_target_weight = prev_week_actual_weight + increment
+            progression_note = f"Add {increment} lbs (Avg >{threshold} reps/set Wk{current_week_num-1})"
+        else:
+            next_target_weight = prev_week_actual_weight
+            progression_note = (f"Repeat {prev_week_actual_weight} lbs (Avg reps/set <= {threshold} Wk{current_week_num-1})"
+                               if prev_week_actual_weight > 0 else f"Repeat BW (Avg reps/set <= {threshold} Wk{current_week_num-1})")
+    elif max_reps_input >= rules.pullup_low_rep_max + 1:  # i.e. >= 8, as before
+        progression_note = "Start Bodyweight"
+
+    if max_reps_input == 0:
+        target_sets, target_reps, next_target_weight, base_notes, progression_note = "3-5", "3-5 Negatives", 0, "Focus on Negatives (3-5 sec lowering)", ""
+    elif 1 <= max_reps_input <= rules.pullup_low_rep_max:
+        target_sets, target_reps, next_target_weight, base_notes, progression_note = "Multiple", "1-3", 0, f"Accumulate reps via low-rep sets (Max: {max_reps_input})", ""
+
+    final_notes = f"{base_notes} {progression_note}".strip().replace(" .", ".")
+    return {"sets": target_sets, "reps": target_reps, "weight": next_target_weight, "notes": final_notes}
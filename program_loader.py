@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from typing import Dict, Any, List, Optional, Tuple
+
+from program import (
+    PROGRAM_FILE, DEFAULT_1RM_VALUES, DEFAULT_RULES, ProgressionRules, CompiledProgram, Exercise,
+    program_structure, build_program_structure, compile_program, register_compiled,
+)
+from engine import CellPlan, build_plans, compile_plans
+
+# --- Program Files ---
+# A program is a JSON file: a day template, per-week overrides, progression
+# rule parameters and default 1RMs (see programs/default.json, which matches
+# the built-in program). Loading validates it, expands the weeks, compiles the
+# exercise table and every cell's plan, and, given a cache directory (the app
+# uses CACHE_DIR under its user_data_dir), pickles the result there keyed by
+# the SHA-256 of the file's bytes and of the code that compiles it (CODE_DIGEST),
+# so the next start with an unchanged file and app skips parsing and
+# validation and loads the tables as is. The command-line
+# tools take a --program file through resolve_program(), without a cache.
+PROGRAM_ENV = "STRENGTH_PROGRAM"   # path to a program file, overrides PROGRAM_FILE
+CACHE_DIR = "program_cache"        # directory name under the app's user_data_dir
+CACHE_VERSION = b"2"               # bump to drop every cached program
+
+EXERCISE_FIELDS = {'name': str, 'type': str, 'sets': (int, str), 'reps': (int, str),
+                   'rest': str, 'rpe': (int, float, str), 'notes': str}
+EXERCISE_DEFAULTS = {'sets': 0, 'reps': 0, 'rest': "", 'rpe': 0, 'notes': ""}
+NUMBER = (int, float)
+RULE_TYPES = {
+    'week1_percent': NUMBER, 'increment_on_success': NUMBER, 'deload_week': int, 'deload_percent': NUMBER,
+    'weight_rounding': NUMBER, 'main_lift_types': list, 'accessory_types': list, 'accessory_reps': str,
+    'pullup_name': str, 'pullup_sets': int, 'pullup_reps': (int, str), 'pullup_threshold': NUMBER,
+    'pullup_increment': NUMBER, 'pullup_deload_sets': int, 'pullup_low_rep_max': int,
+}
+
+class ProgramDefinition:
+    __slots__ = ('name', 'digest', 'structure', 'compiled', 'rules', 'default_1rm', 'plans')
+
+    def __init__(self, name: str, digest: str, structure: List[List[Dict[str, Any]]], rules: ProgressionRules,
+                 default_1rm: Dict[str, float], compiled: Optional[CompiledProgram] = None,
+                 plans: Optional[Tuple[CellPlan, ...]] = None):
+        self.name = name
+        self.digest = digest
+        self.structure = structure
+        self.compiled = compiled or CompiledProgram(structure)
+        self.rules = rules
+        self.default_1rm = default_1rm
+        self.plans = plans if plans is not None else build_plans(self.compiled, rules)
+        register_compiled(structure, self.compiled)
+
+    def __setstate__(self, state):
+        for name, value in state[1].items():
+            setattr(self, name, value)
+        register_compiled(self.structure, self.compiled)
+
+# --- Validation ---
+def _check(condition: bool, message: str) -> None:
+    if not condition: raise ValueError(message)
+
+def _check_fields(fields: Dict[str, Any], where: str, required: Tuple[str, ...] = ()) -> None:
+    _check(isinstance(fields, dict), f"{where}: expected an object")
+    for name in required:
+        _check(name in fields, f"{where}: missing '{name}'")
+    for name, value in fields.items():
+        _check(name in EXERCISE_FIELDS, f"{where}: unknown field '{name}'")
+        _check(isinstance(value, EXERCISE_FIELDS[name]) and not isinstance(value, bool), f"{where}: bad '{name}': {value!r}")
+    _check(fields.get('name', "x") != "", f"{where}: empty name")
+
+def parse_weeks(spec: str, weeks: int) -> range:
+    # "3" or "3-5", 1-based and inclusive.
+    try:
+        low, _, high = spec.partition('-')
+        first, last = int(low), int(high or low)
+    except ValueError:
+        raise ValueError(f"week_overrides: bad week range '{spec}'") from None
+    _check(1 <= first <= last <= weeks, f"week_overrides: weeks '{spec}' outside 1-{weeks}")
+    return range(first, last + 1)
+
+def parse_program(spec: Dict[str, Any]) -> Tuple[str, List[List[Dict[str, Any]]], ProgressionRules, Dict[str, float]]:
+    _check(isinstance(spec, dict), "program: expected an object")
+    weeks = spec.get('weeks')
+    _check(isinstance(weeks, int) and not isinstance(weeks, bool) and weeks >= 1, f"weeks: expected a positive integer, got {weeks!r}")
+    days = spec.get('days')
+    _check(isinstance(days, list) and days, "days: expected a non-empty list")
+    template = []
+    for day_idx, day in enumerate(days):
+        where = f"days[{day_idx}]"
+        _check(isinstance(day, dict) and isinstance(day.get('day_name'), str), f"{where}: expected an object with a 'day_name'")
+        exercises = day.get('exercises')
+        _check(isinstance(exercises, list) and exercises, f"{where}: expected a non-empty 'exercises' list")
+        for ex_idx, ex in enumerate(exercises):
+            _check_fields(ex, f"{where}.exercises[{ex_idx}]", required=('name', 'type'))
+        template.append({'day_name': day['day_name'], 'exercises': [{**EXERCISE_DEFAULTS, **ex} for ex in exercises]})
+
+    overrides: Dict[int, Dict[Tuple[int, int], Dict[str, Any]]] = {}
+    week_overrides = spec.get('week_overrides', {})
+    _check(isinstance(week_overrides, dict), "week_overrides: expected an object")
+    for week_spec, changes in week_overrides.items():
+        _check(isinstance(changes, list), f"week_overrides['{week_spec}']: expected a list")
+        override_weeks = parse_weeks(week_spec, weeks)
+        for change in changes:
+            where = f"week_overrides['{week_spec}']"
+            _check(isinstance(change, dict), f"{where}: expected objects")
+            fields = {k: v for k, v in change.items() if k not in ('day', 'exercise')}
+            day_idx, ex_idx = change.get('day'), change.get('exercise')
+            _check(isinstance(day_idx, int) and 0 <= day_idx < len(template), f"{where}: bad day {day_idx!r}")
+            _check(isinstance(ex_idx, int) and 0 <= ex_idx < len(template[day_idx]['exercises']), f"{where}: bad exercise {ex_idx!r}")
+            _check_fields(fields, where)
+            for week in override_weeks:
+                overrides.setdefault(week, {}).setdefault((day_idx, ex_idx), {}).update(fields)
+
+    rules = spec.get('rules', {})
+    _check(isinstance(rules, dict), "rules: expected an object")
+    for name, value in rules.items():
+        _check(name not in RULE_TYPES or (isinstance(value, RULE_TYPES[name]) and not isinstance(value, bool)),
+               f"rules: bad '{name}': {value!r}")
+    rules = DEFAULT_RULES.replace(**rules)
+    _check(rules.deload_week >= 2, "rules: deload_week must be at least 2")
+    _check(rules.weight_rounding > 0, "rules: weight_rounding must be positive")
+
+    default_1rm = spec.get('default_1rm', DEFAULT_1RM_VALUES)
+    _check(isinstance(default_1rm, dict) and all(isinstance(v, NUMBER) for v in default_1rm.values()),
+           "default_1rm: expected an object of numbers")
+    name = spec.get('name', "")
+    _check(isinstance(name, str), "name: expected a string")
+    return name, build_program_structure(template, overrides, weeks), rules, dict(default_1rm)
+
+# --- Cache ---
+def _code_digest() -> bytes:
+    # The modules that build a ProgramDefinition and the fields of every class
+    # pickled with it: changing either makes the old cache entries misses.
+    h = hashlib.sha256(CACHE_VERSION)
+    for module in (sys.modules[name] for name in ('program', 'engine', __name__)):
+        try:
+            with open(module.__file__, 'rb') as f: h.update(f.read())
+        except (OSError, TypeError):
+            h.update(module.__name__.encode())  # no source to read; the fields below still count
+    for cls in (ProgramDefinition, CompiledProgram, Exercise, CellPlan, ProgressionRules):
+        h.update(repr((cls.__module__, cls.__qualname__, cls.__slots__)).encode())
+    return h.digest()
+
+CODE_DIGEST = _code_digest()
+
+def program_digest(raw: bytes) -> str:
+    return hashlib.sha256(CODE_DIGEST + b"\0" + raw).hexdigest()
+
+def cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, f"program-{digest}.pickle")
+
+def _read_cache(path: str, digest: str) -> Optional[ProgramDefinition]:
+    # Any unreadable or stale entry just means compiling again; that includes
+    # pickles of classes that have since lost or gained a field (AttributeError).
+    try:
+        with open(path, 'rb') as f: definition = pickle.load(f)
+        return definition if isinstance(definition, ProgramDefinition) and definition.digest == digest else None
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError, IndexError):
+        return None
+
+def _write_cache(path: str, definition: ProgramDefinition) -> None:
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, 'wb') as f: pickle.dump(definition, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # caching is best effort
+
+# Keyed by digest, so reloading an unchanged file in-process is free.
+_loaded: Dict[str, ProgramDefinition] = {}
+
+def load_program(path: str, cache_dir: Optional[str] = None) -> ProgramDefinition:
+    # Raises OSError if the file can't be read and ValueError if it is invalid.
+    with open(path, 'rb') as f: raw = f.read()
+    digest = program_digest(raw)
+    definition = _loaded.get(digest)
+    if definition is not None: return definition
+    cached = cache_path(cache_dir, digest) if cache_dir else None
+    definition = _read_cache(cached, digest) if cached else None
+    if definition is None:
+        try: spec = json.loads(raw)
+        except ValueError as e: raise ValueError(f"{path}: not valid JSON: {e}") from None
+        name, structure, rules, default_1rm = parse_program(spec)
+        definition = ProgramDefinition(name or os.path.splitext(os.path.basename(path))[0], digest,
+                                       structure, rules, default_1rm)
+        if cached: _write_cache(cached, definition)
+    _loaded[digest] = definition
+    return definition
+
+def builtin_program() -> ProgramDefinition:
+    # program.py's own program_structure and constants; nothing to parse or cache.
+    definition = _loaded.get("builtin")
+    if definition is None:
+        compiled = compile_program(program_structure)
+        definition = _loaded["builtin"] = ProgramDefinition(
+            "Built-in", "builtin", program_structure, DEFAULT_RULES, DEFAULT_1RM_VALUES,
+            compiled=compiled, plans=compile_plans(compiled, DEFAULT_RULES))
+    return definition
+
+def program_path() -> str:
+    return os.environ.get(PROGRAM_ENV) or PROGRAM_FILE
+
+def resolve_program(path: Optional[str] = None) -> ProgramDefinition:
+    # A command-line tool's --program: the given file, else the one the app
+    # would load (program_path()), else the built-in program when the default
+    # PROGRAM_FILE is missing. Raises like load_program().
+    path = path or os.environ.get(PROGRAM_ENV)
+    if not path: return load_program(PROGRAM_FILE) if os.path.exists(PROGRAM_FILE) else builtin_program()
+    return load_program(path)
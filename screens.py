@@ -0,0 +1,191 @@
+from kivy.app import App
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.textinput import TextInput
+from kivy.uix.button import Button
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.popup import Popup
+from program import WEIGHT_ROUNDING, round_to_nearest, lift_names
+from profiling import profiler
+
+class InputScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        layout.add_widget(Label(text="Enter Your 1RM Values", font_size=20))
+
+        # One input per 1RM the loaded program reads, pull-up max reps last.
+        program = App.get_running_app().program
+        self.inputs = {}
+        for exercise in lift_names(program.structure, program.rules):
+            row = BoxLayout(orientation='horizontal', spacing=10)
+            row.add_widget(Label(text=exercise))
+            input_field = TextInput(text=str(program.default_1rm.get(exercise, "")), multiline=False)
+            self.inputs[exercise] = input_field
+            row.add_widget(input_field)
+            layout.add_widget(row)
+
+        save_button = Button(text="Save and Continue", size_hint=(1, 0.2))
+        save_button.bind(on_press=self.save_inputs)
+        layout.add_widget(save_button)
+
+        self.add_widget(layout)
+
+    def save_inputs(self, instance):
+        # Only the 1RM entries change; logs and the rest of the data stay as they are.
+        with profiler.span("input.save_inputs"):
+            app = App.get_running_app()
+            with app.undo_log.step():
+                for exercise, input_field in self.inputs.items():
+                    try: value = float(input_field.text)
+                    except ValueError: value = app.program.default_1rm.get(exercise, 0)
+                    app.store.set("1RM", exercise, value)
+        self.manager.current = 'main'
+
+class MainScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        self.title = Label(text="Strength Training Tracker", font_size=20)
+        layout.add_widget(self.title)
+
+        button_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint=(1, 0.2))
+        input_button = Button(text="Edit 1RMs")
+        input_button.bind(on_press=lambda x: setattr(self.manager, 'current', 'input'))
+        button_layout.add_widget(input_button)
+        new_1rm_button = Button(text="New 1RM Calc")
+        new_1rm_button.bind(on_press=lambda x: setattr(self.manager, 'current', 'new_1rm'))
+        button_layout.add_widget(new_1rm_button)
+        new_cycle_button = Button(text="New Cycle")
+        new_cycle_button.bind(on_press=lambda x: self.confirm_new_cycle())
+        button_layout.add_widget(new_cycle_button)
+        self.sync_button = Button(text="Sync")
+        self.sync_button.bind(on_press=lambda x: self.sync())
+        button_layout.add_widget(self.sync_button)
+        layout.add_widget(button_layout)
+
+        self.week_buttons = BoxLayout(orientation='vertical', spacing=5, size_hint=(1, 0.8))
+        scroll = ScrollView()
+        for week in range(1, App.get_running_app().program.compiled.week_count + 1):
+            btn = Button(text=f"Week {week}", size_hint_y=None, height=50)
+            btn.bind(on_press=lambda instance, w=week: self.show_week(w))
+            self.week_buttons.add_widget(btn)
+        scroll.add_widget(self.week_buttons)
+        layout.add_widget(scroll)
+
+        self.add_widget(layout)
+
+    def on_enter(self):
+        self.title.text = f"Strength Training Tracker - Cycle {App.get_running_app().history.cycle}"
+
+    def show_week(self, week_num):
+        self.manager.get_screen('week').week_num = week_num
+        self.manager.current = 'week'
+
+    def confirm_new_cycle(self):
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        content.add_widget(Label(text="Archive this cycle's logs and start a new cycle?"))
+        buttons = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=0.4)
+        popup = Popup(title="New Cycle", content=content, size_hint=(0.8, 0.4))
+        cancel = Button(text="Cancel")
+        cancel.bind(on_press=lambda x: popup.dismiss())
+        confirm = Button(text="Start Cycle")
+        confirm.bind(on_press=lambda x: (popup.dismiss(), self.start_new_cycle()))
+        buttons.add_widget(cancel)
+        buttons.add_widget(confirm)
+        content.add_widget(buttons)
+        popup.open()
+
+    def sync(self):
+        if App.get_running_app().start_sync(self.on_synced):
+            self.sync_button.text = "Syncing..."
+
+    def on_synced(self, stats, error):
+        if error is not None: self.sync_button.text = "Sync failed"
+        else: self.sync_button.text = f"Synced ({stats['sent']} up, {stats['received']} down)"
+        self.on_enter()
+
+    def start_new_cycle(self):
+        # The finished cycle stays in the logs under history keys.
+        from analytics import archive_cycle
+        app = App.get_running_app()
+        app.store.replace(archive_cycle(app.store.data))
+        app.history.start_new_cycle()
+        self.on_enter()
+
+class New1RMScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        layout.add_widget(Label(text="New 1RM Calculation (After Week 5)", font_size=20))
+        back_button = Button(text="Back", size_hint=(1, 0.1))
+        back_button.bind(on_press=lambda x: setattr(self.manager, 'current', 'main'))
+        layout.add_widget(back_button)
+
+        scroll = ScrollView()
+        content = GridLayout(cols=1, spacing=10, size_hint_y=None)
+        content.bind(minimum_height=content.setter('height'))
+
+        program = App.get_running_app().program
+        self.pullup_name = program.rules.pullup_name
+        exercises_for_1rm = lift_names(program.structure, program.rules)
+        self.inputs = {}
+        for ex_name in exercises_for_1rm:
+            ex_layout = BoxLayout(orientation='vertical', size_hint_y=None, height=120, spacing=5)
+            ex_layout.add_widget(Label(text=ex_name, size_hint_y=None, height=30))
+            row1 = BoxLayout(orientation='horizontal', spacing=5)
+            row1.add_widget(Label(text="Wk 5 Weight:", size_hint_x=0.4))
+            weight_input = TextInput(multiline=False, size_hint_x=0.6)
+            row1.add_widget(weight_input)
+            ex_layout.add_widget(row1)
+            row2 = BoxLayout(orientation='horizontal', spacing=5)
+            row2.add_widget(Label(text="Wk 5 Reps:", size_hint_x=0.4))
+            reps_input = TextInput(multiline=False, size_hint_x=0.6)
+            row2.add_widget(reps_input)
+            ex_layout.add_widget(row2)
+            result_label = Label(text="New 1RM: N/A", size_hint_y=None, height=30)
+            ex_layout.add_widget(result_label)
+            self.inputs[ex_name] = (weight_input, reps_input, result_label)
+            content.add_widget(ex_layout)
+
+        calc_button = Button(text="Calculate New 1RMs", size_hint_y=None, height=40)
+        calc_button.bind(on_press=self.calculate_new_1rm)
+        content.add_widget(calc_button)
+
+        scroll.add_widget(content)
+        layout.add_widget(scroll)
+        self.add_widget(layout)
+
+    def on_enter(self):
+        # Pre-fill from the logged history; estimator pulls in NumPy, so import on first use.
+        from estimator import estimate_one_rms, latest_sets
+        app = App.get_running_app()
+        data = app.store.data
+        estimates = estimate_one_rms(data, program=app.program.structure, rules=app.program.rules)
+        latest = latest_sets(data, program=app.program.structure, rules=app.program.rules)
+        for ex_name, (weight_input, reps_input, result_label) in self.inputs.items():
+            if ex_name in latest and not weight_input.text and not reps_input.text:
+                weight, reps = latest[ex_name]
+                weight_input.text = f"{weight:g}"
+                reps_input.text = str(int(round(reps)))
+            estimate = estimates.get(ex_name)
+            if estimate is None: continue   # not a lift of this program
+            if estimate["estimate"] is not None:
+                result_label.text = f"Estimated 1RM: {round_to_nearest(estimate['estimate'], WEIGHT_ROUNDING)} (from {estimate['sets']} logged sets)"
+            elif estimate.get("max_reps"):
+                result_label.text = f"Best logged reps/set: {estimate['max_reps']:g}"
+
+    def calculate_new_1rm(self, instance):
+        for ex_name, (weight_input, reps_input, result_label) in self.inputs.items():
+            try:
+                weight = float(weight_input.text)
+                reps = int(reps_input.text)
+                if ex_name != self.pullup_name:
+                    new_1rm = round_to_nearest(weight * (1 + reps / 30), WEIGHT_ROUNDING)
+                    result_label.text = f"New 1RM: {new_1rm}"
+                else:
+                    result_label.text = "New 1RM: Calculate manually"
+            except ValueError:
+                result_label.text = "New 1RM: Invalid input"
@@ -0,0 +1,310 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from program import (
+    MAIN_LIFT_NAMES, MAIN_LIFT_SETS, MAIN_LIFT_REPS, DEFAULT_1RM_VALUES, DEFAULT_RULES, ProgressionRules, parse_range,
+)
+from batch import round_to_nearest_array
+
+# --- Progression Simulator ---
+# Monte Carlo check of the progression rules: many simulated athletes run
+# cycle after cycle of the main-lift rules (PlanEngine) and the pull-up rules
+# (get_pullup_suggestion_new) and we look at where their loads end up and how
+# often the rules hold them in place. Every array holds one value per athlete
+# (per main lift), so a week of a cycle is a handful of NumPy operations over
+# all athletes of a chunk; chunks run in worker processes, each with its own
+# seed spawned from the run's seed so results don't depend on --jobs.
+#
+# Athletes: a true 1RM per lift, sampled from a profile (novice, intermediate,
+# advanced) that sets how fast it adapts, how much it slows down cycle over
+# cycle, day-to-day noise and fatigue. Reps at a weight follow Epley inverted,
+# 30 * (1RM / weight - 1), with SET_DROPOFF fewer per later set, capped at the
+# top of the rep range for main lifts and open-ended for pull-ups (added
+# weight on top of bodyweight). A week at or above STIMULUS_FLOOR of the true
+# 1RM makes the athlete stronger and more tired; the deload week clears most
+# of the fatigue. Each new cycle starts from retested 1RMs and pull-up max,
+# off by the profile's entry error.
+#
+# Sets and reps of the main lifts come from MAIN_LIFT_SETS/MAIN_LIFT_REPS, low
+# end for the success check like PlanEngine's prev_target_total; the day
+# template itself leaves them at 0 and never marks a cell as a main lift, so
+# simulating it as shipped would only show that main lifts never progress.
+#
+#   python -m simulator --athletes 100000 --cycles 10
+#   python -m simulator --rule increment_on_success=0.02,0.04,0.06 --rule deload_percent=0.5,0.6
+CHUNK_SIZE = 20000
+SET_DROPOFF = 1.0          # reps lost per set after the first
+STIMULUS_FLOOR = 0.5       # fraction of the true 1RM below which a week doesn't drive adaptation
+STIMULUS_RANGE = 0.3       # full stimulus at STIMULUS_FLOOR + STIMULUS_RANGE
+FATIGUE_CARRY = 0.6        # share of fatigue carried into the next week
+DELOAD_CARRY = 0.2         # share carried through the deload week
+BODYWEIGHT = (180.0, 25.0, 120.0, 280.0)  # lbs: mean, spread, min, max
+PERCENTILES = (5, 25, 50, 75, 95)
+SIM_RULES = ('week1_percent', 'increment_on_success', 'deload_week', 'deload_percent', 'weight_rounding',
+             'pullup_sets', 'pullup_threshold', 'pullup_increment', 'pullup_deload_sets', 'pullup_low_rep_max')
+
+class AthleteProfile:
+    __slots__ = ('name', 'share', 'strength', 'pullups', 'gain', 'decay', 'noise', 'fatigue', 'entry_error')
+
+    def __init__(self, name: str, share: float, strength: float, pullups: float, gain: float, decay: float,
+                 noise: float, fatigue: float, entry_error: float):
+        self.name = name
+        self.share = share              # of the simulated athletes
+        self.strength = strength        # true 1RMs relative to DEFAULT_1RM_VALUES
+        self.pullups = pullups          # mean bodyweight max reps
+        self.gain = gain                # true 1RM gain per full-stimulus week in cycle 1
+        self.decay = decay              # gain multiplier per cycle
+        self.noise = noise              # day-to-day spread of the 1RM (log scale)
+        self.fatigue = fatigue          # 1RM lost per full-stimulus week, before recovery
+        self.entry_error = entry_error  # spread of the 1RMs entered each cycle (log scale)
+
+PROFILES: Tuple[AthleteProfile, ...] = (
+    AthleteProfile("novice", 0.4, 0.8, 4, 0.010, 0.90, 0.04, 0.020, 0.10),
+    AthleteProfile("intermediate", 0.4, 1.0, 10, 0.005, 0.93, 0.05, 0.025, 0.05),
+    AthleteProfile("advanced", 0.2, 1.25, 16, 0.002, 0.95, 0.06, 0.030, 0.03),
+)
+
+def main_prescription(week: int, rules: ProgressionRules) -> Tuple[int, int, int]:
+    # (sets, low reps, high reps); weeks past the table's progress weeks use its
+    # last one and the deload week uses the table's deload week.
+    last = max(MAIN_LIFT_SETS)
+    table_week = last if week == rules.deload_week else min(week, last - 1)
+    sets = parse_range(MAIN_LIFT_SETS[table_week])[0]
+    low, high = parse_range(MAIN_LIFT_REPS[table_week])
+    return sets, low, high
+
+def sets_reps(capacity: np.ndarray, sets: int, cap: Optional[int] = None) -> np.ndarray:
+    # Total reps over sets at a given rep capacity.
+    total = np.zeros(capacity.shape)
+    for s in range(sets):
+        total += np.clip(np.floor(capacity - s * SET_DROPOFF), 0, cap)
+    return total
+
+def stimulus(load: np.ndarray, true_max: np.ndarray) -> np.ndarray:
+    return np.clip((load / true_max - STIMULUS_FLOOR) / STIMULUS_RANGE, 0, 1)
+
+# --- Simulation ---
+def simulate_chunk(athletes: int, cycles: int, rules: ProgressionRules, seed: np.random.SeedSequence,
+                   profiles: Tuple[AthleteProfile, ...] = PROFILES) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    shares = np.array([profile.share for profile in profiles])
+    profile = rng.choice(len(profiles), size=athletes, p=shares / shares.sum())
+    def per_athlete(field: str) -> np.ndarray:
+        return np.array([getattr(p, field) for p in profiles])[profile]
+    gain = per_athlete('gain') * rng.lognormal(0, 0.3, athletes)
+    decay, noise, fatigue_rate = per_athlete('decay'), per_athlete('noise'), per_athlete('fatigue')
+    entry_error = per_athlete('entry_error')
+    lifts = len(MAIN_LIFT_NAMES)
+    rounding, deload = rules.weight_rounding, rules.deload_week
+
+    # Main lifts, (athletes, lifts).
+    defaults = np.array([DEFAULT_1RM_VALUES[name] for name in MAIN_LIFT_NAMES], dtype=np.float64)
+    true_max = defaults * per_athlete('strength')[:, None] * rng.lognormal(0, 0.15, (athletes, lifts))
+    start_max = true_max.copy()
+    one_rm = true_max * rng.lognormal(0, entry_error[:, None], (athletes, lifts))
+    fatigue = np.zeros((athletes, lifts))
+    end_load = np.zeros((cycles, athletes, lifts), dtype=np.float32)
+    stalls = np.zeros(athletes, dtype=np.int32)
+    cycle_stalls = np.zeros(athletes, dtype=np.int32)
+
+    # Pull-ups, (athletes,): weights are added on top of bodyweight.
+    mean, spread, low, high = BODYWEIGHT
+    bodyweight = np.clip(rng.normal(mean, spread, athletes), low, high)
+    start_reps = rng.poisson(per_athlete('pullups'))
+    pull_max = bodyweight * (1 + start_reps / 30)
+    max_reps = start_reps.copy()
+    pull_fatigue = np.zeros(athletes)
+    pull_end = np.zeros((cycles, athletes), dtype=np.float32)
+    pull_path = np.zeros((cycles, athletes), dtype=np.int8)   # 0 negatives, 1 low-rep, 2 weighted
+    pull_stalls = np.zeros(athletes, dtype=np.int32)
+    pull_weeks = np.zeros(athletes, dtype=np.int32)
+
+    for cycle in range(cycles):
+        cycle_gain = gain * decay ** cycle
+        weighted = max_reps > rules.pullup_low_rep_max
+        pull_path[cycle] = np.where(weighted, 2, np.where(max_reps > 0, 1, 0))
+        prev_wt = prev_reps = prev_pull_wt = prev_pull_reps = None
+        for week in range(1, deload + 1):
+            # Main-lift targets, as in PlanEngine.
+            if week == 1:
+                target = one_rm * rules.week1_percent
+            elif week == deload:
+                target = one_rm * rules.deload_percent
+            else:
+                sets, low_reps, _ = main_prescription(week - 1, rules)
+                success = prev_reps >= sets * low_reps if sets * low_reps > 0 else np.zeros(prev_reps.shape, dtype=bool)
+                stalls += (~success).sum(axis=1, dtype=np.int32)
+                target = np.where(success, prev_wt * (1 + rules.increment_on_success), prev_wt)
+            weight = np.maximum(round_to_nearest_array(target, rounding), rounding)
+            sets, _, high_reps = main_prescription(week, rules)
+            today = true_max * (1 - fatigue) * rng.lognormal(0, noise[:, None], (athletes, lifts))
+            reps = sets_reps(30 * (today / weight - 1), sets, high_reps)
+            if week == deload - 1: end_load[cycle] = weight / start_max
+            push = stimulus(weight, true_max) if week < deload else 0
+            true_max *= 1 + cycle_gain[:, None] * push
+            fatigue = np.clip(fatigue * (DELOAD_CARRY if week == deload else FATIGUE_CARRY) + fatigue_rate[:, None] * push, 0, 0.5)
+            prev_wt, prev_reps = weight, reps
+
+            # Pull-ups, as in get_pullup_suggestion_new.
+            pull_sets = rules.pullup_sets
+            if week == deload:
+                heavy = prev_pull_wt > rules.pullup_increment * 2
+                pull_wt = np.where(heavy, round_to_nearest_array(prev_pull_wt * rules.deload_percent, rounding), 0.0)
+                pull_sets = rules.pullup_deload_sets
+            elif week == 1:
+                pull_wt = np.zeros(athletes)
+            else:
+                avg = prev_pull_reps / rules.pullup_sets if rules.pullup_sets > 0 else np.zeros(athletes)
+                add = avg > rules.pullup_threshold
+                pull_stalls += weighted & ~add
+                pull_weeks += weighted
+                pull_wt = np.where(add, prev_pull_wt + rules.pullup_increment, prev_pull_wt)
+            pull_wt = np.where(weighted, pull_wt, 0.0)
+            today = pull_max * (1 - pull_fatigue) * rng.lognormal(0, noise)
+            pull_reps = sets_reps(30 * (today / (bodyweight + pull_wt) - 1), pull_sets)
+            if week == deload - 1: pull_end[cycle] = pull_wt
+            push = stimulus(bodyweight + pull_wt, pull_max) if week < deload else 0
+            pull_max *= 1 + cycle_gain * push
+            pull_fatigue = np.clip(pull_fatigue * (DELOAD_CARRY if week == deload else FATIGUE_CARRY) + fatigue_rate * push, 0, 0.5)
+            prev_pull_wt, prev_pull_reps = pull_wt, pull_reps
+
+        if cycle: cycle_stalls += (end_load[cycle] <= end_load[cycle - 1]).sum(axis=1, dtype=np.int32)
+        one_rm = true_max * rng.lognormal(0, entry_error[:, None], (athletes, lifts))
+        tested = pull_max * rng.lognormal(0, entry_error)
+        max_reps = np.maximum(np.floor(30 * (tested / bodyweight - 1)), 0).astype(np.int64)
+
+    return {
+        "profile": profile.astype(np.int8), "end_load": end_load, "gain": (true_max / start_max).astype(np.float32),
+        "stalls": stalls, "cycle_stalls": cycle_stalls, "pull_end": pull_end, "pull_path": pull_path,
+        "pull_stalls": pull_stalls, "pull_weeks": pull_weeks,
+    }
+
+def simulate(athletes: int, cycles: int, rules: ProgressionRules = DEFAULT_RULES, seed: int = 0,
+             jobs: int = 0, chunk_size: int = CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    # Chunk results concatenated along the athlete axis, in chunk order.
+    if athletes < 1 or cycles < 1: raise ValueError("athletes and cycles must be positive")
+    if rules.deload_week < 2: raise ValueError("deload_week must be at least 2")
+    sizes = [min(chunk_size, athletes - start) for start in range(0, athletes, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = min(jobs or os.cpu_count() or 1, len(sizes))
+    if jobs == 1:
+        parts = [simulate_chunk(size, cycles, rules, child) for size, child in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(simulate_chunk, sizes, [cycles] * len(sizes), [rules] * len(sizes), seeds))
+    axis = {"end_load": 1, "pull_end": 1, "pull_path": 1}
+    return {name: np.concatenate([part[name] for part in parts], axis=axis.get(name, 0)) for name in parts[0]}
+
+# --- Report ---
+def percentiles(values: np.ndarray) -> Dict[str, float]:
+    if not values.size: return {}
+    return {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def _rate(count: np.ndarray, total: float) -> Optional[float]:
+    return round(float(count.sum()) / total, 4) if total else None
+
+def summarize(results: Dict[str, np.ndarray], rules: ProgressionRules = DEFAULT_RULES) -> Dict[str, Any]:
+    # Main-lift loads are the last progress week's weight relative to the
+    # athlete's starting true 1RM; pull-up loads are the added weight there.
+    end_load, pull_end, pull_path = results["end_load"], results["pull_end"], results["pull_path"]
+    cycles, athletes, lifts = end_load.shape
+    progress_weeks = max(rules.deload_week - 2, 0)
+
+    def group(rows: np.ndarray) -> Dict[str, Any]:
+        weighted = pull_path[-1, rows] == 2
+        return {
+            "athletes": int(rows.sum()),
+            "main": {
+                "end_load": percentiles(end_load[-1, rows]),
+                "strength_gain": percentiles(results["gain"][rows]),
+                "stall_rate": _rate(results["stalls"][rows], rows.sum() * cycles * lifts * progress_weeks),
+                "cycle_stall_rate": _rate(results["cycle_stalls"][rows], rows.sum() * (cycles - 1) * lifts),
+                "end_load_by_cycle": [round(float(np.median(end_load[c, rows])), 3) for c in range(cycles)],
+            },
+            "pullup": {
+                "end_weight": percentiles(pull_end[-1, rows][weighted]),
+                "stall_rate": _rate(results["pull_stalls"][rows], results["pull_weeks"][rows].sum()),
+                "weighted_share": round(float(weighted.mean()), 4) if rows.any() else None,
+            },
+        }
+
+    report = group(np.ones(athletes, dtype=bool))
+    report["profiles"] = {profile.name: group(results["profile"] == index) for index, profile in enumerate(PROFILES)}
+    return report
+
+def print_report(report: Dict[str, Any], changed: Dict[str, Any], out=sys.stdout) -> None:
+    label = ", ".join(f"{name}={value}" for name, value in changed.items()) or "default rules"
+    def pct(values: Dict[str, float], scale: float = 100, unit: str = "%") -> str:
+        return "  ".join(f"{name} {value * scale:.0f}{unit}" for name, value in values.items()) or "-"
+    def rate(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 100:.1f}%"
+    print(f"{label}: {report['athletes']} athletes, {report['seconds']:.2f} s", file=out)
+    for name, group in [("all", report)] + list(report["profiles"].items()):
+        main, pullup = group["main"], group["pullup"]
+        print(f"  {name:<13} main end load (% start 1RM): {pct(main['end_load'])}", file=out)
+        print(f"  {'':<13} true 1RM gain: {pct({k: v - 1 for k, v in main['strength_gain'].items()})}", file=out)
+        print(f"  {'':<13} stalls: {rate(main['stall_rate'])} of progress weeks, {rate(main['cycle_stall_rate'])} of cycles; "
+              f"pull-ups {rate(pullup['stall_rate'])} of weighted weeks, {rate(pullup['weighted_share'])} weighted, "
+              f"added {pct(pullup['end_weight'], 1, '')}", file=out)
+
+def parse_rule(spec: str) -> Tuple[str, List[Any]]:
+    # "name=value[,value...]", numeric rules only
+    name, _, values = spec.partition('=')
+    if name not in SIM_RULES or not values: raise ValueError(f"bad rule '{spec}' (one of: {', '.join(SIM_RULES)})")
+    kind = type(getattr(DEFAULT_RULES, name))
+    try: return name, [kind(value) if kind is int else float(value) for value in values.split(',')]
+    except ValueError: raise ValueError(f"bad rule value in '{spec}'") from None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m simulator", description="Simulate many athletes through the progression rules.")
+    parser.add_argument("-n", "--athletes", type=int, default=100000)
+    parser.add_argument("-c", "--cycles", type=int, default=10)
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: CPU count; 1 runs in-process)")
+    parser.add_argument("--seed", type=int, default=0, help="every rule set runs on the same athletes for a given seed")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="athletes per scheduled task")
+    parser.add_argument("--program", help="take the rules from a program file (see program_loader)")
+    parser.add_argument("--rule", action="append", default=[], metavar="NAME=V[,V...]",
+                        help="override a rule; several values (and several --rule) run every combination")
+    parser.add_argument("--json", help="also write the reports to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        base = DEFAULT_RULES
+        if args.program:
+            from program_loader import load_program
+            base = load_program(args.program).rules
+        overrides = [parse_rule(spec) for spec in args.rule]
+    except (OSError, ValueError) as e:
+        print(f"simulator: {e}", file=sys.stderr)
+        return 1
+
+    reports = []
+    names = [name for name, _ in overrides]
+    for values in itertools.product(*(values for _, values in overrides)):
+        changed = dict(zip(names, values))
+        rules = base.replace(**changed)
+        start = time.perf_counter()
+        try:
+            results = simulate(args.athletes, args.cycles, rules, args.seed, args.jobs, args.chunk_size)
+        except ValueError as e:
+            print(f"simulator: {e}", file=sys.stderr)
+            return 1
+        report = summarize(results, rules)
+        report["seconds"] = time.perf_counter() - start
+        report["rules"] = changed
+        print_report(report, changed)
+        reports.append(report)
+    if args.json:
+        with open(args.json, "w") as f: json.dump({"athletes": args.athletes, "cycles": args.cycles, "seed": args.seed, "reports": reports}, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
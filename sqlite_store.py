@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from program import (
+    DB_FILE, DATA_FILE, program_structure, log_key, parse_log_key, exercise_name, history_key, parse_history_key,
+    current_cycle,
+)
+from storage import JournalStore, empty_data
+
+# --- SQLite Storage ---
+# Optional backend with the same interface as JournalStore (exists, load,
+# append, remove, write_snapshot, flush, close), so DataStore can sit on top of it.
+# Logs live in a typed table keyed by (cycle, week, day, exercise) instead of
+# formatted strings; 1RM/new_1RM entries are kept as JSON values in `entries`.
+# Archived cycles (history_key entries) are rows of their own cycle; the
+# current cycle's number is kept in `meta`.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    cycle INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    exercise INTEGER NOT NULL,
+    exercise_name TEXT NOT NULL,
+    weight REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    PRIMARY KEY (cycle, week, day, exercise)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS logs_by_name ON logs (exercise_name, cycle, week, day);
+CREATE INDEX IF NOT EXISTS logs_by_week ON logs (week, cycle, day, exercise);
+CREATE TABLE IF NOT EXISTS entries (
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (section, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Constant SQL strings so sqlite3's statement cache keeps them prepared.
+UPSERT_LOG = ("INSERT OR REPLACE INTO logs (cycle, week, day, exercise, exercise_name, weight, reps, timestamp) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+UPSERT_ENTRY = "INSERT OR REPLACE INTO entries (section, key, value) VALUES (?, ?, ?)"
+DELETE_LOG = "DELETE FROM logs WHERE cycle = ? AND week = ? AND day = ? AND exercise = ?"
+DELETE_ENTRY = "DELETE FROM entries WHERE section = ? AND key = ?"
+SELECT_ALL = "SELECT cycle, week, day, exercise, weight, reps FROM logs"
+SELECT_BY_NAME = ("SELECT cycle, week, day, exercise, exercise_name, weight, reps, timestamp FROM logs "
+                  "WHERE exercise_name = ? ORDER BY cycle, week, day")
+SELECT_BY_NAME_CYCLE = ("SELECT cycle, week, day, exercise, exercise_name, weight, reps, timestamp FROM logs "
+                        "WHERE exercise_name = ? AND cycle = ? ORDER BY week, day")
+SELECT_BY_WEEK = ("SELECT cycle, week, day, exercise, exercise_name, weight, reps, timestamp FROM logs "
+                  "WHERE week = ? ORDER BY cycle, day, exercise")
+SELECT_BY_WEEK_CYCLE = ("SELECT cycle, week, day, exercise, exercise_name, weight, reps, timestamp FROM logs "
+                        "WHERE week = ? AND cycle = ? ORDER BY day, exercise")
+LOG_COLUMNS = ("cycle", "week", "day", "exercise", "exercise_name", "weight", "reps", "timestamp")
+
+class SQLiteStore:
+    def __init__(self, path: str = DB_FILE, cycle: int = 1, migrate_from: Optional[str] = DATA_FILE,
+                 program: List[List[Dict[str, Any]]] = program_structure):
+        self.path = path
+        self.cycle = cycle
+        self.migrate_from = migrate_from
+        self.program = program   # names the exercise_name column
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # DataStore appends from its writer thread; the lock serializes access.
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self._conn = conn
+            self._migrate()
+            row = conn.execute("SELECT value FROM meta WHERE key = 'current_cycle'").fetchone()
+            if row: self.cycle = int(row[0])
+        return self._conn
+
+    def _migrate(self) -> None:
+        # One-shot import of an existing workout_data.json (plus its journal).
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone(): return
+        if self.migrate_from and JournalStore(self.migrate_from).exists():
+            journal = JournalStore(self.migrate_from)
+            data = journal.load()
+            journal.close()
+            self._write(data)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (self.migrate_from or "",))
+        conn.commit()
+
+    def exists(self) -> bool:
+        if os.path.exists(self.path):
+            with self._lock:
+                conn = self._connect()
+                return bool(conn.execute("SELECT 1 FROM entries LIMIT 1").fetchone() or
+                            conn.execute("SELECT 1 FROM logs LIMIT 1").fetchone())
+        return bool(self.migrate_from and JournalStore(self.migrate_from).exists())
+
+    def load(self) -> Dict[str, Any]:
+        data = empty_data()
+        with self._lock:
+            conn = self._connect()
+            for section, key, value in conn.execute("SELECT section, key, value FROM entries"):
+                data.setdefault(section, {})[key] = json.loads(value)
+            logs = data["logs"]
+            for cycle, week, day, exercise, weight, reps in conn.execute(SELECT_ALL):
+                key = log_key(week, day, exercise) if cycle == self.cycle else history_key(cycle, week, day, exercise)
+                logs[key] = {"actual_weight": weight, "actual_reps": reps}
+        return data
+
+    def append(self, section: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._put(self._connect(), section, key, value)
+
+    def remove(self, section: str, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            row = self._log_row(section, key)
+            if row is None: conn.execute(DELETE_ENTRY, (section, key))
+            else: conn.execute(DELETE_LOG, row)
+
+    def _log_row(self, section: str, key: str) -> Optional[Tuple[int, int, int, int]]:
+        # (cycle, week, day, exercise) for a log key, None for any other entry.
+        if section != "logs": return None
+        cell = parse_log_key(key)
+        if cell is not None: return (self.cycle,) + tuple(cell)
+        return parse_history_key(key)
+
+    def _put(self, conn: sqlite3.Connection, section: str, key: str, value: Any) -> None:
+        row = self._log_row(section, key)
+        if row is None:
+            conn.execute(UPSERT_ENTRY, (section, key, json.dumps(value)))
+            return
+        cycle, week, day, exercise = row
+        conn.execute(UPSERT_LOG, (cycle, week, day, exercise, exercise_name(week, day, exercise, self.program),
+                                  value.get("actual_weight", 0), value.get("actual_reps", 0), time.time()))
+
+    def write_snapshot(self, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._connect()
+            self._write(data)
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        # A snapshot holds every cycle, so it replaces all rows.
+        conn = self._conn
+        self.cycle = current_cycle(data.get("logs", {}))
+        with conn:
+            conn.execute("DELETE FROM logs")
+            conn.execute("DELETE FROM entries")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('current_cycle', ?)", (str(self.cycle),))
+            for section, values in data.items():
+                if not isinstance(values, dict): continue
+                for key, value in values.items():
+                    self._put(conn, section, key, value)
+
+    def set_current_cycle(self, cycle: int) -> None:
+        # Renumbers the current cycle's rows; later plain log keys land in `cycle`.
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("UPDATE logs SET cycle = ? WHERE cycle = ?", (cycle, self.cycle))
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('current_cycle', ?)", (str(cycle),))
+            self.cycle = cycle
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    # --- Queries ---
+    def logs_for_exercise(self, name: str, cycle: Optional[int] = None) -> List[Dict[str, Any]]:
+        if cycle is None:
+            return self._query(SELECT_BY_NAME, (name,))
+        return self._query(SELECT_BY_NAME_CYCLE, (name, cycle))
+
+    def logs_for_week(self, week_num: int, cycle: Optional[int] = None) -> List[Dict[str, Any]]:
+        if cycle is None:
+            return self._query(SELECT_BY_WEEK, (week_num,))
+        return self._query(SELECT_BY_WEEK_CYCLE, (week_num, cycle))
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [dict(zip(LOG_COLUMNS, row)) for row in rows]
@@ -0,0 +1,404 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+from program import DATA_FILE
+from profiling import profiler
+
+# --- Journaled Storage ---
+# DATA_FILE stays the snapshot, in the same layout it has always had. Every
+# save appends one JSON line to DATA_FILE + ".journal" (a removal appends a
+# tombstone line); loading replays the
+# snapshot, then any rotated journal left by an interrupted compaction, then
+# the live journal. Compaction rotates the journal and folds it into a new
+# snapshot on a background thread, written to a temp file and renamed.
+JOURNAL_SUFFIX = ".journal"
+ROTATED_SUFFIX = ".journal.1"
+SYNC_EVERY = 8        # appends between fsyncs
+COMPACT_EVERY = 256   # minimum journal records before compacting
+
+def empty_data() -> Dict[str, Any]:
+    return {"1RM": {}, "logs": {}, "new_1RM": {}}
+
+def _fsync_dir(path: str) -> None:
+    if not hasattr(os, 'O_DIRECTORY'): return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try: os.fsync(fd)
+    finally: os.close(fd)
+
+def write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+def apply_record(data: Dict[str, Any], record: Dict[str, Any]) -> None:
+    # A record with "d" is a tombstone: the entry was removed.
+    if record.get("d"): data.get(record["s"], {}).pop(record["k"], None)
+    else: data.setdefault(record["s"], {})[record["k"]] = record["v"]
+
+def replay_journal(journal_path: str, data: Dict[str, Any]) -> Tuple[int, int]:
+    # Applies complete records; returns (records applied, byte offset after the last one).
+    if not os.path.exists(journal_path): return 0, 0
+    count, good_offset = 0, 0
+    with open(journal_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'): break
+            try: record = json.loads(line)
+            except ValueError: break
+            apply_record(data, record)
+            good_offset += len(line)
+            count += 1
+    return count, good_offset
+
+def read_data(path: str = DATA_FILE) -> Dict[str, Any]:
+    # Read-only load of snapshot + journals, for tools that must not touch the files.
+    data = empty_data()
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            data.update(json.load(f))
+    replay_journal(path + ROTATED_SUFFIX, data)
+    replay_journal(path + JOURNAL_SUFFIX, data)
+    return data
+
+class JournalStore:
+    def __init__(self, path: str = DATA_FILE, sync_every: int = SYNC_EVERY, compact_every: int = COMPACT_EVERY, background: bool = True):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.rotated_path = path + ROTATED_SUFFIX
+        self.sync_every = sync_every
+        self.compact_every = compact_every
+        self.background = background
+        self.data: Dict[str, Any] = empty_data()
+        self._lock = threading.Lock()
+        self._journal = None
+        self._records = 0
+        self._unsynced = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._fold_error: Optional[OSError] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def load(self) -> Dict[str, Any]:
+        with self._lock:
+            self._close_journal()
+            data = empty_data()
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data.update(json.load(f))
+            recovered = os.path.exists(self.rotated_path)
+            if recovered:
+                self._replay(self.rotated_path, data)
+            self._records = self._replay(self.journal_path, data)
+            self.data = data
+            if recovered:
+                # A compaction was interrupted: fold everything now so the
+                # rotated journal can go before new records are appended.
+                write_json_atomic(self.path, data)
+                os.remove(self.rotated_path)
+                if os.path.exists(self.journal_path): os.remove(self.journal_path)
+                self._records = 0
+            self._journal = open(self.journal_path, 'a')
+        return self.data
+
+    def _replay(self, journal_path: str, data: Dict[str, Any]) -> int:
+        count, good_offset = replay_journal(journal_path, data)
+        if os.path.exists(journal_path) and good_offset < os.path.getsize(journal_path):
+            # Torn tail from a crash mid-append; drop it so new records start on a clean line.
+            with open(journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+        return count
+
+
+    def append(self, section: str, key: str, value: Any) -> None:
+        self._write_record({"s": section, "k": key, "v": value})
+
+    def remove(self, section: str, key: str) -> None:
+        self._write_record({"s": section, "k": key, "d": 1})
+
+    def _write_record(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write(line)
+            apply_record(self.data, record)
+            self._records += 1
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()
+            # Scaling the threshold with the history size keeps compaction amortized O(1) per save.
+            if self._records >= max(self.compact_every, len(self.data["logs"])):
+                self._start_compaction()
+
+    def write_snapshot(self, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self.wait()  # the compactor never takes the lock, so joining here is safe
+            self._close_journal()
+            write_json_atomic(self.path, data)
+            # The snapshot supersedes both journals, including one left by a failed fold.
+            if os.path.exists(self.rotated_path): os.remove(self.rotated_path)
+            if os.path.exists(self.journal_path): os.remove(self.journal_path)
+            self._fold_error = None
+            self.data = data
+            self._records = 0
+            self._journal = open(self.journal_path, 'a')
+
+    def flush(self) -> None:
+        with self._lock:
+            self._sync()
+            self._raise_fold_error()
+
+    def compact(self) -> None:
+        with self._lock:
+            self._start_compaction()
+        self.wait()
+        with self._lock:
+            self._raise_fold_error()
+
+    def wait(self) -> None:
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self) -> None:
+        with self._lock:
+            self.wait()
+            self._close_journal()
+            self._raise_fold_error()
+
+    # --- Internals (called with the lock held) ---
+    def _sync(self) -> None:
+        if self._journal is None or not self._unsynced: return
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._unsynced = 0
+
+    def _raise_fold_error(self) -> None:
+        # A failed fold loses nothing (its records stay in the rotated journal
+        # and the next compaction retries), but the caller should know.
+        error, self._fold_error = self._fold_error, None
+        if error is not None: raise error
+
+    def _close_journal(self) -> None:
+        if self._journal is None: return
+        self._sync()
+        self._journal.close()
+        self._journal = None
+
+    def _start_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive(): return
+        self._close_journal()
+        if os.path.exists(self.rotated_path) and os.path.exists(self.journal_path):
+            # A previous fold failed; keep its records on disk until one succeeds.
+            with open(self.journal_path, 'rb') as src, open(self.rotated_path, 'ab') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        elif os.path.exists(self.journal_path):
+            os.replace(self.journal_path, self.rotated_path)
+        self._journal = open(self.journal_path, 'a')
+        self._records = 0
+        # Entries are replaced, never mutated in place, so copying the section dicts is enough.
+        snapshot = {section: dict(values) if isinstance(values, dict) else values for section, values in self.data.items()}
+        if self.background:
+            self._compactor = threading.Thread(target=self._fold, args=(snapshot,), daemon=True)
+            self._compactor.start()
+        else:
+            self._fold(snapshot)
+
+    def _fold(self, snapshot: Dict[str, Any]) -> None:
+        try:
+            write_json_atomic(self.path, snapshot)
+            if os.path.exists(self.rotated_path): os.remove(self.rotated_path)
+        except OSError as e:
+            self._fold_error = e  # raised by the next flush()/compact()/close()
+
+def diff_documents(old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    # (entries added or changed, entries removed) across the dict sections.
+    changed, removed = [], []
+    for section in old.keys() | new.keys():
+        before, after = old.get(section), new.get(section)
+        if before is after: continue
+        before = before if isinstance(before, dict) else {}
+        after = after if isinstance(after, dict) else {}
+        changed.extend((section, key) for key, value in after.items() if key not in before or before[key] != value)
+        removed.extend((section, key) for key in before if key not in after)
+    return changed, removed
+
+# --- In-Memory Data Store ---
+# The UI reads and writes DataStore.data directly and never touches the disk.
+# set() and remove() mark an entry dirty; a writer thread drains the dirty
+# entries into the JournalStore, so several saves of the same entry between two
+# drains cost a single append. Completion is reported on the Kivy main thread via Clock.
+REMOVED = object()  # a dirty entry to be written as a tombstone
+
+def _clock_schedule(callback: Callable[[], None]) -> None:
+    from kivy.clock import Clock
+    Clock.schedule_once(lambda dt: callback())
+
+class DataStore:
+    # journal is any backend with JournalStore's interface (e.g. sqlite_store.SQLiteStore).
+    def __init__(self, journal: JournalStore, schedule: Callable[[Callable[[], None]], None] = _clock_schedule):
+        self.journal = journal
+        self.data: Dict[str, Any] = empty_data()
+        self._schedule = schedule
+        self._listeners: List[Callable[[List[Tuple[str, str]], Optional[Exception]], None]] = []
+        self._change_listeners: List[Callable[[List[Tuple[str, str]], List[Tuple[str, str]]], None]] = []
+        self._overwrite_listeners: List[Callable[[Dict[str, Any], Optional[Tuple[str, str]]], None]] = []
+        self._drain_listeners: List[Callable[[], None]] = []
+        self._cond = threading.Condition()
+        self._dirty: Dict[Tuple[str, str], Any] = {}
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._queued = 0
+        self._written = 0
+        self._stopping = False
+        self._writer: Optional[threading.Thread] = None
+
+    def load(self, default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if not self.journal.exists() and default is not None:
+            self.journal.write_snapshot(default)
+        loaded = self.journal.load() if self.journal.exists() else empty_data()
+        # The journal keeps its own section dicts; the UI gets separate ones.
+        self.data = {section: dict(values) if isinstance(values, dict) else values for section, values in loaded.items()}
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="DataStoreWriter", daemon=True)
+            self._writer.start()
+        return self.data
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        return self.data.get(section, {}).get(key, default)
+
+    def set(self, section: str, key: str, value: Any) -> None:
+        values = self.data.get(section, {})
+        # Saving an unchanged value is not a change: nothing to notify, undo or write.
+        if key in values and values[key] == value: return
+        if self._overwrite_listeners and key in values:
+            for callback in self._overwrite_listeners:
+                callback(self.data, (section, key))
+        self.data.setdefault(section, {})[key] = value
+        for callback in self._change_listeners:
+            callback([(section, key)], [])
+        # Queued after the listeners, so whatever they queue for the drain (sync records) goes with it.
+        with self._cond:
+            self._dirty[(section, key)] = value
+            self._queued += 1
+            self._cond.notify()
+
+    def remove(self, section: str, key: str) -> None:
+        # Removes one entry without replacing the document; written as a tombstone.
+        if key not in self.data.get(section, {}): return
+        for callback in self._overwrite_listeners:
+            callback(self.data, (section, key))
+        del self.data[section][key]
+        for callback in self._change_listeners:
+            callback([], [(section, key)])
+        with self._cond:
+            self._dirty[(section, key)] = REMOVED
+            self._queued += 1
+            self._cond.notify()
+
+    def replace(self, data: Dict[str, Any]) -> None:
+        for callback in self._overwrite_listeners:
+            callback(self.data, None)
+        old, self.data = self.data, data
+        if self._change_listeners:
+            changed, removed = diff_documents(old, data)
+            for callback in self._change_listeners:
+                callback(changed, removed)
+        snapshot = {section: dict(values) if isinstance(values, dict) else values for section, values in data.items()}
+        with self._cond:
+            self._dirty.clear()  # folded into the snapshot
+            self._snapshot = snapshot
+            self._queued += 1
+            self._cond.notify()
+
+    def is_dirty(self) -> bool:
+        with self._cond:
+            return self._written < self._queued
+
+    def bind_changed(self, callback: Callable[[List[Tuple[str, str]], List[Tuple[str, str]]], None]) -> None:
+        # Called synchronously, once the data has changed, with the (section, key)
+        # entries set or removed by set()/remove()/replace().
+        self._change_listeners.append(callback)
+
+    def bind_overwriting(self, callback: Callable[[Dict[str, Any], Optional[Tuple[str, str]]], None]) -> None:
+        # Called synchronously with the data about to change, before set() writes or
+        # remove() drops an existing entry (with that entry) and before replace()
+        # (with None); see
+        # backups.py and undo.py.
+        self._overwrite_listeners.append(callback)
+
+    def bind_flushed(self, callback: Callable[[List[Tuple[str, str]], Optional[Exception]], None]) -> None:
+        self._listeners.append(callback)
+
+    def bind_drained(self, callback: Callable[[], None]) -> None:
+        # Called on the writer thread after each batch is written, for files kept
+        # alongside the data (see sync.py). An OSError fails the batch like a
+        # failed write: it is reported to bind_flushed and retried.
+        self._drain_listeners.append(callback)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            target = self._queued
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self._written >= target or self._writer is None, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join(timeout)
+            self._writer = None
+        self.journal.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty or self._snapshot is not None or self._stopping)
+                if self._stopping and not self._dirty and self._snapshot is None:
+                    return
+                dirty, self._dirty = self._dirty, {}
+                snapshot, self._snapshot = self._snapshot, None
+                target = self._queued
+            error: Optional[Exception] = None
+            start = time.perf_counter()
+            try:
+                if snapshot is not None:
+                    self.journal.write_snapshot(snapshot)
+                for (section, key), value in dirty.items():
+                    if value is REMOVED: self.journal.remove(section, key)
+                    else: self.journal.append(section, key, value)
+                self.journal.flush()
+                for callback in self._drain_listeners:
+                    callback()
+                profiler.record("store.write_batch", start, time.perf_counter())
+                profiler.count("store.entries_written", len(dirty))
+            except OSError as e:
+                error = e
+                with self._cond:
+                    # Keep failed entries for the next drain unless they were overwritten meanwhile.
+                    for entry, value in dirty.items():
+                        self._dirty.setdefault(entry, value)
+                    if snapshot is not None and self._snapshot is None:
+                        self._snapshot = snapshot
+            with self._cond:
+                if error is None:
+                    self._written = target
+                self._cond.notify_all()
+            if self._listeners:
+                flushed = list(dirty)
+                self._schedule(lambda: self._notify(flushed, error))
+            if error is not None:
+                time.sleep(1.0)  # back off before retrying a failing disk
+
+    def _notify(self, flushed: List[Tuple[str, str]], error: Optional[Exception]) -> None:
+        for callback in self._listeners:
+            callback(flushed, error)
@@ -0,0 +1,377 @@
+import argparse
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from typing import Dict, Any, List, Optional, Callable, Set, Tuple
+
+from program import DATA_FILE, DB_FILE, SYNC_FILE, SYNC_URL, STORAGE_BACKEND
+from storage import DataStore, _fsync_dir
+from profiling import profiler
+
+# --- Sync ---
+# Delta sync of logs, 1RM and new_1RM with sync_server. Every entry carries a
+# version (Lamport counter, device id): a local change bumps the device's
+# counter, seeing a remote version moves the counter past it, and per entry
+# the higher version wins (the device id breaks ties), so concurrent edits of
+# one entry settle the same way on every device while edits of different
+# entries never conflict. Removals are versioned too (tombstones). A version
+# also keeps a hash of the value it was given to, so a value changed while
+# the app wasn't watching (an import, a restored file) gets a new one on start.
+#
+# A round trip pushes up to BATCH_SIZE locally changed entries and pulls up
+# to BATCH_SIZE entries changed on the server since the device's cursor;
+# bodies are gzipped JSON. Versions, pending entries and the cursor live in
+# SYNC_FILE: local changes are queued as they happen and appended by the
+# DataStore writer thread along with the data, and the file is compacted
+# after each sync on the sync thread.
+SYNC_ENV = "STRENGTH_SYNC_URL"
+SYNC_SECTIONS = ("logs", "1RM", "new_1RM")
+BATCH_SIZE = 500
+TIMEOUT = 10.0  # seconds per round trip
+
+Entry = Tuple[str, str]                 # (section, key)
+Version = Tuple[int, str, bool, Optional[str]]   # (counter, device, removed, value hash)
+
+def value_hash(value: Any) -> str:
+    return hashlib.blake2b(json.dumps(value, sort_keys=True, separators=(',', ':')).encode(), digest_size=8).hexdigest()
+
+def encode(payload: Any) -> bytes:
+    return gzip.compress(json.dumps(payload, separators=(',', ':')).encode(), compresslevel=6)
+
+def decode(body: bytes) -> Any:
+    return json.loads(gzip.decompress(body))
+
+def sync_url() -> str:
+    return os.environ.get(SYNC_ENV) or SYNC_URL
+
+# --- Versions ---
+class SyncState:
+    def __init__(self, path: str = SYNC_FILE):
+        self.path = path
+        self.device = uuid.uuid4().hex[:12]
+        self.clock = 0
+        self.cursor = 0
+        self.versions: Dict[Entry, Version] = {}
+        self.pending: Set[Entry] = set()
+        self._file = None
+        self._file_lock = threading.Lock()     # held while the file is written
+        self._queue_lock = threading.Lock()
+        self._queued: List[str] = []           # appended records not written yet
+        self._rewriting = False                # a compacted rewrite is on its way; hold appends for it
+
+    def load(self) -> 'SyncState':
+        if not os.path.exists(self.path): return self
+        with open(self.path) as f:
+            for line in f:
+                try: record = json.loads(line)
+                except ValueError: break  # torn append
+                if "device" in record:
+                    self.device, self.clock, self.cursor = record["device"], record["clock"], record["cursor"]
+                    continue
+                entry = (record["s"], record["k"])
+                self.versions[entry] = (record["c"], record["n"], bool(record.get("x")), record.get("h"))
+                self.clock = max(self.clock, record["c"])
+                if record.get("p"): self.pending.add(entry)
+                else: self.pending.discard(entry)
+        return self
+
+    def reconcile(self, data: Dict[str, Any]) -> int:
+        # Entries written without a version (an older app, the importer), or
+        # changed since their version was given, get a new one now.
+        touched, rehashed = 0, False
+        for section in SYNC_SECTIONS:
+            for key, value in data.get(section, {}).items():
+                entry = (section, key)
+                version = self.versions.get(entry)
+                if version is None or version[2]:
+                    self.touch(entry, value, append=False)
+                    touched += 1
+                    continue
+                digest = value_hash(value)
+                if version[3] is None:
+                    # Kept by a version of the app without hashes; take the value as it is.
+                    self.versions[entry] = version[:3] + (digest,)
+                    rehashed = True
+                elif version[3] != digest:
+                    self.touch(entry, value, append=False)
+                    touched += 1
+        for entry, version in list(self.versions.items()):
+            if not version[2] and entry[1] not in data.get(entry[0], {}):
+                self.touch(entry, removed=True, append=False)
+                touched += 1
+        if touched or rehashed: self.save()
+        return touched
+
+    def touch(self, entry: Entry, value: Any = None, removed: bool = False, append: bool = True) -> None:
+        self.clock += 1
+        self.versions[entry] = (self.clock, self.device, removed, None if removed else value_hash(value))
+        self.pending.add(entry)
+        if append: self._append(entry)
+
+    def observe(self, entry: Entry, counter: int, device: str, removed: bool, value: Any = None) -> None:
+        self.clock = max(self.clock, counter)
+        self.versions[entry] = (counter, device, removed, None if removed else value_hash(value))
+        self.pending.discard(entry)
+
+    def _record(self, entry: Entry) -> Dict[str, Any]:
+        counter, device, removed, digest = self.versions[entry]
+        record = {"s": entry[0], "k": entry[1], "c": counter, "n": device}
+        if removed: record["x"] = 1
+        if digest is not None: record["h"] = digest
+        if entry in self.pending: record["p"] = 1
+        return record
+
+    def _header(self) -> str:
+        return json.dumps({"device": self.device, "clock": self.clock, "cursor": self.cursor}) + "\n"
+
+    def _append(self, entry: Entry) -> None:
+        line = json.dumps(self._record(entry), separators=(',', ':')) + "\n"
+        with self._queue_lock:
+            self._queued.append(line)
+
+    def write_queued(self) -> None:
+        # Appends the queued records; any thread (the DataStore writer in the app).
+        with self._file_lock:
+            with self._queue_lock:
+                if self._rewriting: return
+                lines, self._queued = self._queued, []
+            if not lines: return
+            try:
+                if self._file is None:
+                    new = not os.path.exists(self.path)
+                    self._file = open(self.path, 'a')
+                    if new: self._file.write(self._header())
+                self._file.writelines(lines)
+                self._file.flush()
+            except OSError:
+                with self._queue_lock:
+                    self._queued[:0] = lines
+                raise
+
+    def snapshot(self) -> List[str]:
+        # The compacted file's lines (a header, then one line per entry) for
+        # write(); taken on the thread that owns the versions. Records queued
+        # until write() are appended after them.
+        with self._queue_lock:
+            self._queued = []
+            self._rewriting = True
+        return [self._header()] + [json.dumps(self._record(entry), separators=(',', ':')) + "\n" for entry in self.versions]
+
+    def write(self, lines: List[str]) -> None:
+        # Replaces the file with snapshot()'s lines; any thread.
+        with self._file_lock:
+            try:
+                self._close_file()
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                _fsync_dir(self.path)
+            finally:
+                with self._queue_lock:
+                    self._rewriting = False
+        self.write_queued()
+
+    def save(self) -> None:
+        self.write(self.snapshot())
+
+    def close(self) -> None:
+        self.write_queued()
+        with self._file_lock:
+            self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# --- Transports ---
+# A transport takes a gzipped request body and returns the gzipped response.
+class HttpTransport:
+    def __init__(self, url: Optional[str] = None, timeout: float = TIMEOUT):
+        self.url = (url or sync_url()).rstrip('/') + "/sync"
+        self.timeout = timeout
+
+    def __call__(self, body: bytes) -> bytes:
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+
+class LocalTransport:
+    # Talks to an in-process sync_server.SyncServer; same bytes as over HTTP.
+    def __init__(self, server):
+        self.server = server
+
+    def __call__(self, body: bytes) -> bytes:
+        return encode(self.server.handle(decode(body)))
+
+# --- Client ---
+def _call_direct(fn: Callable[[], Any]) -> Any:
+    return fn()
+
+def clock_call(fn: Callable[[], Any]) -> Any:
+    # From a worker thread: run fn on the Kivy main thread and wait for its result.
+    from kivy.clock import Clock
+    done, outcome = threading.Event(), {}
+    def run(dt):
+        try: outcome["value"] = fn()
+        except BaseException as e: outcome["error"] = e
+        finally: done.set()
+    Clock.schedule_once(run)
+    done.wait()
+    if "error" in outcome: raise outcome["error"]
+    return outcome.get("value")
+
+class SyncClient:
+    # store is only touched through `call`, which runs a function on the
+    # thread that owns the store (the Kivy main thread in the app) and
+    # returns its result; the round trips themselves run on the caller's thread.
+    def __init__(self, store: DataStore, state: SyncState, transport: Callable[[bytes], bytes],
+                 call: Callable[[Callable[[], Any]], Any] = _call_direct, batch_size: int = BATCH_SIZE):
+        self.store = store
+        self.state = state
+        self.transport = transport
+        self.call = call
+        self.batch_size = batch_size
+        self.listeners: List[Callable[[List[Dict[str, Any]], bool], None]] = []
+        self._applying = False
+        store.bind_changed(self.on_local_change)
+        store.bind_drained(state.write_queued)
+
+    def bind_applied(self, callback: Callable[[List[Dict[str, Any]], bool], None]) -> None:
+        # callback(remote records applied, whether the document was replaced)
+        self.listeners.append(callback)
+
+    def on_local_change(self, changed: List[Entry], removed: List[Entry]) -> None:
+        if self._applying: return
+        data = self.store.data
+        for entry in changed:
+            if entry[0] in SYNC_SECTIONS: self.state.touch(entry, data[entry[0]][entry[1]])
+        for entry in removed:
+            if entry[0] in SYNC_SECTIONS: self.state.touch(entry, removed=True)
+
+    def sync(self) -> Dict[str, Any]:
+        # Blocks until nothing is left to push or pull.
+        stats = {"rounds": 0, "sent": 0, "received": 0, "bytes_up": 0, "bytes_down": 0}
+        start = time.perf_counter()
+        try:
+            while True:
+                request = self.call(self._next_request)
+                body = encode(request)
+                reply = self.transport(body)
+                response = decode(reply)
+                stats["rounds"] += 1
+                stats["sent"] += len(request["changes"])
+                stats["received"] += len(response["changes"])
+                stats["bytes_up"] += len(body)
+                stats["bytes_down"] += len(reply)
+                if not self.call(lambda: self._apply(request, response)): break
+        finally:
+            # Only the snapshot is taken on the store's thread; the rewrite happens here.
+            self.state.write(self.call(self.state.snapshot))
+            profiler.record("sync.sync", start, time.perf_counter())
+        return stats
+
+    def _next_request(self) -> Dict[str, Any]:
+        state, data = self.state, self.store.data
+        changes = []
+        for entry in itertools.islice(state.pending, self.batch_size):
+            record = state._record(entry)
+            record.pop("p", None)
+            record.pop("h", None)
+            if not record.get("x"): record["v"] = data.get(entry[0], {}).get(entry[1])
+            changes.append(record)
+        return {"device": state.device, "cursor": state.cursor, "limit": self.batch_size, "changes": changes}
+
+    def _apply(self, request: Dict[str, Any], response: Dict[str, Any]) -> bool:
+        # Returns whether another round trip is needed.
+        state = self.state
+        for record in request["changes"]:
+            # Pushed; settled unless the entry changed again during the round trip.
+            entry = (record["s"], record["k"])
+            version = state.versions.get(entry)
+            if version is not None and version[:2] == (record["c"], record["n"]):
+                state.pending.discard(entry)
+        applied = []
+        for record in response["changes"]:
+            entry = (record["s"], record["k"])
+            local = state.versions.get(entry)
+            state.clock = max(state.clock, record["c"])
+            if local is not None and local[:2] >= (record["c"], record["n"]):
+                if local[:2] > (record["c"], record["n"]): state.pending.add(entry)  # ours wins; push it
+                continue
+            state.observe(entry, record["c"], record["n"], bool(record.get("x")), record.get("v"))
+            applied.append(record)
+        replaced = self._apply_to_store(applied)
+        state.cursor = response["cursor"]
+        if applied:
+            for callback in self.listeners:
+                callback(applied, replaced)
+        return bool(state.pending) or bool(response.get("more"))
+
+    def _apply_to_store(self, records: List[Dict[str, Any]]) -> bool:
+        # Plain updates go through set(); removals need a replaced document.
+        store = self.store
+        self._applying = True
+        try:
+            if any(record.get("x") for record in records):
+                data = {section: dict(values) if isinstance(values, dict) else values for section, values in store.data.items()}
+                for record in records:
+                    if record.get("x"): data.get(record["s"], {}).pop(record["k"], None)
+                    else: data.setdefault(record["s"], {})[record["k"]] = record["v"]
+                store.replace(data)
+                return True
+            for record in records:
+                store.set(record["s"], record["k"], record["v"])
+            return False
+        finally:
+            self._applying = False
+
+def open_client(store: DataStore, path: str = SYNC_FILE, transport: Optional[Callable[[bytes], bytes]] = None,
+                call: Callable[[Callable[[], Any]], Any] = _call_direct) -> SyncClient:
+    # store must already be loaded; entries it holds without a version are queued for the next sync.
+    state = SyncState(path).load()
+    state.reconcile(store.data)
+    return SyncClient(store, state, transport or HttpTransport(), call)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sync", description="Sync a data file with a sync server.")
+    parser.add_argument("--url", default=None, help=f"sync server (default: ${SYNC_ENV} or {SYNC_URL})")
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=STORAGE_BACKEND)
+    parser.add_argument("--data", help=f"data file (default: {DATA_FILE} or {DB_FILE})")
+    parser.add_argument("--state", default=None, help=f"sync state file (default: {SYNC_FILE} next to the data file)")
+    args = parser.parse_args(argv)
+
+    from importer import open_backend
+    try: backend = open_backend(args.backend, args.data, BATCH_SIZE)
+    except (OSError, ValueError) as e:   # a bad program file (names SQLite's rows)
+        print(f"sync: {e}", file=sys.stderr)
+        return 1
+    store = DataStore(backend, schedule=_call_direct)
+    store.load()
+    data_dir = os.path.dirname(os.path.abspath(args.data)) if args.data else "."
+    client = open_client(store, args.state or os.path.join(data_dir, SYNC_FILE), HttpTransport(args.url))
+    try:
+        stats = client.sync()
+    except (OSError, ValueError) as e:
+        print(f"sync: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.state.close()
+        store.close()
+    print(f"sync: sent {stats['sent']}, received {stats['received']} entries in {stats['rounds']} round trips "
+          f"({stats['bytes_up']} B up, {stats['bytes_down']} B down)", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import argparse
+import bisect
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+from sync import SYNC_SECTIONS, BATCH_SIZE, encode, decode
+from storage import _fsync_dir
+
+# --- Sync Server ---
+# Holds the newest version of every synced entry, each stamped with a server
+# sequence number when accepted. A device's cursor is the last sequence number
+# it has seen, so a pull is a bisect into the sequence order plus the entries
+# after it. Accepted entries are appended to a JSON-lines file and replayed
+# on start; the file is compacted once it holds mostly superseded lines.
+#
+#   python -m sync_server --port 8765 --data sync_server.jsonl
+SERVER_FILE = "sync_server.jsonl"
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BODY = 16 * 1024 * 1024
+
+Entry = Tuple[str, str]
+
+def _version(record: Dict[str, Any]) -> Tuple[int, str]:
+    return record["c"], record["n"]
+
+def validate(request: Any) -> Dict[str, Any]:
+    if not isinstance(request, dict): raise ValueError("request: expected an object")
+    if not isinstance(request.get("device"), str): raise ValueError("request: missing device")
+    if not isinstance(request.get("cursor"), int) or request["cursor"] < 0: raise ValueError("request: bad cursor")
+    changes = request.get("changes")
+    if not isinstance(changes, list): raise ValueError("request: changes must be a list")
+    for record in changes:
+        if not (isinstance(record, dict) and record.get("s") in SYNC_SECTIONS and isinstance(record.get("k"), str)
+                and isinstance(record.get("c"), int) and isinstance(record.get("n"), str)
+                and ("v" in record or record.get("x"))):
+            raise ValueError(f"request: bad change {record!r}"[:200])
+    return request
+
+class SyncServer:
+    def __init__(self, path: Optional[str] = SERVER_FILE):
+        self.path = path
+        self.entries: Dict[Entry, Dict[str, Any]] = {}
+        self.order: List[int] = []            # sequence numbers, ascending; superseded ones stay until compaction
+        self.at: Dict[int, Entry] = {}        # sequence number -> entry, live and superseded
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if path and os.path.exists(path):
+            self._replay()
+
+    def _replay(self) -> None:
+        lines = 0
+        with open(self.path) as f:
+            for line in f:
+                try: record = json.loads(line)
+                except ValueError: break  # torn append
+                self._store(record, record["q"])
+                lines += 1
+        if lines > 2 * len(self.entries) + 1000:
+            self._compact()
+
+    def _store(self, record: Dict[str, Any], seq: int) -> None:
+        entry = (record["s"], record["k"])
+        old = self.entries.get(entry)
+        if old is not None: self.at.pop(old["q"], None)
+        record["q"] = seq
+        self.entries[entry] = record
+        self.order.append(seq)
+        self.at[seq] = entry
+        self.seq = max(self.seq, seq)
+
+    def _compact(self) -> None:
+        self.order = [seq for seq in self.order if seq in self.at]
+        if not self.path: return
+        self.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for seq in self.order:
+                f.write(json.dumps(self.entries[self.at[seq]], separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        if not self.path or not records: return
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write("".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        request = validate(request)
+        device, cursor = request["device"], request["cursor"]
+        limit = max(1, min(int(request.get("limit") or BATCH_SIZE), BATCH_SIZE))
+        with self._lock:
+            accepted, conflicts = [], []
+            for record in request["changes"]:
+                current = self.entries.get((record["s"], record["k"]))
+                if current is None or _version(record) > _version(current):
+                    stored = {key: record[key] for key in ("s", "k", "c", "n", "x", "v") if key in record}
+                    self.seq += 1
+                    self._store(stored, self.seq)
+                    accepted.append(stored)
+                elif _version(record) < _version(current) and current["q"] <= cursor:
+                    conflicts.append(current)  # the device hasn't seen it through the cursor
+            self._append(accepted)
+            if len(self.order) > 2 * len(self.entries) + 1000:
+                self._compact()
+
+            # Entries changed since the cursor, oldest first, minus the device's own.
+            changes = list(conflicts)
+            next_cursor, more = self.seq, False
+            index = bisect.bisect_right(self.order, cursor)
+            order, at, entries = self.order, self.at, self.entries
+            while index < len(order):
+                seq = order[index]
+                index += 1
+                entry = at.get(seq)
+                if entry is None: continue
+                record = entries[entry]
+                if record["n"] == device: continue
+                if len(changes) >= limit:
+                    next_cursor, more = seq - 1, True
+                    break
+                changes.append(record)
+            return {"cursor": next_cursor, "more": more, "accepted": len(accepted), "changes": changes}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# --- HTTP ---
+class SyncHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path.rstrip('/') != "/sync":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.send_error(413)
+            return
+        try:
+            response = self.server.sync.handle(decode(self.rfile.read(length)))
+        except (ValueError, KeyError, TypeError, OSError, EOFError) as e:
+            self.send_error(400, str(e)[:200])
+            return
+        body = encode(response)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def serve(sync: SyncServer, host: str = HOST, port: int = PORT, verbose: bool = False) -> ThreadingHTTPServer:
+    # Port 0 picks a free port (see server.server_address).
+    server = ThreadingHTTPServer((host, port), SyncHandler)
+    server.sync = sync
+    server.verbose = verbose
+    return server
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sync_server", description="Run a local sync server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--data", default=SERVER_FILE, help="file holding the synced entries")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    sync = SyncServer(args.data)
+    server = serve(sync, args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"sync_server: {len(sync.entries)} entries, serving on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sync.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import pytest
+
+from analytics import TrainingHistory
+from estimator import estimate_one_rms
+from program import DEFAULT_RULES, history_key, log_key
+
+def document(entries):
+    return {"1RM": {}, "new_1RM": {}, "logs": {key: {"actual_weight": weight, "actual_reps": reps} for key, weight, reps in entries}}
+
+def test_main_lift_e1rm_is_per_set():
+    history = TrainingHistory(document([(log_key(4, 1, 0), 225, 15)]))
+    # Week 4 Back Squat is 3-4 sets: 15 logged reps are 5 per set.
+    assert history.record(log_key(4, 1, 0), {"actual_weight": 225, "actual_reps": 15})["e1rm"] == pytest.approx(262.5)
+    result = history.record(log_key(5, 1, 0), {"actual_weight": 235, "actual_reps": 9})
+    assert result["e1rm"] == pytest.approx(235 * (1 + 3 / 30))
+    assert not result["pr"]
+    assert history.record(log_key(5, 1, 0), {"actual_weight": 245, "actual_reps": 12})["pr"]
+
+def test_agrees_with_the_estimator_across_cycles():
+    entries = [(history_key(1, 2, 1, 0), 200, 30), (history_key(1, 5, 1, 0), 275, 12), (log_key(3, 1, 0), 240, 18)]
+    data = document(entries)
+    history = TrainingHistory(data)
+    assert history.cycle == 2
+    best = history.summary("Back Squat")["best_set"]
+    assert (best["cycle"], best["week"], best["weight"]) == (1, 5, 275)
+    assert best["e1rm"] == pytest.approx(estimate_one_rms(data)["Back Squat"]["epley"])
+
+def test_rules_set_the_pullup_sets():
+    # Week 1 pull-ups have no set count of their own; the rules' pullup_sets splits the reps.
+    rules = DEFAULT_RULES.replace(pullup_sets=2)
+    data = document([(log_key(1, 0, 2), 25, 24)])
+    history = TrainingHistory(data, rules=rules)
+    assert history.summary("Pull-Up Variation")["best_set"]["e1rm"] == pytest.approx(25 * (1 + 12 / 30))
+    assert TrainingHistory(data).summary("Pull-Up Variation")["best_set"]["e1rm"] == pytest.approx(25 * (1 + 8 / 30))
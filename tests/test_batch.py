@@ -0,0 +1,40 @@
+import math
+import random
+
+import pytest
+
+from batch import arrays_from_data, compute_targets, program_tables
+from engine import PlanEngine
+from program import DEFAULT_RULES, program_structure, compile_program, log_key
+
+def datasets(names, count=20, seed=1):
+    rnd = random.Random(seed)
+    compiled = compile_program(program_structure)
+    out = []
+    for _ in range(count):
+        logs = {}
+        for week_num in range(1, compiled.week_count + 1):
+            for day_idx, exercise_count in enumerate(compiled.exercise_counts[week_num-1]):
+                for ex_idx in range(exercise_count):
+                    if rnd.random() < 0.7:
+                        logs[log_key(week_num, day_idx, ex_idx)] = {"actual_weight": rnd.choice([0, 10, 25, 135, 200]),
+                                                                     "actual_reps": rnd.randint(0, 40)}
+        out.append({"1RM": {name: rnd.choice([0, 3, 9, 150, 300]) for name in names}, "logs": logs, "new_1RM": {}})
+    return out
+
+@pytest.mark.parametrize("rules", [
+    DEFAULT_RULES,
+    DEFAULT_RULES.replace(deload_week=5, week1_percent=0.7, pullup_low_rep_max=5, weight_rounding=2.5,
+                          accessory_types=('accessory',)),
+])
+def test_matches_the_engine(rules):
+    data = datasets(program_tables(program_structure, rules)["lift_names"])
+    targets = compute_targets(*arrays_from_data(data, program_structure, rules=rules), program_structure, rules)["target_weight"]
+    for a, document in enumerate(data):
+        engine = PlanEngine(document, program_structure, rules=rules)
+        for week_num in range(1, engine.compiled.week_count + 1):
+            for _, cells in engine.week(week_num):
+                for cell in cells:
+                    value = targets[a, week_num - 1, cell["day_idx"], cell["ex_idx"]]
+                    if cell["target_weight"] == "User Choice": assert math.isnan(value)
+                    else: assert value == pytest.approx(cell["target_weight"])
@@ -0,0 +1,147 @@
+import pytest
+
+from engine import PlanEngine
+from plates import day_loadouts
+from program import (
+    DEFAULT_1RM_VALUES, MAIN_LIFT_SETS, MAIN_LIFT_REPS, MAIN_LIFT_1RM_PERCENT_WK1, PERCENTAGE_INCREMENT_ON_SUCCESS,
+    DELOAD_1RM_PERCENTAGE, WEIGHT_ROUNDING, ACCESSORY_REPS, PULLUP_EXERCISE_NAME, program_structure,
+    build_program_structure, round_to_nearest, get_target_reps, get_numeric_sets, get_pullup_suggestion_new, log_key,
+)
+
+# The per-exercise branches WeekScreen.on_enter ran inline before PlanEngine,
+# kept as they were apart from taking the program and main-lift types.
+def old_cell(data, program, week_num, day_idx, ex_idx, main_lift_types=('main_lift',)):
+    ex_data = program[week_num-1][day_idx]['exercises'][ex_idx]
+    ex_name, ex_type = ex_data['name'], ex_data['type']
+    sets, reps = ex_data['sets'], ex_data['reps']
+    notes = ex_data['notes']
+
+    target_weight = 0
+    if ex_type in main_lift_types:
+        one_rm = data["1RM"].get(ex_name, DEFAULT_1RM_VALUES.get(ex_name, 0))
+        if week_num == 1:
+            target_weight = round_to_nearest(one_rm * MAIN_LIFT_1RM_PERCENT_WK1, WEIGHT_ROUNDING)
+            notes += f" (Wk1 Target: {MAIN_LIFT_1RM_PERCENT_WK1*100:.1f}% 1RM)"
+        elif 1 < week_num < 6:
+            prev_week = week_num - 1
+            prev_log = data["logs"].get(f"Week{prev_week}_Day{day_idx}_Ex{ex_idx}", {})
+            prev_actual_wt = prev_log.get("actual_weight", 0)
+            prev_actual_reps = prev_log.get("actual_reps", 0)
+            if not prev_actual_wt:
+                prev_actual_wt = one_rm * MAIN_LIFT_1RM_PERCENT_WK1
+            prev_ex = program[prev_week-1][day_idx]['exercises'][ex_idx]
+            prev_target_total_reps = get_numeric_sets(prev_ex['sets']) * get_target_reps(prev_ex['reps'])
+            if prev_actual_reps >= prev_target_total_reps and prev_target_total_reps > 0:
+                target_weight = round_to_nearest(prev_actual_wt * (1 + PERCENTAGE_INCREMENT_ON_SUCCESS), WEIGHT_ROUNDING)
+                notes += f" (Target based on Wk{prev_week} Actuals. Increase by {PERCENTAGE_INCREMENT_ON_SUCCESS*100:.0f}% if reps >= {prev_target_total_reps})"
+            else:
+                target_weight = round_to_nearest(prev_actual_wt, WEIGHT_ROUNDING)
+                notes += f" (Target based on Wk{prev_week} Actuals)"
+        elif week_num == 6:
+            target_weight = round_to_nearest(one_rm * DELOAD_1RM_PERCENTAGE, WEIGHT_ROUNDING)
+            notes += f" (Deload Target: {DELOAD_1RM_PERCENTAGE*100:.0f}% 1RM)"
+    elif ex_type == 'pullup':
+        max_reps = data["1RM"].get(PULLUP_EXERCISE_NAME, DEFAULT_1RM_VALUES.get(PULLUP_EXERCISE_NAME, 0))
+        prev_week = week_num - 1 if week_num > 1 else 1
+        prev_log = data["logs"].get(f"Week{prev_week}_Day{day_idx}_Ex{ex_idx}", {})
+        suggestion = get_pullup_suggestion_new(week_num, max_reps, prev_log.get("actual_weight", 0), prev_log.get("actual_reps", 0))
+        sets, reps, target_weight, notes = suggestion['sets'], suggestion['reps'], suggestion['weight'], suggestion['notes']
+    elif ex_type in ['accessory', 'core']:
+        target_weight = "User Choice"
+        notes += f" (Increase wt ~2-3% when hitting {ACCESSORY_REPS.split('-')[-1]} reps)" if week_num < 6 else " (Deload)"
+
+    log_data = data["logs"].get(f"Week{week_num}_Day{day_idx}_Ex{ex_idx}", {"actual_weight": 0, "actual_reps": 0})
+    actual_weight = log_data["actual_weight"]
+    if week_num == 1 and ex_type in list(main_lift_types) + ['pullup']:
+        actual_weight = target_weight
+        notes += " (Actual Wt pre-filled w/ Target)"
+    return {"sets": sets, "reps": reps, "target_weight": target_weight, "notes": notes,
+            "actual_weight": actual_weight, "actual_reps": log_data["actual_reps"]}
+
+def cells(program):
+    for week_idx, week_data in enumerate(program):
+        for day_idx, day_data in enumerate(week_data):
+            for ex_idx in range(len(day_data['exercises'])):
+                yield week_idx + 1, day_idx, ex_idx
+
+def documents(program):
+    yield {"1RM": {}, "logs": {}, "new_1RM": {}}
+    for max_reps in (0, 5, 7.5, 12):
+        logs = {}
+        for i, (week_num, day_idx, ex_idx) in enumerate(cells(program)):
+            if i % 5 == 4: continue   # leave some cells unlogged
+            logs[log_key(week_num, day_idx, ex_idx)] = {"actual_weight": [0, 25, 100, 140][i % 4], "actual_reps": 3 + i % 40}
+        yield {"1RM": {"Back Squat": 305, "Deadlift": 150, PULLUP_EXERCISE_NAME: max_reps}, "logs": logs, "new_1RM": {}}
+
+def main_lifts_with_sets():
+    # The built-in days with the main lifts' set and rep ranges filled in, so
+    # the progression branch has a previous target to beat.
+    program = build_program_structure()
+    for week_num, day_idx, ex_idx in cells(program):
+        ex = program[week_num-1][day_idx]['exercises'][ex_idx]
+        if ex['type'] in ('main_upper', 'main_lower'):
+            ex.update(sets=MAIN_LIFT_SETS[week_num], reps=MAIN_LIFT_REPS[week_num])
+    return program
+
+FIELDS = ("sets", "reps", "target_weight", "notes", "actual_weight", "actual_reps")
+
+@pytest.mark.parametrize("program, main_lift_types", [
+    (program_structure, ('main_lift',)),
+    (program_structure, ('main_upper', 'main_lower')),
+    (main_lifts_with_sets(), ('main_upper', 'main_lower')),
+])
+def test_matches_old_branches(program, main_lift_types):
+    for data in documents(program):
+        engine = PlanEngine(data, program, main_lift_types=main_lift_types)
+        for cell in cells(program):
+            expected = old_cell(data, program, *cell, main_lift_types=main_lift_types)
+            got = engine.cell(*cell)
+            assert {field: got[field] for field in FIELDS} == expected, cell
+
+def test_updates_match_a_fresh_engine():
+    program = main_lifts_with_sets()
+    data = next(d for d in documents(program) if d["logs"])
+    engine = PlanEngine(data, program, main_lift_types=('main_upper', 'main_lower'))
+    for cell in cells(program): engine.cell(*cell)
+    engine.set_log(1, 1, 0, 200, 40)
+    engine.set_one_rm("Deadlift", 170)
+    fresh = PlanEngine(engine.data, program, main_lift_types=('main_upper', 'main_lower'))
+    for cell in cells(program):
+        assert engine.cell(*cell) == fresh.cell(*cell), cell
+
+def test_edits_recompute_only_downstream_cells():
+    # A log feeds its own cell and the next week's; a 1RM every cell of that lift.
+    program = main_lifts_with_sets()
+    data = next(d for d in documents(program) if d["logs"])
+    engine = PlanEngine(data, program, main_lift_types=('main_upper', 'main_lower'))
+    for cell in cells(program): engine.cell(*cell)
+    for edit, downstream in ((lambda: engine.set_log(1, 1, 0, 200, 40), {(1, 1, 0), (2, 1, 0)}),
+                             (lambda: engine.set_one_rm("Deadlift", 170), {(week_num, 3, 0) for week_num in range(1, 7)})):
+        before = {cell: engine.cell(*cell) for cell in cells(program)}
+        count = engine.recompute_count
+        assert set(edit()) == downstream
+        after = {cell: engine.cell(*cell) for cell in cells(program)}
+        assert engine.recompute_count - count == len(downstream)
+        assert {cell for cell in before if after[cell] is not before[cell]} == downstream
+
+def test_main_lift_targets_stay_empty():
+    # The built-in program tags its main lifts 'main_upper'/'main_lower', so
+    # the old `ex_type == 'main_lift'` branch never ran and they show no target.
+    data = list(documents(program_structure))[-1]
+    engine = PlanEngine(data)
+    main_cells = [cell for cell in cells(program_structure)
+                  if program_structure[cell[0]-1][cell[1]]['exercises'][cell[2]]['type'] in ('main_upper', 'main_lower')]
+    assert main_cells
+    assert not any(ex['type'] == 'main_lift' for week in program_structure for day in week for ex in day['exercises'])
+    for cell in main_cells:
+        assert engine.cell(*cell)["target_weight"] == 0
+
+def test_loadouts_only_for_numeric_targets():
+    # Main lifts get a plate loadout once the rules give them a target, and not before.
+    program = main_lifts_with_sets()
+    data = {"1RM": {"Back Squat": 305}, "logs": {}, "new_1RM": {}}
+    for main_lift_types, expected in ((('main_lift',), False), (('main_upper', 'main_lower'), True)):
+        engine = PlanEngine(data, program, main_lift_types=main_lift_types)
+        day_name, day_cells = engine.week(1)[1]
+        assert day_cells[0]["name"] == "Back Squat"
+        assert ((1, 1, 0) in day_loadouts(day_cells)) == expected
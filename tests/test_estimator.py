@@ -0,0 +1,41 @@
+import pytest
+
+from estimator import estimate_one_rms, latest_sets
+from program import DEFAULT_RULES, build_program_structure, history_key, log_key
+
+def logs(*entries):
+    return {"1RM": {}, "new_1RM": {}, "logs": {key: {"actual_weight": weight, "actual_reps": reps} for key, weight, reps in entries}}
+
+def test_main_lift_reps_are_per_set():
+    # Week 5 Back Squat is 3-4 sets: 12 logged reps are 4 per set.
+    data = logs((log_key(5, 1, 0), 225, 12))
+    estimate = estimate_one_rms(data)["Back Squat"]
+    assert estimate["epley"] == pytest.approx(225 * (1 + 4 / 30))
+    assert estimate["brzycki"] == pytest.approx(225 * 36 / 33)
+    assert estimate["sets"] == 1
+    assert latest_sets(data) == {"Back Squat": (225.0, 4.0)}
+
+def test_main_lift_sets_default_to_the_week_table():
+    # A program that leaves the main lifts' sets at 0 still divides by MAIN_LIFT_SETS.
+    program = build_program_structure(week_overrides={})
+    data = logs((log_key(6, 1, 0), 150, 14))
+    assert latest_sets(data, program) == {"Back Squat": (150.0, 7.0)}
+
+def test_archived_cycles_count():
+    data = logs((history_key(1, 5, 1, 0), 275, 12), (log_key(2, 1, 0), 185, 27))
+    estimate = estimate_one_rms(data)["Back Squat"]
+    assert estimate["sets"] == 2
+    assert estimate["epley"] == pytest.approx(275 * (1 + 4 / 30))
+    # The current cycle's log is the latest even though its week number is lower.
+    assert latest_sets(data) == {"Back Squat": (185.0, 9.0)}
+
+def test_rules_add_lifts():
+    # A program's own main-lift type (rules.main_lift_types) makes its lift one to estimate.
+    program = build_program_structure()
+    for week in program:
+        week[1]['exercises'][0].update(name="Front Squat", type='olympic', sets=3)
+    rules = DEFAULT_RULES.replace(main_lift_types=('olympic',))
+    data = logs((log_key(5, 1, 0), 225, 12))
+    assert "Front Squat" not in estimate_one_rms(data, program=program)
+    assert estimate_one_rms(data, program=program, rules=rules)["Front Squat"]["sets"] == 1
+    assert latest_sets(data, program, rules) == {"Front Squat": (225.0, 4.0)}
@@ -0,0 +1,43 @@
+import pytest
+
+from importer import ImportStats, group_sessions, normalize_sets, parse_sets, place_sessions, read_rows, name_index
+from program import history_key
+
+CSV = ("\ufeffdate,exercise,weight,reps,unit\n"
+       "2024-01-01,Deadlift,100,5,kg\n"
+       "2024-01-01,Squat,100,5,kg\n"
+       "2024-01-03,Überzug,30,8,kg\n")
+
+def test_weights_convert_to_each_lifts_unit(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(CSV, encoding="utf-8")
+    stats = ImportStats(path.stat().st_size)
+    sets = list(normalize_sets(parse_sets(read_rows([str(path)], stats), stats), stats, name_index()))
+    # The Deadlift is tracked in kg (PLATE_LIFTS); the rest in the default lb.
+    assert [(name, round(weight, 1)) for _, name, weight, _ in sets] == [("Deadlift", 100.0), ("Back Squat", 220.5)]
+    assert stats.unknown == {"Überzug": 1}
+    # Progress counts bytes, so a BOM and non-ASCII names still end at 100%.
+    assert stats.bytes_read == len(CSV.encode("utf-8"))
+    assert stats.progress == pytest.approx(1.0)
+
+def test_sessions_keep_reps_at_the_top_weight():
+    stats = ImportStats(0)
+    sets = [("2024-01-01", "Back Squat", 135.0, 10), ("2024-01-01", "Back Squat", 225.0, 5),
+            ("2024-01-01", "Back Squat", 225.0, 5), ("2024-01-01", "Back Squat", 185.0, 8),
+            ("2024-01-02", "Deadlift", 100.0, 5)]
+    # Warm-up and back-off reps don't count towards the logged working sets.
+    assert list(group_sessions(iter(sets), stats)) == [{"Back Squat": (225.0, 10)}, {"Deadlift": (100.0, 5)}]
+    assert stats.sessions == 2
+
+def test_sessions_go_to_the_best_matching_day():
+    stats = ImportStats(0)
+    sessions = [{"Back Squat": (225.0, 10), "Leg Press": (300.0, 24), "Curl": (30.0, 10)},
+                {"Deadlift": (140.0, 15)},
+                {"Curl": (30.0, 10)}]
+    logs = dict(place_sessions(iter(sessions), stats, first_cycle=1))
+    assert logs == {
+        history_key(1, 1, 1, 0): {"actual_weight": 225.0, "actual_reps": 10},
+        history_key(1, 1, 1, 2): {"actual_weight": 300.0, "actual_reps": 24},
+        history_key(1, 1, 3, 0): {"actual_weight": 140.0, "actual_reps": 15},
+    }
+    assert (stats.logs, stats.unplaced_sets, stats.skipped_sessions) == (3, 1, 1)
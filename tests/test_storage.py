@@ -0,0 +1,61 @@
+import pytest
+
+from program import log_key
+from sqlite_store import SQLiteStore
+from storage import DataStore, JournalStore, read_data
+from undo import UndoLog
+
+LOG = log_key(1, 0, 0)
+
+def open_store(backend):
+    store = DataStore(backend, schedule=lambda callback: None)
+    store.load({"1RM": {}, "logs": {}, "new_1RM": {}})
+    return store
+
+@pytest.fixture(params=["journal", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "journal": return lambda: JournalStore(str(tmp_path / "data.json"), background=False)
+    return lambda: SQLiteStore(str(tmp_path / "data.db"), migrate_from=None)
+
+def test_remove_survives_reload(backend):
+    store = open_store(backend())
+    store.set("logs", LOG, {"actual_weight": 135.0, "actual_reps": 5})
+    store.set("1RM", "Bench Press", 200.0)
+    store.flush()
+    store.remove("logs", LOG)
+    store.remove("1RM", "Bench Press")
+    store.close()
+    data = open_store(backend()).data
+    assert LOG not in data["logs"] and "Bench Press" not in data["1RM"]
+
+def test_tombstone_replays(tmp_path):
+    path = str(tmp_path / "data.json")
+    store = open_store(JournalStore(path, background=False))
+    store.set("1RM", "Bench Press", 200.0)
+    store.flush()
+    store.remove("1RM", "Bench Press")
+    store.close()
+    assert "Bench Press" not in read_data(path)["1RM"]
+
+def test_unchanged_set_is_not_a_change(tmp_path):
+    store = open_store(JournalStore(str(tmp_path / "data.json"), background=False))
+    undo_log = UndoLog(store)
+    store.set("1RM", "Bench Press", 200.0)
+    seen = []
+    store.bind_changed(lambda changed, removed: seen.append(changed))
+    store.bind_overwriting(lambda data, entry: seen.append(entry))
+    store.set("1RM", "Bench Press", 200.0)
+    assert seen == [] and len(undo_log.steps) == 2
+    store.close()
+
+def test_undo_removes_new_entries_without_replacing(tmp_path):
+    store = open_store(JournalStore(str(tmp_path / "data.json"), background=False))
+    undo_log = UndoLog(store)
+    replaced = []
+    store.replace = replaced.append
+    store.set("logs", LOG, {"actual_weight": 135.0, "actual_reps": 5})
+    assert undo_log.undo() == [("logs", LOG)]
+    assert LOG not in store.data["logs"] and replaced == []
+    undo_log.redo()
+    assert store.data["logs"][LOG] == {"actual_weight": 135.0, "actual_reps": 5}
+    store.close()
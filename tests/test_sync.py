@@ -0,0 +1,77 @@
+from program import log_key
+from storage import DataStore, JournalStore
+from sync import LocalTransport, open_client
+from sync_server import SyncServer
+
+LOG = log_key(1, 0, 0)
+
+class Device:
+    def __init__(self, directory, server):
+        directory.mkdir(exist_ok=True)
+        self.directory, self.server = directory, server
+        self.open()
+
+    def open(self):
+        self.store = DataStore(JournalStore(str(self.directory / "data.json"), background=False), schedule=lambda callback: None)
+        self.store.load({"1RM": {}, "logs": {}, "new_1RM": {}})
+        self.client = open_client(self.store, str(self.directory / "data.sync"), LocalTransport(self.server))
+
+    def close(self):
+        self.client.state.close()
+        self.store.close()
+
+    def sync(self):
+        self.client.sync()
+        self.store.flush()
+
+def devices(tmp_path):
+    server = SyncServer(None)
+    return Device(tmp_path / "a", server), Device(tmp_path / "b", server)
+
+def synced(data):
+    return {section: data[section] for section in ("1RM", "logs", "new_1RM")}
+
+def test_two_devices_converge(tmp_path):
+    a, b = devices(tmp_path)
+    a.store.set("logs", LOG, {"actual_weight": 135.0, "actual_reps": 25})
+    a.store.set("1RM", "Back Squat", 300.0)
+    b.store.set("1RM", "Back Squat", 310.0)   # concurrent: one of the two wins on both
+    b.store.set("1RM", "Deadlift", 150.0)
+    for device in (a, b, a): device.sync()
+    assert synced(a.store.data) == synced(b.store.data)
+    assert a.store.data["1RM"]["Deadlift"] == 150.0
+    assert a.store.data["logs"] == {LOG: {"actual_weight": 135.0, "actual_reps": 25}}
+    b.store.set("1RM", "Back Squat", 320.0)   # made after seeing a's edit, so it wins
+    for device in (b, a): device.sync()
+    assert a.store.data["1RM"]["Back Squat"] == b.store.data["1RM"]["Back Squat"] == 320.0
+    a.close(), b.close()
+
+def test_removals_sync_as_tombstones(tmp_path):
+    a, b = devices(tmp_path)
+    a.store.set("logs", LOG, {"actual_weight": 135.0, "actual_reps": 25})
+    for device in (a, b): device.sync()
+    assert LOG in b.store.data["logs"]
+    a.store.remove("logs", LOG)
+    for device in (a, b): device.sync()
+    assert LOG not in b.store.data["logs"]
+    # A device that restarts keeps the tombstone rather than bringing the log back.
+    b.close()
+    b.open()
+    for device in (b, a): device.sync()
+    assert LOG not in a.store.data["logs"] and LOG not in b.store.data["logs"]
+    a.close(), b.close()
+
+def test_values_changed_offline_are_pushed(tmp_path):
+    a, b = devices(tmp_path)
+    a.store.set("1RM", "Back Squat", 300.0)
+    for device in (a, b): device.sync()
+    a.close()
+    # Changed without a sync client watching, as the importer or a restore does.
+    offline = DataStore(JournalStore(str(tmp_path / "a" / "data.json"), background=False), schedule=lambda callback: None)
+    offline.load()
+    offline.set("1RM", "Back Squat", 320.0)
+    offline.close()
+    a.open()
+    for device in (a, b): device.sync()
+    assert b.store.data["1RM"]["Back Squat"] == 320.0
+    a.close(), b.close()
@@ -0,0 +1,256 @@
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from storage import DataStore
+
+# --- Persistent Maps ---
+# An immutable hash array mapped trie: set() and remove() copy only the path
+# to the changed key (O(log32 n) nodes) and share everything else with the
+# map they came from, and diff() skips every subtree two maps share.
+BITS = 5
+MASK = (1 << BITS) - 1
+HASH_BITS = 64
+_MISSING = object()
+
+class _Leaf:
+    __slots__ = ('hash', 'key', 'value')
+
+    def __init__(self, hash_: int, key: Any, value: Any):
+        self.hash = hash_
+        self.key = key
+        self.value = value
+
+class _Collision:
+    # Keys whose 64-bit hashes are equal.
+    __slots__ = ('hash', 'pairs')
+
+    def __init__(self, hash_: int, pairs: Tuple[Tuple[Any, Any], ...]):
+        self.hash = hash_
+        self.pairs = pairs
+
+class _Branch:
+    __slots__ = ('bitmap', 'slots')
+
+    def __init__(self, bitmap: int, slots: Tuple[Any, ...]):
+        self.bitmap = bitmap
+        self.slots = slots
+
+def _hash(key: Any) -> int:
+    return hash(key) & ((1 << HASH_BITS) - 1)
+
+def _merge(a: Any, b: _Leaf, shift: int) -> Any:
+    # A node holding leaf (or collision) a and leaf b, whose hashes differ.
+    if shift >= HASH_BITS: raise AssertionError("distinct hashes share every bit")
+    ia, ib = (a.hash >> shift) & MASK, (b.hash >> shift) & MASK
+    if ia == ib: return _Branch(1 << ia, (_merge(a, b, shift + BITS),))
+    return _Branch((1 << ia) | (1 << ib), (a, b) if ia < ib else (b, a))
+
+def _set(node: Any, shift: int, leaf: _Leaf) -> Any:
+    if node is None: return leaf
+    if isinstance(node, _Branch):
+        bit = 1 << ((leaf.hash >> shift) & MASK)
+        index = bin(node.bitmap & (bit - 1)).count("1")
+        if not node.bitmap & bit:
+            return _Branch(node.bitmap | bit, node.slots[:index] + (leaf,) + node.slots[index:])
+        child = node.slots[index]
+        new = _set(child, shift + BITS, leaf)
+        return node if new is child else _Branch(node.bitmap, node.slots[:index] + (new,) + node.slots[index + 1:])
+    if node.hash != leaf.hash: return _merge(node, leaf, shift)
+    if isinstance(node, _Leaf):
+        if node.key == leaf.key: return node if node.value is leaf.value else leaf
+        return _Collision(leaf.hash, ((node.key, node.value), (leaf.key, leaf.value)))
+    pairs = tuple(pair for pair in node.pairs if pair[0] != leaf.key)
+    return _Collision(leaf.hash, pairs + ((leaf.key, leaf.value),))
+
+def _remove(node: Any, shift: int, hash_: int, key: Any) -> Any:
+    if node is None: return None
+    if isinstance(node, _Branch):
+        bit = 1 << ((hash_ >> shift) & MASK)
+        if not node.bitmap & bit: return node
+        index = bin(node.bitmap & (bit - 1)).count("1")
+        child = node.slots[index]
+        new = _remove(child, shift + BITS, hash_, key)
+        if new is child: return node
+        if new is not None: return _Branch(node.bitmap, node.slots[:index] + (new,) + node.slots[index + 1:])
+        slots = node.slots[:index] + node.slots[index + 1:]
+        if not slots: return None
+        # A lone leaf moves up; lookups find it at any depth.
+        if len(slots) == 1 and not isinstance(slots[0], _Branch): return slots[0]
+        return _Branch(node.bitmap & ~bit, slots)
+    if isinstance(node, _Leaf): return None if node.hash == hash_ and node.key == key else node
+    if node.hash != hash_: return node
+    pairs = tuple(pair for pair in node.pairs if pair[0] != key)
+    if len(pairs) == len(node.pairs): return node
+    return _Leaf(hash_, *pairs[0]) if len(pairs) == 1 else _Collision(hash_, pairs)
+
+def _items(node: Any) -> Iterator[Tuple[Any, Any]]:
+    if node is None: return
+    if isinstance(node, _Branch):
+        for child in node.slots: yield from _items(child)
+    elif isinstance(node, _Leaf): yield node.key, node.value
+    else: yield from node.pairs
+
+def _diff(a: Any, b: Any, shift: int, out: List[Any]) -> None:
+    if a is b: return
+    if isinstance(a, _Branch) and isinstance(b, _Branch):
+        slots_a, slots_b = iter(a.slots), iter(b.slots)
+        for bit in range(1 << BITS):
+            flag = 1 << bit
+            child_a = next(slots_a) if a.bitmap & flag else None
+            child_b = next(slots_b) if b.bitmap & flag else None
+            if child_a is not child_b: _diff(child_a, child_b, shift + BITS, out)
+        return
+    # A leaf against anything: at most one side has more than a few keys here.
+    left, right = dict(_items(a)), dict(_items(b))
+    for key in left.keys() | right.keys():
+        x, y = left.get(key, _MISSING), right.get(key, _MISSING)
+        if x is not y and (x is _MISSING or y is _MISSING or x != y): out.append(key)
+
+class PersistentMap:
+    __slots__ = ('root', 'size')
+
+    def __init__(self, root: Any = None, size: int = 0):
+        self.root = root
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        hash_, node, shift = _hash(key), self.root, 0
+        while isinstance(node, _Branch):
+            bit = 1 << ((hash_ >> shift) & MASK)
+            if not node.bitmap & bit: return default
+            node = node.slots[bin(node.bitmap & (bit - 1)).count("1")]
+            shift += BITS
+        if node is None or node.hash != hash_: return default
+        if isinstance(node, _Leaf): return node.value if node.key == key else default
+        for pair_key, value in node.pairs:
+            if pair_key == key: return value
+        return default
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: Any, value: Any) -> 'PersistentMap':
+        root = _set(self.root, 0, _Leaf(_hash(key), key, value))
+        if root is self.root: return self
+        return PersistentMap(root, self.size + (key not in self))
+
+    def remove(self, key: Any) -> 'PersistentMap':
+        root = _remove(self.root, 0, _hash(key), key)
+        return self if root is self.root else PersistentMap(root, self.size - 1)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        return _items(self.root)
+
+    def diff(self, other: 'PersistentMap') -> List[Any]:
+        # Keys whose values differ between the two maps (or that only one has).
+        out: List[Any] = []
+        _diff(self.root, other.root, 0, out)
+        return out
+
+# --- Undo Log ---
+# Every change of logs, 1RM and new_1RM through DataStore is an undo step.
+# A step is a PersistentMap of every entry changed so far, so a step costs
+# the entries it changed and the steps share the rest. An entry joins the
+# maps when first changed; its value from before that is kept in
+# `original` (ABSENT if it did not exist), so nothing is copied up front.
+# undo() and redo() diff two steps and write the difference back through
+# the store: set() for values, remove() for entries that did not exist.
+# Changes made inside step() are one step.
+UNDO_SECTIONS = ("logs", "1RM", "new_1RM")
+MAX_STEPS = 500
+ABSENT = _MISSING
+
+Entry = Tuple[str, str]
+
+class UndoLog:
+    def __init__(self, store: DataStore, max_steps: int = MAX_STEPS, sections: Tuple[str, ...] = UNDO_SECTIONS):
+        self.store = store
+        self.max_steps = max_steps
+        self.sections = sections
+        self.steps: List[PersistentMap] = [PersistentMap()]   # steps[0]: nothing changed yet
+        self.position = 0
+        self.original: Dict[Entry, Any] = {}
+        self._before: Dict[Entry, Any] = {}
+        self._replaced: Optional[Dict[str, Any]] = None
+        self._pending: Optional[PersistentMap] = None
+        self._depth = 0
+        self._applying = False
+        store.bind_overwriting(self.on_overwriting)
+        store.bind_changed(self.on_changed)
+
+    def can_undo(self) -> bool:
+        return self.position > 0
+
+    def can_redo(self) -> bool:
+        return self.position < len(self.steps) - 1
+
+    @contextmanager
+    def step(self) -> Iterator[None]:
+        self._depth += 1
+        try: yield
+        finally:
+            self._depth -= 1
+            if not self._depth and self._pending is not None:
+                pending, self._pending = self._pending, None
+                self._push(pending)
+
+    def on_overwriting(self, data: Dict[str, Any], entry: Optional[Entry]) -> None:
+        # Values before their first change; the old document before replace().
+        if self._applying: return
+        if entry is None: self._replaced = data
+        elif entry[0] in self.sections and entry not in self.original:
+            self._before[entry] = data[entry[0]][entry[1]]
+
+    def on_changed(self, changed: List[Entry], removed: List[Entry]) -> None:
+        replaced, self._replaced = self._replaced, None
+        before, self._before = self._before, {}
+        if self._applying: return
+        data = self.store.data
+        current = self._pending if self._pending is not None else self.steps[self.position]
+        version = current
+        for entry in changed + removed:
+            section, key = entry
+            if section not in self.sections: continue
+            if entry not in self.original:
+                if replaced is not None: self.original[entry] = replaced.get(section, {}).get(key, ABSENT)
+                else: self.original[entry] = before.get(entry, ABSENT)
+            value = data.get(section, {}).get(key, ABSENT)
+            old_value = version.get(entry, self.original[entry])
+            if old_value is value or (old_value is not ABSENT and value is not ABSENT and old_value == value): continue
+            version = version.set(entry, value)
+        if version is current: return
+        if self._depth: self._pending = version
+        else: self._push(version)
+
+    def undo(self) -> List[Entry]:
+        # The entries put back; empty if there is nothing to undo.
+        if not self.can_undo(): return []
+        self.position -= 1
+        return self._apply(self.steps[self.position + 1], self.steps[self.position])
+
+    def redo(self) -> List[Entry]:
+        if not self.can_redo(): return []
+        self.position += 1
+        return self._apply(self.steps[self.position - 1], self.steps[self.position])
+
+    def _push(self, version: PersistentMap) -> None:
+        del self.steps[self.position + 1:]  # a new change drops the redo steps
+        self.steps.append(version)
+        if len(self.steps) > self.max_steps + 1: del self.steps[0]
+        self.position = len(self.steps) - 1
+
+    def _apply(self, current: PersistentMap, target: PersistentMap) -> List[Entry]:
+        entries = current.diff(target)
+        values = [(entry, target.get(entry, self.original[entry])) for entry in entries]
+        store = self.store
+        self._applying = True
+        try:
+            for (section, key), value in values:
+                if value is ABSENT: store.remove(section, key)
+                else: store.set(section, key, value)
+        finally:
+            self._applying = False
+        return entries
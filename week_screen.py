@@ -0,0 +1,304 @@
+import threading
+import time
+from kivy.app import App
+from kivy.logger import Logger
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.textinput import TextInput
+from kivy.uix.button import Button
+from kivy.uix.popup import Popup
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from engine import PlanEngine
+from program_loader import builtin_program
+from program import log_key, safe_float, safe_int
+from plates import day_loadouts
+from profiling import profiler
+from week_view import WeekView, WeekViewCache, week_stamp, week_prs, week_data, build_week_view, exercise_row
+from catalog import catalog
+
+SWAP_RESULTS = 12  # catalog matches listed in the swap popup
+
+# Week view rows. The week is a flat list of row dicts shown through a
+# RecycleView, so only visible rows own widgets and saving one exercise
+# replaces just that row's dict. Built weeks are kept in a WeekViewCache
+# and the weeks either side of the shown one are built in the background.
+class DayRow(RecycleDataViewBehavior, Label):
+    def __init__(self, **kwargs):
+        super().__init__(font_size=18, **kwargs)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.text = data['text']
+
+class ExerciseRow(RecycleDataViewBehavior, BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(orientation='vertical', spacing=5, **kwargs)
+        self.screen = None
+        self.cell = None
+        self._syncing = False
+        self.header_label = Label(size_hint_y=None, height=30)
+        self.add_widget(self.header_label)
+        self.target_label = Label(size_hint_y=None, height=30)
+        self.add_widget(self.target_label)
+        actual_row = BoxLayout(orientation='horizontal', spacing=5)
+        actual_row.add_widget(Label(text="Actual Wt:", size_hint_x=0.3))
+        self.wt_input = TextInput(multiline=False, size_hint_x=0.3)
+        self.wt_input.bind(text=lambda instance, value: self.keep_draft('actual_weight', value))
+        actual_row.add_widget(self.wt_input)
+        actual_row.add_widget(Label(text="Actual Reps:", size_hint_x=0.2))
+        self.reps_input = TextInput(multiline=False, size_hint_x=0.2)
+        self.reps_input.bind(text=lambda instance, value: self.keep_draft('actual_reps', value))
+        actual_row.add_widget(self.reps_input)
+        save_btn = Button(text="Save", size_hint_x=0.2)
+        save_btn.bind(on_press=lambda instance: self.screen.save_log(*self.cell, self.wt_input.text, self.reps_input.text))
+        actual_row.add_widget(save_btn)
+        swap_btn = Button(text="Swap", size_hint_x=0.2)
+        swap_btn.bind(on_press=lambda instance: self.screen.open_swap(*self.cell))
+        actual_row.add_widget(swap_btn)
+        self.add_widget(actual_row)
+        self.notes_label = Label(size_hint_y=None, height=30)
+        self.add_widget(self.notes_label)
+
+    def refresh_view_attrs(self, rv, index, data):
+        if self.cell != data['cell']:
+            # Recycled onto another exercise; focus must not follow the widget.
+            self.wt_input.focus = self.reps_input.focus = False
+        self.screen = rv.screen
+        self.cell = data['cell']
+        draft = self.screen.drafts.get(self.cell, {})
+        self._syncing = True
+        self.header_label.text = data['header']
+        self.target_label.text = data['target']
+        self.wt_input.text = draft.get('actual_weight', data['actual_weight'])
+        self.reps_input.text = draft.get('actual_reps', data['actual_reps'])
+        self.notes_label.text = data['notes']
+        self._syncing = False
+
+    def keep_draft(self, field, value):
+        # Unsaved typing survives the widget being recycled while scrolling.
+        if not self._syncing and self.cell is not None:
+            self.screen.drafts.setdefault(self.cell, {})[field] = value
+
+class WeekScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.week_num = 1
+        self.shown_week = None
+        program = getattr(App.get_running_app(), 'program', None) or builtin_program()
+        self.engine = PlanEngine.from_definition(program)
+        self.history = None
+        self.drafts = {}
+        self.row_index = {}
+        self.loadouts = {}
+        self.views = WeekViewCache(self.view_stamp, self.prefetch_inputs, self.prefetch_view,
+                                   on_error=lambda week_num, e: Logger.exception(f"WeekScreen: prefetching week {week_num} failed: {e}"))
+        self.catalog_warmed = False
+        self.stale = set()  # cells dropped by store changes, not redrawn yet
+        self.store = getattr(App.get_running_app(), 'store', None)
+        if self.store is not None: self.store.bind_changed(self.on_store_changed)
+        self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        self.title = Label(text=f"Week {self.week_num}", font_size=20)
+        self.layout.add_widget(self.title)
+        buttons = BoxLayout(orientation='horizontal', spacing=10, size_hint=(1, 0.1))
+        back_button = Button(text="Back")
+        back_button.bind(on_press=lambda x: setattr(self.manager, 'current', 'main'))
+        buttons.add_widget(back_button)
+        self.undo_button = Button(text="Undo", size_hint_x=0.5)
+        self.undo_button.bind(on_press=lambda x: App.get_running_app().undo())
+        buttons.add_widget(self.undo_button)
+        self.redo_button = Button(text="Redo", size_hint_x=0.5)
+        self.redo_button.bind(on_press=lambda x: App.get_running_app().undo(redo=True))
+        buttons.add_widget(self.redo_button)
+        self.layout.add_widget(buttons)
+
+        self.rv = RecycleView()
+        self.rv.screen = self
+        rows = RecycleBoxLayout(orientation='vertical', spacing=10, size_hint_y=None,
+                                default_size=(None, 150), default_size_hint=(1, None), key_size='row_size')
+        rows.bind(minimum_height=rows.setter('height'))
+        self.rv.add_widget(rows)
+        self.rv.key_viewclass = 'viewclass'
+        self.layout.add_widget(self.rv)
+        self.add_widget(self.layout)
+
+    def on_enter(self):
+        start = time.perf_counter()
+        app = App.get_running_app()
+        self.history = app.history
+        if not self.catalog_warmed:
+            # Loaded off the UI thread so the first swap popup opens at once.
+            threading.Thread(target=catalog, name="CatalogLoad", daemon=True).start()
+            self.catalog_warmed = True
+        dropped = self.engine.load(app.store.data)
+        self.refresh_undo()
+        if self.shown_week != self.week_num:
+            self.show_week()
+        else:
+            self.update_rows(set(dropped) | self.take_stale())
+        profiler.record("week.on_enter", start, time.perf_counter())
+        Logger.debug(f"WeekScreen: entered week {self.week_num} in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    def on_leave(self):
+        self.keep_view()
+
+    def show_week(self):
+        start = time.perf_counter()
+        week_num = self.week_num
+        stamp = self.view_stamp(week_num)
+        view = self.views.get(week_num, stamp)
+        if view is None:
+            view = build_week_view(week_num, self.engine.week(week_num), self.week_prs(week_num), stamp)
+            self.views.put(view)
+            profiler.count("week.view_miss")
+        else:
+            # Built from these very inputs, so the cells are current.
+            self.engine.prime(view.cells)
+            profiler.count("week.view_hit")
+        self.row_index = view.row_index
+        self.stale.clear()
+        self.loadouts = dict(view.loadouts)  # update_rows edits it; the cached view stays as built
+        self.title.text = f"Week {week_num}"
+        self.rv.data = view.rows
+        self.shown_week = week_num
+        self.prefetch_neighbours()
+        profiler.record("week.show_week", start, time.perf_counter())
+
+    # --- View cache ---
+    def view_stamp(self, week_num):
+        return week_stamp(self.engine, self.history, week_num)
+
+    def week_prs(self, week_num):
+        return week_prs(self.history, self.engine.compiled.exercise_counts, week_num)
+
+    def prefetch_inputs(self, week_num):
+        return week_data(self.engine, week_num), self.week_prs(week_num)
+
+    def prefetch_view(self, week_num, stamp, inputs):
+        # Worker thread: works on the copies prefetch_inputs took, and
+        # compute_week leaves the engine's cache alone.
+        data, prs = inputs
+        return build_week_view(week_num, self.engine.compute_week(week_num, data), prs, stamp)
+
+    def prefetch_neighbours(self):
+        week_count = self.engine.compiled.week_count
+        self.views.prefetch([w for w in (self.shown_week + 1, self.shown_week - 1) if 1 <= w <= week_count])
+
+    def keep_view(self):
+        # The shown week as it is now, rows updated in place included.
+        if self.shown_week is None: return
+        cells = [self.engine.cell(*key) for key in self.row_index]
+        self.views.put(WeekView(self.shown_week, self.view_stamp(self.shown_week), list(self.rv.data),
+                                self.row_index, dict(self.loadouts), cells))
+
+    # --- Store changes ---
+    def on_store_changed(self, changed, removed):
+        # Every change, made here or elsewhere (1RM edits, sync, undo), drops
+        # the cells it feeds; the next update_rows redraws those of this week.
+        if self.engine.data is not self.store.data:
+            self.stale.update(self.engine.load(self.store.data))
+        else:
+            for section, key in changed + removed:
+                self.stale.update(self.engine.invalidate(section, key))
+        self.refresh_undo()
+
+    def take_stale(self):
+        stale, self.stale = self.stale, set()
+        return stale
+
+    def refresh_undo(self):
+        undo_log = getattr(App.get_running_app(), 'undo_log', None)
+        self.undo_button.disabled = undo_log is None or not undo_log.can_undo()
+        self.redo_button.disabled = undo_log is None or not undo_log.can_redo()
+
+    def exercise_row(self, cell):
+        key = (cell['week'], cell['day_idx'], cell['ex_idx'])
+        return exercise_row(cell, self.history is not None and self.history.is_pr(*key), self.loadouts.get(key))
+
+    def update_rows(self, cells):
+        # A changed target can change the plate plan of the rest of its day.
+        cells = set(cells)
+        for week_num, day_idx in {cell[:2] for cell in cells if cell[0] == self.shown_week}:
+            count = self.engine.compiled.exercise_counts[week_num-1][day_idx]
+            planned = day_loadouts([self.engine.cell(week_num, day_idx, ex_idx) for ex_idx in range(count)])
+            for ex_idx in range(count):
+                key = (week_num, day_idx, ex_idx)
+                old, new = self.loadouts.pop(key, None), planned.get(key)
+                if new is not None: self.loadouts[key] = new
+                if (old and old.plates) != (new and new.plates): cells.add(key)
+        for cell in cells:
+            index = self.row_index.get(cell)
+            if index is not None and cell[0] == self.shown_week:
+                self.rv.data[index] = self.exercise_row(self.engine.cell(*cell))
+                profiler.count("week.rows_redrawn")
+        # A change here can change the weeks either side; rebuild them if so.
+        if cells and self.shown_week is not None: self.prefetch_neighbours()
+
+    def save_log(self, week_num, day_idx, ex_idx, actual_weight, actual_reps):
+        start = time.perf_counter()
+        key = log_key(week_num, day_idx, ex_idx)
+        value = {
+            "actual_weight": safe_float(actual_weight, 0.0),
+            "actual_reps": safe_int(actual_reps, 0)
+        }
+        App.get_running_app().store.set("logs", key, value)
+        self.drafts.pop((week_num, day_idx, ex_idx), None)
+        # Only the rows downstream of this log are recomputed and redrawn,
+        # plus later sets of the exercise whose PR flag may have changed.
+        recorded = self.history.record(key, value) if self.history is not None else None
+        changed = [(week_num, day_idx, ex_idx)] + (recorded["changed"] if recorded else [])
+        self.update_rows(set(self.engine.invalidate("logs", key)) | self.take_stale() | set(changed))
+        profiler.record("week.save_log", start, time.perf_counter())
+        Logger.debug(f"WeekScreen: saved {key} in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    # --- Exercise swaps ---
+    def open_swap(self, week_num, day_idx, ex_idx):
+        # Substitutes for the program's exercise until something is typed,
+        # then catalog matches as you type.
+        cell = self.engine.cell(week_num, day_idx, ex_idx)
+        exercises = catalog()
+        content = BoxLayout(orientation='vertical', spacing=5, padding=5)
+        query = TextInput(multiline=False, size_hint_y=None, height=40, hint_text="Search exercises")
+        content.add_widget(query)
+        results = GridLayout(cols=1, spacing=2, size_hint_y=None)
+        results.bind(minimum_height=results.setter('height'))
+        scroll = ScrollView()
+        scroll.add_widget(results)
+        content.add_widget(scroll)
+        buttons = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=None, height=40)
+        popup = Popup(title=f"Swap {cell['name']}", content=content, size_hint=(0.9, 0.8))
+        reset = Button(text=f"Use {cell['program_name']}")
+        reset.bind(on_press=lambda x: (popup.dismiss(), self.swap_exercise(week_num, day_idx, ex_idx, None)))
+        cancel = Button(text="Cancel")
+        cancel.bind(on_press=lambda x: popup.dismiss())
+        buttons.add_widget(reset)
+        buttons.add_widget(cancel)
+        content.add_widget(buttons)
+
+        # A fixed set of buttons is relabelled per keystroke instead of rebuilt.
+        choices = []
+        for _ in range(SWAP_RESULTS):
+            choice = Button(size_hint_y=None, height=40)
+            choice.bind(on_press=lambda b: (popup.dismiss(), self.swap_exercise(week_num, day_idx, ex_idx, b.text)))
+            results.add_widget(choice)
+            choices.append(choice)
+        def show(instance, text):
+            start = time.perf_counter()
+            found = (exercises.search(text, SWAP_RESULTS) if text.strip()
+                     else exercises.substitutions(cell['program_name'], SWAP_RESULTS))
+            for choice, entry in zip(choices, found + [None] * (SWAP_RESULTS - len(found))):
+                choice.text = entry.name if entry else ""
+                choice.disabled, choice.opacity = entry is None, 0 if entry is None else 1
+            profiler.record("week.swap_search", start, time.perf_counter())
+        query.bind(text=show)
+        show(query, "")
+        popup.open()
+
+    def swap_exercise(self, week_num, day_idx, ex_idx, name):
+        # None goes back to the program's exercise.
+        key = log_key(week_num, day_idx, ex_idx)
+        App.get_running_app().store.set("swaps", key, name)
+        self.update_rows(set(self.engine.invalidate("swaps", key)) | self.take_stale() | {(week_num, day_idx, ex_idx)})
@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple, FrozenSet
+
+from plates import Loadout, day_loadouts
+
+# --- Week View Models ---
+# What WeekScreen shows for a week: its row dicts, where each exercise row
+# sits, the plate loadouts and the engine cells behind them. A view carries
+# the stamp it was built at: the week's PR marks plus the current value of
+# every input its cells read (1RMs, the week's and previous week's logs), so
+# an unchanged stamp means an unchanged view. The PR marks are all a view
+# takes from the history, so a save elsewhere that leaves them as they are
+# keeps the view. WeekViewCache keeps the most
+# recently used views and builds others on a worker thread from
+# PlanEngine.compute_week, so switching to a warmed week is a lookup. The
+# worker only sees copies taken on the UI thread (the week's input entries
+# and PR flags), never the live data document or TrainingHistory.
+VIEW_CACHE_SIZE = 4
+
+Cell = Tuple[int, int, int]
+
+class WeekView:
+    __slots__ = ('week_num', 'stamp', 'rows', 'row_index', 'loadouts', 'cells')
+
+    def __init__(self, week_num: int, stamp: Tuple, rows: List[Dict[str, Any]], row_index: Dict[Cell, int],
+                 loadouts: Dict[Cell, Loadout], cells: List[Dict[str, Any]]):
+        self.week_num = week_num
+        self.stamp = stamp
+        self.rows = rows
+        self.row_index = row_index
+        self.loadouts = loadouts
+        self.cells = cells
+
+def week_stamp(engine: Any, history: Any, week_num: int) -> Tuple:
+    data = engine.data
+    return (week_prs(history, engine.compiled.exercise_counts, week_num),
+            tuple(data.get(section, {}).get(key) for section, key in engine.week_inputs(week_num)))
+
+def week_prs(history: Any, exercise_counts: List[List[int]], week_num: int) -> FrozenSet[Cell]:
+    # The week's cells whose log is a PR.
+    if history is None: return frozenset()
+    return frozenset((week_num, day_idx, ex_idx) for day_idx, count in enumerate(exercise_counts[week_num-1])
+                     for ex_idx in range(count) if history.is_pr(week_num, day_idx, ex_idx))
+
+def week_data(engine: Any, week_num: int) -> Dict[str, Any]:
+    # A document holding just the entries the week's cells read, for compute_week
+    # off the UI thread. Entries are replaced, never mutated, so sharing them is safe.
+    data = engine.data
+    copy: Dict[str, Dict[str, Any]] = {"1RM": {}, "logs": {}, "swaps": {}}
+    for section, key in engine.week_inputs(week_num):
+        value = data.get(section, {}).get(key)
+        if value is not None: copy[section][key] = value
+    return copy
+
+def exercise_row(cell: Dict[str, Any], pr: bool, loadout: Optional[Loadout]) -> Dict[str, Any]:
+    name = cell['name'] if cell['name'] == cell['program_name'] else f"{cell['name']} (for {cell['program_name']})"
+    return {
+        'viewclass': 'ExerciseRow',
+        'cell': (cell['week'], cell['day_idx'], cell['ex_idx']),
+        'header': f"{name}: {cell['sets']} sets, {cell['reps']} reps, Rest: {cell['rest']}, RPE: {cell['rpe']}" + ("  PR!" if pr else ""),
+        'target': f"Target Weight: {cell['target_weight']}" + (f"  ({loadout.text()})" if loadout else ""),
+        'actual_weight': str(cell['actual_weight']),
+        'actual_reps': str(cell['actual_reps']),
+        'notes': f"Notes: {cell['notes']}",
+    }
+
+def build_week_view(week_num: int, days: List[Tuple[str, List[Dict[str, Any]]]], prs: FrozenSet[Cell], stamp: Tuple) -> WeekView:
+    # days as returned by PlanEngine.week()/compute_week(), prs from week_prs().
+    rows, row_index, loadouts, cells = [], {}, {}, []
+    for day_name, day_cells in days:
+        loadouts.update(day_loadouts(day_cells))
+        rows.append({'viewclass': 'DayRow', 'row_size': (None, 40), 'text': day_name})
+        for cell in day_cells:
+            key = (cell['week'], cell['day_idx'], cell['ex_idx'])
+            row_index[key] = len(rows)
+            rows.append(exercise_row(cell, key in prs, loadouts.get(key)))
+            cells.append(cell)
+    return WeekView(week_num, stamp, rows, row_index, loadouts, cells)
+
+class WeekViewCache:
+    # stamp(week_num) gives a week's current stamp and inputs(week_num) copies
+    # what building it reads; both run in prefetch(), on the caller's thread.
+    # build(week_num, stamp, inputs) builds the view on the worker thread and
+    # on_error(week_num, exception) hears about builds that failed.
+    def __init__(self, stamp: Callable[[int], Tuple], inputs: Callable[[int], Any],
+                 build: Callable[[int, Tuple, Any], WeekView], size: int = VIEW_CACHE_SIZE,
+                 on_error: Optional[Callable[[int, Exception], None]] = None):
+        self.stamp = stamp
+        self.inputs = inputs
+        self.build = build
+        self.size = size
+        self.on_error = on_error
+        self.hits = self.misses = self.prefetched = 0
+        self._views: 'OrderedDict[int, WeekView]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._wanted = threading.Condition(self._lock)
+        self._queue: List[Tuple[int, Tuple, Any]] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, week_num: int, stamp: Tuple) -> Optional[WeekView]:
+        with self._lock:
+            view = self._views.get(week_num)
+            if view is None or view.stamp != stamp:
+                self.misses += 1
+                return None
+            self._views.move_to_end(week_num)
+            self.hits += 1
+            return view
+
+    def put(self, view: WeekView) -> None:
+        with self._lock:
+            self._views[view.week_num] = view
+            self._views.move_to_end(view.week_num)
+            while len(self._views) > self.size:
+                self._views.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+            self._queue = []
+
+    def prefetch(self, weeks: List[int]) -> None:
+        # Replaces any weeks still waiting; the worker starts on first use.
+        jobs = []
+        for week_num in weeks:
+            stamp = self.stamp(week_num)
+            with self._lock:
+                cached = self._views.get(week_num)
+            if cached is None or cached.stamp != stamp:
+                jobs.append((week_num, stamp, self.inputs(week_num)))
+        with self._lock:
+            self._queue = jobs
+            if not jobs: return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="WeekPrefetch", daemon=True)
+                self._thread.start()
+            self._wanted.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._wanted.wait()
+                week_num, stamp, inputs = self._queue.pop(0)
+            try:
+                view = self.build(week_num, stamp, inputs)
+            except Exception as e:
+                if self.on_error is not None: self.on_error(week_num, e)
+                continue
+            self.put(view)
+            self.prefetched += 1